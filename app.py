@@ -1,137 +1,688 @@
-from flask import Flask, render_template, request, send_file, jsonify
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib import colors
-import matplotlib
-matplotlib.use('Agg')  # Usar backend não interativo para Matplotlib
-import matplotlib.pyplot as plt
+from flask import Flask, render_template, request, send_file, jsonify, g
+import hashlib
+import hmac
+import html
 import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from comparador.armazenamento import ORDENACOES_RANKING, Armazenamento
+from comparador.cache_pdf import CachePDF, chave_comparacao
+from comparador.cronometro import Cronometro
+from comparador.graficos import MotorGraficos
+from comparador.metricas import Registro
+from comparador.modelo import Limites, PayloadGrande, PayloadInvalido, decodificar_comparacao
+from comparador.modelo_relatorio import ModeloRelatorio
+from comparador.pontuacao import OPCOES_PONTOS, nome_vencedora
+from comparador.perfil import criar_perfilador
+from comparador.processos import FilaCheia, PoolRenderizacao
+from comparador.relatorio import gerar_pdf as gerar_pdf_relatorio, gerar_pdf_varios
+from comparador.sensibilidade import AMOSTRAS_PADRAO, amostras_para, analisar_sensibilidade
+from comparador.servidor import Prontidao, ServidorPreFork
+from comparador.sintetico import gerar_payload
+from comparador.streaming import (abrir_desvinculado, abrir_spool, finalizar_spool, resposta_streaming, tamanho_arquivo,
+                                  zip_em_fluxo)
+from comparador.tarefas import CONCLUIDA, GerenciadorTarefas
 
 app = Flask(__name__)
 
 # --- Configurações ---
-OPCOES_PONTOS = {
-    "Excelente": 10,
-    "Bom": 5,
-    "Regular": 3,
-    "Não possui": 0
-}
+# Cache de PDFs prontos (limite em bytes; diretório opcional para transbordo em disco, com limite próprio)
+CACHE_PDF_BYTES = int(os.environ.get('COMPARADOR_CACHE_PDF_BYTES', 64 * 1024 * 1024))
+CACHE_PDF_DIRETORIO = os.environ.get('COMPARADOR_CACHE_PDF_DIR') or None
+CACHE_PDF_DISCO_BYTES = int(os.environ.get('COMPARADOR_CACHE_PDF_DISCO_BYTES', 1024 * 1024 * 1024))
 
-# --- Funções de Geração de PDF ---
-def gerar_grafico_comparacao(dados_comparacao, nome_vencedora):
-    produtos = list(dados_comparacao.keys())
-    pontuacoes = [dados_comparacao[prod]["Total"] for prod in produtos]
-
-    fig, ax = plt.subplots(figsize=(8, 4))
-    barras = ax.bar(produtos, pontuacoes, color=['#1a237e', '#3f51b5', '#7986cb'])
-    
-    ax.set_ylabel('Pontuação Total')
-    ax.set_title(f'Comparativo de Pontuação (Vencedora: {nome_vencedora})')
-    ax.spines['right'].set_visible(False)
-    ax.spines['top'].set_visible(False)
-    
-    for barra in barras:
-        yval = barra.get_height()
-        ax.text(barra.get_x() + barra.get_width()/2.0, yval, int(yval), ha='center', va='bottom')
-
-    buf = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format='png')
-    plt.close(fig)
-    buf.seek(0)
-    return buf
-
-def gerar_pdf(dados_comparacao, nome_vencedora, criterios_usados):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='TitleCustom', parent=styles['Title'], fontSize=20, spaceAfter=20, alignment=1))
-    styles.add(ParagraphStyle(name='Heading2Custom', parent=styles['Heading2'], fontSize=14, spaceBefore=10, spaceAfter=10))
-    styles.add(ParagraphStyle(name='NormalCustom', parent=styles['Normal'], fontSize=10))
-
-    Story = []
-    Story.append(Paragraph("Relatório de Comparação de Produtos", styles['TitleCustom']))
-    Story.append(Paragraph(f"<b>VENCEDORA: {nome_vencedora}</b>", styles['Heading2Custom']))
-    Story.append(Spacer(1, 12))
-
-    produtos = list(dados_comparacao.keys())
-    data = [["<b>CRITÉRIOS</b>"] + [f"<b>{p}</b>" for p in produtos]]
-
-    for criterio in criterios_usados:
-        row = [Paragraph(criterio, styles['NormalCustom'])]
-        for produto in produtos:
-            criterio_data = dados_comparacao[produto]["Criterios"].get(criterio, {"Opcao": "N/A", "Pontos": 0})
-            texto_celula = f'{criterio_data["Pontos"]} pts ({criterio_data["Opcao"]})'
-            row.append(Paragraph(texto_celula, styles['NormalCustom']))
-        data.append(row)
-        
-    linha_total = [Paragraph("<b>PONTUAÇÃO FINAL</b>", styles['NormalCustom'])]
-    for produto in produtos:
-        linha_total.append(Paragraph(f"<b>{int(dados_comparacao[produto]['Total'])} pts</b>", styles['NormalCustom']))
-    data.append(linha_total)
-
-    table = Table(data, colWidths=[200] + [100] * len(produtos))
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a237e')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+cache_pdf = CachePDF(limite_bytes=CACHE_PDF_BYTES, diretorio_disco=CACHE_PDF_DIRETORIO,
+                     limite_disco_bytes=CACHE_PDF_DISCO_BYTES)
+
+# Gráfico vetorial do ReportLab em vez de PNG do Matplotlib
+GRAFICO_VETORIAL = os.environ.get('COMPARADOR_GRAFICO_VETORIAL', '0') == '1'
+
+# Perfil compacto: PNG do gráfico quantizado para 16 cores e sem canal alfa (PDFs bem menores)
+PDF_COMPACTO = os.environ.get('COMPARADOR_PDF_COMPACTO', '1') == '1'
+
+motor_graficos = MotorGraficos(cores=['#1a237e', '#3f51b5', '#7986cb'])
+
+# Servidor pré-fork (`python app.py`): processos que atendem requisições (0 = servidor de desenvolvimento do Flask),
+# porta e segundos que um worker continua atendendo depois do SIGTERM, com /ready já em 503
+SERVIDOR_WORKERS = int(os.environ.get('COMPARADOR_WORKERS', 0))
+SERVIDOR_PORTA = int(os.environ.get('COMPARADOR_PORTA', 5000))
+SERVIDOR_DRENAGEM_S = float(os.environ.get('COMPARADOR_DRENAGEM_S', 5))
+
+# Renderização em pool de processos (0 = renderizar na própria thread da requisição).
+# Com o servidor pré-fork o padrão é 0: cada worker já é um processo.
+RENDER_PROCESSOS = int(os.environ.get('COMPARADOR_PROCESSOS', 0 if SERVIDOR_WORKERS > 0 else os.cpu_count() or 1))
+RENDER_FILA_MAXIMA = int(os.environ.get('COMPARADOR_FILA_MAXIMA', 2 * max(RENDER_PROCESSOS, 1)))
+
+# Tarefas assíncronas (/jobs): threads locais, diretório dos PDFs prontos e tempo de expiração
+TAREFAS_TRABALHADORES = int(os.environ.get('COMPARADOR_TAREFAS_TRABALHADORES', 2))
+TAREFAS_DIRETORIO = os.environ.get('COMPARADOR_TAREFAS_DIR') or None
+TAREFAS_TTL = int(os.environ.get('COMPARADOR_TAREFAS_TTL', 15 * 60))
+
+# Respostas em streaming: PDFs até o limite ficam em memória; acima dele, vão para arquivo temporário
+STREAMING_PDF = os.environ.get('COMPARADOR_STREAMING', '1') == '1'
+SPOOL_LIMITE_BYTES = int(os.environ.get('COMPARADOR_SPOOL_LIMITE_BYTES', 1024 * 1024))
+
+# Análise de sensibilidade: limite de amostras aceito por requisição
+SENSIBILIDADE_MAX_AMOSTRAS = int(os.environ.get('COMPARADOR_SENSIBILIDADE_MAX_AMOSTRAS', 1_000_000))
+
+# Histórico em SQLite (comparações, PDFs para reimpressão e rankings); desativado sem um caminho.
+# Os PDFs guardados somam no máximo COMPARADOR_BANCO_PDF_BYTES (os mais antigos saem primeiro)
+BANCO_DADOS = os.environ.get('COMPARADOR_BANCO', '')
+BANCO_PDF_BYTES = int(os.environ.get('COMPARADOR_BANCO_PDF_BYTES', 256 * 1024 * 1024))
+
+armazenamento = Armazenamento(BANCO_DADOS, limite_pdfs_bytes=BANCO_PDF_BYTES) if BANCO_DADOS else None
+
+# Lotes (/gerar_pdf_lote): máximo de comparações por requisição e quantas são renderizadas ao mesmo tempo
+LOTE_MAX_ITENS = int(os.environ.get('COMPARADOR_LOTE_MAX_ITENS', 100))
+LOTE_CONCORRENCIA = int(os.environ.get('COMPARADOR_LOTE_CONCORRENCIA', max(RENDER_PROCESSOS, 1)))
+
+# Limites do payload de uma comparação (acima deles a requisição é recusada com 413, antes de qualquer cálculo)
+LIMITES_PAYLOAD = Limites(
+    max_bytes=int(os.environ.get('COMPARADOR_PAYLOAD_MAX_BYTES', 8 * 1024 * 1024)),
+    max_produtos=int(os.environ.get('COMPARADOR_MAX_PRODUTOS', 100)),
+    max_criterios=int(os.environ.get('COMPARADOR_MAX_CRITERIOS', 20_000)),
+)
+
+# Token do cabeçalho X-Token-Admin exigido para perfilar requisições (sem token, o perfilamento fica desligado)
+TOKEN_ADMIN = os.environ.get('COMPARADOR_TOKEN_ADMIN') or None
+
+# Aparência do relatório web (estilos e seções estáticas são montados no primeiro PDF).
+# invariante: o mesmo relatório gera sempre os mesmos bytes, então o ETag vale para retomar downloads (Range)
+MODELO_RELATORIO = ModeloRelatorio(estilos_tabela={
+    'detalhes': [
+        ('BACKGROUND', (0, 0), (-1, 0), '#1a237e'),
+        ('TEXTCOLOR', (0, 0), (-1, 0), 'whitesmoke'),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ('ALIGN', (0, 1), (0, -1), 'LEFT'),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
         ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -2), colors.HexColor('#f0f4f8')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    Story.append(table)
-    Story.append(Spacer(1, 24))
+        ('BACKGROUND', (0, 1), (-1, -2), '#f0f4f8'),
+        ('GRID', (0, 0), (-1, -1), 1, 'black')
+    ],
+    'sensibilidade': [
+        ('BACKGROUND', (0, 0), (-1, 0), '#1a237e'),
+        ('TEXTCOLOR', (0, 0), (-1, 0), 'whitesmoke'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 1, 'black')
+    ],
+}, graficos=motor_graficos, invariante=True, paleta_grafico=16 if PDF_COMPACTO else None)
+
+# --- Métricas (expostas em /metrics) ---
+metricas = Registro()
+metrica_etapas = metricas.histograma('comparador_etapa_segundos', 'Duração de cada etapa da geração do relatório.', ('etapa',))
+metrica_requisicoes = metricas.histograma('comparador_requisicao_segundos', 'Duração das requisições por rota.', ('rota',))
+metrica_respostas = metricas.contador('comparador_respostas_total', 'Respostas por rota e status HTTP.', ('rota', 'status'))
+metrica_pdfs = metricas.contador('comparador_pdfs_total', 'PDFs entregues, por origem.', ('origem',))
+metrica_bytes = metricas.contador('comparador_pdf_bytes_total', 'Bytes de PDF gerados.')
+metrica_produtos = metricas.contador('comparador_produtos_total', 'Produtos comparados nos relatórios gerados.')
+metrica_criterios = metricas.contador('comparador_criterios_total', 'Critérios avaliados nos relatórios gerados.')
+
+def registrar_relatorio(relatorio, pdf, etapas):
+    """Alimenta as métricas com um relatório recém-renderizado."""
+    for nome, duracao in etapas.items():
+        metrica_etapas.observar(duracao, etapa=nome)
+    metrica_bytes.inc(len(pdf) if isinstance(pdf, bytes) else tamanho_arquivo(pdf))
+    for item in relatorio.get('relatorios', [relatorio]):
+        metrica_produtos.inc(len(item['comparacao'].produtos))
+        metrica_criterios.inc(len(item['comparacao'].criterios))
+    metrica_pdfs.inc(origem='renderizado')
+
+# --- Funções de Geração de PDF ---
+def gerar_pdf(comparacao, nome_vencedora, grafico_vetorial=None, sensibilidade=None, cronometro=None, destino=None):
+    """PDF do relatório web (ver `comparador.relatorio.gerar_pdf`); retorna o arquivo já no início."""
+    return gerar_pdf_relatorio(comparacao, nome_vencedora, MODELO_RELATORIO,
+                               grafico_vetorial=GRAFICO_VETORIAL if grafico_vetorial is None else grafico_vetorial,
+                               sensibilidade=sensibilidade, cronometro=cronometro, destino=destino)
+
+def gerar_pdf_documento(relatorios, cronometro=None, destino=None):
+    """Um único PDF com várias comparações (ver `comparador.relatorio.gerar_pdf_varios`)."""
+    return gerar_pdf_varios(relatorios, MODELO_RELATORIO, grafico_vetorial=GRAFICO_VETORIAL,
+                            cronometro=cronometro, destino=destino)
+
+def renderizar_pdf(relatorio, limite_memoria=None, portavel=False):
+    """Gera o PDF a partir dos argumentos de `gerar_pdf` (executada nos workers do pool).
 
-    grafico_buffer = gerar_grafico_comparacao(dados_comparacao, nome_vencedora)
-    img = Image(grafico_buffer, width=450, height=225)
-    Story.append(img)
+    `{"relatorios": [...]}` gera um documento com várias comparações (`gerar_pdf_documento`).
+    Um pedido de `pedido_relatorio` é montado aqui, então a pontuação e a análise de
+    sensibilidade também rodam no worker. Retorna o PDF e a duração de cada etapa em
+    segundos. Sem `limite_memoria` o PDF vem em bytes; com ele, é gravado em um spool
+    e só PDFs até o limite voltam em bytes (ver `comparador.streaming.finalizar_spool`).
+    """
+    gerar = gerar_pdf_documento if 'relatorios' in relatorio else gerar_pdf
+    cronometro = Cronometro()
+    if 'relatorios' in relatorio:
+        relatorio = {**relatorio, "relatorios": [_montar_pedido(item, cronometro) for item in relatorio['relatorios']]}
+    else:
+        relatorio = _montar_pedido(relatorio, cronometro)
+    if limite_memoria is None:
+        pdf_bytes = gerar(**relatorio, cronometro=cronometro).getvalue()
+        return pdf_bytes, cronometro.como_dict()
+    spool = abrir_spool(limite_memoria)
+    gerar(**relatorio, cronometro=cronometro, destino=spool)
+    return finalizar_spool(spool, limite_memoria, portavel), cronometro.como_dict()
 
-    doc.build(Story)
-    buffer.seek(0)
-    return buffer
+def _aquecer_worker():
+    # Renderiza relatórios sintéticos (gráfico PNG e vetorial, tabela simples e paginada) para carregar as fontes,
+    # o cache de fontes do Matplotlib e o backend Agg antes da primeira requisição
+    for n_produtos, n_criterios, vetorial in ((3, 5, False), (3, 5, True), (12, 200, False)):
+        comparacao = decodificar_comparacao(gerar_payload(n_produtos, n_criterios))
+        renderizar_pdf({**montar_comparacao(comparacao), "grafico_vetorial": vetorial})
+
+pool_renderizacao = PoolRenderizacao(processos=RENDER_PROCESSOS, fila_maxima=RENDER_FILA_MAXIMA,
+                                     aquecimento=_aquecer_worker) if RENDER_PROCESSOS > 0 else None
+
+def executar_renderizacao(relatorio, limite_memoria=None, na_thread=False):
+    """Renderiza no pool (ou na thread atual); retorna (pdf, etapas).
+
+    `pdf` são bytes ou, quando `limite_memoria` é informado e o PDF o excede,
+    um arquivo aberto pronto para streaming. `na_thread` força a renderização
+    local (usado ao perfilar a requisição).
+    """
+    if pool_renderizacao is None or na_thread:
+        return renderizar_pdf(relatorio, limite_memoria)
+    pdf, etapas = pool_renderizacao.executar(renderizar_pdf, relatorio, limite_memoria, portavel=True)
+    if isinstance(pdf, str):
+        pdf = abrir_desvinculado(pdf)
+    return pdf, etapas
+
+def _gerar_pdf_tarefa(chave, relatorio):
+    """Executa uma tarefa assíncrona, aproveitando o cache e esperando vaga no pool se ele estiver cheio.
+
+    `relatorio` costuma ser um `pedido_relatorio`: pontuação e análise de sensibilidade
+    acontecem aqui (no pool), não na requisição que criou a tarefa.
+    """
+    pdf_bytes = cache_pdf.obter(chave)
+    if pdf_bytes is not None:
+        return pdf_bytes
+    while True:
+        try:
+            pdf_bytes, etapas = executar_renderizacao(relatorio)
+            break
+        except FilaCheia as e:
+            time.sleep(e.tentar_novamente_em)
+    registrar_relatorio(relatorio, pdf_bytes, etapas)
+    cache_pdf.guardar(chave, pdf_bytes)
+    return pdf_bytes
+
+gerenciador_tarefas = GerenciadorTarefas(_gerar_pdf_tarefa, diretorio=TAREFAS_DIRETORIO,
+                                         trabalhadores=TAREFAS_TRABALHADORES, ttl=TAREFAS_TTL)
+
+metricas.medidor('comparador_cache_pdf', 'Estatísticas do cache de PDFs.',
+                 lambda: {k: v for k, v in cache_pdf.estatisticas().items() if isinstance(v, (int, float))}, ('estatistica',))
+metricas.medidor('comparador_pool_renderizacao', 'Estado do pool de processos de renderização.',
+                 lambda: {k: v for k, v in pool_renderizacao.estatisticas().items() if isinstance(v, (int, float))}
+                 if pool_renderizacao else None, ('estatistica',))
+metricas.medidor('comparador_tarefas', 'Tarefas assíncronas por status.',
+                 lambda: gerenciador_tarefas.estatisticas()['por_status'], ('status',))
+
+executor_lote = ThreadPoolExecutor(max_workers=LOTE_CONCORRENCIA, thread_name_prefix='lote')
+
+def opcoes_relatorio(data):
+    """Opções do payload que mudam o PDF (entram na chave do cache só quando ativadas)."""
+    return {"sensibilidade": True} if data.get('sensibilidade') else {}
+
+def ler_comparacao():
+    """Lê o corpo da requisição (no máximo `LIMITES_PAYLOAD.max_bytes`) e o decodifica.
+
+    Retorna (payload, comparacao); levanta `PayloadInvalido`/`PayloadGrande`.
+    """
+    limite = LIMITES_PAYLOAD.max_bytes
+    if request.content_length is not None and request.content_length > limite:
+        raise PayloadGrande(f"Payload acima de {limite} bytes.")
+    corpo = request.stream.read(limite + 1)
+    if len(corpo) > limite:
+        raise PayloadGrande(f"Payload acima de {limite} bytes.")
+    try:
+        data = json.loads(corpo)
+    except ValueError as e:
+        raise PayloadInvalido(f"JSON inválido: {e}") from None
+    return data, decodificar_comparacao(data, LIMITES_PAYLOAD)
+
+def _resposta_payload_invalido(erro):
+    return jsonify({"error": str(erro)}), 413 if isinstance(erro, PayloadGrande) else 400
+
+def montar_comparacao(comparacao, sensibilidade=False, semente=None):
+    """Pontua a `Comparacao` e retorna os argumentos de `gerar_pdf`.
+
+    A análise de sensibilidade usa `semente` ou, por padrão, uma semente derivada da
+    chave da comparação: o mesmo payload gera sempre o mesmo PDF (e o mesmo ETag vale).
+    O número de amostras diminui com o tamanho da comparação (`amostras_para`).
+    """
+    relatorio = {
+        "comparacao": comparacao,
+        "nome_vencedora": nome_vencedora(comparacao.produtos, comparacao.resultado),
+    }
+    if sensibilidade and comparacao.criterios:
+        if semente is None:
+            semente = int(chave_comparacao(comparacao)[:16], 16)
+        amostras = amostras_para(len(comparacao.criterios), len(comparacao.produtos))
+        relatorio["sensibilidade"] = analisar_sensibilidade(comparacao.codigos, amostras=amostras, semente=semente).como_dict(
+            comparacao.produtos, comparacao.criterios)
+    return relatorio
+
+def pedido_relatorio(comparacao, opcoes):
+    """Pedido de relatório para `renderizar_pdf`: só a `Comparacao` e as opções, montado no worker do pool."""
+    return {"comparacao": comparacao, "opcoes": opcoes}
+
+def _montar_pedido(relatorio, cronometro):
+    if 'opcoes' not in relatorio:
+        return relatorio
+    with cronometro.etapa('pontuacao'):
+        return montar_comparacao(relatorio['comparacao'], **relatorio['opcoes'])
+
+# --- Aquecimento e prontidão (/ready) ---
+prontidao = Prontidao()
+
+def aquecer():
+    """Prepara o processo para a primeira requisição: renderização, prévia em SVG e a página inicial."""
+    _aquecer_worker()
+    motor_graficos.gerar_svg(["A", "B"], [10, 5], "A")
+    with app.test_request_context('/'):
+        render_template('index.html', opcoes=list(OPCOES_PONTOS.keys()))
+
+def _antes_do_fork():
+    # Conexões SQLite não podem ser herdadas pelos workers; cada um abre as suas
+    if armazenamento is not None:
+        armazenamento.fechar()
 
 # --- Rotas Flask ---
+def _admin_autorizado():
+    token = request.headers.get('X-Token-Admin', '')
+    return TOKEN_ADMIN is not None and hmac.compare_digest(token.encode(), TOKEN_ADMIN.encode())
+
+@app.before_request
+def iniciar_requisicao():
+    g.inicio = time.perf_counter()
+    # Perfilamento sob demanda: cabeçalho "X-Perfil: cprofile|amostragem" ou ?perfil=..., só com token de admin
+    modo = request.headers.get('X-Perfil') or request.args.get('perfil')
+    if modo:
+        if not _admin_autorizado():
+            return jsonify({"error": "Perfilamento restrito a administradores."}), 403
+        try:
+            g.perfilador = criar_perfilador(modo)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        g.perfilador.iniciar()
+
+@app.after_request
+def finalizar_requisicao(resposta):
+    rota = request.url_rule.rule if request.url_rule else 'outras'
+    metrica_requisicoes.observar(time.perf_counter() - g.inicio, rota=rota)
+    metrica_respostas.inc(rota=rota, status=resposta.status_code)
+    perfilador = g.pop('perfilador', None)
+    if perfilador is None:
+        return resposta
+    # A resposta original é descartada; o corpo passa a ser o relatório do perfil
+    perfilador.parar()
+    resposta.close()
+    relatorio = app.response_class(perfilador.relatorio(), mimetype='text/plain')
+    relatorio.headers['X-Perfil-Status'] = str(resposta.status_code)
+    relatorio.headers['Cache-Control'] = 'no-store'
+    return relatorio
+
 @app.route('/')
 def index():
     return render_template('index.html', opcoes=list(OPCOES_PONTOS.keys()))
 
+def _resposta_pdf(pdf, etag, cronometro=None, download_name='comparativo_produtos.pdf'):
+    """Responde com o PDF (bytes ou arquivo aberto), em streaming quando habilitado."""
+    if STREAMING_PDF:
+        arquivo = io.BytesIO(pdf) if isinstance(pdf, bytes) else pdf
+        resposta = resposta_streaming(arquivo, download_name=download_name, etag=etag)
+    else:
+        if not isinstance(pdf, bytes):
+            with pdf:
+                pdf = pdf.read()
+        resposta = send_file(io.BytesIO(pdf), mimetype='application/pdf', as_attachment=True, download_name=download_name)
+        resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    if cronometro is not None:
+        resposta.headers['Server-Timing'] = cronometro.server_timing()
+    return resposta
+
 @app.route('/gerar_pdf', methods=['POST'])
 def gerar_pdf_route():
     try:
-        data = request.get_json()
-        produtos_atuais = data.get('produtos', [])
-        criterios_data = data.get('criterios', [])
-        
-        if not produtos_atuais or not criterios_data:
-            return jsonify({"error": "Dados insuficientes."}), 400
+        cronometro = Cronometro()
+        with cronometro.etapa('json'):
+            data, comparacao = ler_comparacao()
 
-        dados_comparacao = {prod: {"Total": 0, "Criterios": {}} for prod in produtos_atuais}
+        # O mesmo payload sempre gera o mesmo PDF: responder 304 ou servir do cache.
+        # Requisições perfiladas ignoram o cache e renderizam na própria thread, para que o perfil mostre o trabalho real.
+        perfilando = 'perfilador' in g
+        opcoes = opcoes_relatorio(data)
+        chave = chave_comparacao(comparacao, **opcoes)
+        if not perfilando and request.if_none_match.contains(chave):
+            resposta = app.response_class(status=304)
+            resposta.set_etag(chave)
+            return resposta
+        pdf_bytes = None if perfilando else cache_pdf.obter(chave)
+        if pdf_bytes is not None:
+            metrica_pdfs.inc(origem='cache')
+            return _resposta_pdf(pdf_bytes, chave)
+        # Reimpressão: PDF já gerado antes (por exemplo, antes de reiniciar o servidor)
+        guardado = None if perfilando or armazenamento is None else armazenamento.abrir_pdf(chave)
+        if guardado is not None:
+            metrica_pdfs.inc(origem='banco')
+            return _resposta_pdf(guardado, chave)
 
-        for criterio_item in criterios_data:
-            criterio_nome = criterio_item.get('nome').strip()
-            if not criterio_nome: continue
+        relatorio = pedido_relatorio(comparacao, opcoes)
+        pdf, etapas = executar_renderizacao(relatorio, SPOOL_LIMITE_BYTES if STREAMING_PDF else None, na_thread=perfilando)
+        cronometro.etapas.update(etapas)
+        registrar_relatorio(relatorio, pdf, cronometro.etapas)
+        if armazenamento is not None:
+            with cronometro.etapa('armazenamento'):
+                armazenamento.registrar(comparacao, pdf, chave_pdf=chave)
+        # PDFs acima do limite do spool não passam pela memória (nem pelo cache)
+        if isinstance(pdf, bytes):
+            cache_pdf.guardar(chave, pdf)
 
-            for i, produto in enumerate(produtos_atuais):
-                opcao = criterio_item['pontuacoes'][i]
-                pontos = OPCOES_PONTOS.get(opcao, 0)
-                dados_comparacao[produto]["Total"] += pontos
-                dados_comparacao[produto]["Criterios"][criterio_nome] = {"Opcao": opcao, "Pontos": pontos}
-
-        vencedora = max(dados_comparacao, key=lambda p: dados_comparacao[p]['Total'])
-        
-        pdf_buffer = gerar_pdf(dados_comparacao, vencedora, [c['nome'] for c in criterios_data if c['nome'].strip()])
-        
-        return send_file(pdf_buffer, mimetype='application/pdf', as_attachment=True, download_name='comparativo_produtos.pdf')
+        return _resposta_pdf(pdf, chave, cronometro)
 
+    except PayloadInvalido as e:
+        return _resposta_payload_invalido(e)
+    except FilaCheia as e:
+        resposta = jsonify({"error": "Servidor ocupado, tente novamente em instantes."})
+        resposta.status_code = 503
+        resposta.headers['Retry-After'] = str(e.tentar_novamente_em)
+        return resposta
     except Exception as e:
         app.logger.error(f"Erro ao gerar PDF: {e}")
         return jsonify({"error": str(e)}), 500
 
+def _gerar_item_lote(chave, comparacao, opcoes):
+    """Pontua e renderiza uma comparação do lote (em `executor_lote`); erros ficam no manifesto."""
+    pdf_bytes = cache_pdf.obter(chave)
+    if pdf_bytes is not None:
+        metrica_pdfs.inc(origem='cache')
+        return pdf_bytes
+    return _gerar_pdf_tarefa(chave, pedido_relatorio(comparacao, opcoes))
+
+def _lote_em_documento(itens):
+    """Resposta de `/gerar_pdf_lote?formato=pdf`: todas as comparações em um único PDF, na ordem recebida."""
+    relatorios, chaves = [], []
+    try:
+        for indice, item in enumerate(itens):
+            try:
+                comparacao = decodificar_comparacao(item, LIMITES_PAYLOAD)
+            except PayloadInvalido as e:
+                raise type(e)(f"itens[{indice}]: {e}") from None
+            opcoes = opcoes_relatorio(item)
+            chaves.append(chave_comparacao(comparacao, **opcoes))
+            relatorios.append(pedido_relatorio(comparacao, opcoes))
+    except PayloadInvalido as e:
+        return _resposta_payload_invalido(e)
+
+    chave = hashlib.sha256(','.join(chaves).encode('ascii')).hexdigest()
+    if request.if_none_match.contains(chave):
+        resposta = app.response_class(status=304)
+        resposta.set_etag(chave)
+        return resposta
+    try:
+        pdf, etapas = executar_renderizacao({"relatorios": relatorios}, SPOOL_LIMITE_BYTES if STREAMING_PDF else None)
+    except FilaCheia as e:
+        resposta = jsonify({"error": "Servidor ocupado, tente novamente em instantes."})
+        resposta.status_code = 503
+        resposta.headers['Retry-After'] = str(e.tentar_novamente_em)
+        return resposta
+    registrar_relatorio({"relatorios": relatorios}, pdf, etapas)
+    return _resposta_pdf(pdf, chave, download_name='comparativos.pdf')
+
+@app.route('/gerar_pdf_lote', methods=['POST'])
+def gerar_pdf_lote():
+    """Recebe uma lista de payloads de /gerar_pdf e devolve um ZIP, enviado à medida que os PDFs ficam prontos.
+
+    Payloads idênticos são renderizados uma única vez; o `manifesto.json` (último
+    membro do ZIP) diz, para cada item, qual arquivo o contém ou qual foi o erro.
+    Com `?formato=pdf`, devolve um único PDF com todas as comparações.
+    """
+    if request.content_length is not None and request.content_length > LIMITES_PAYLOAD.max_bytes * LOTE_MAX_ITENS:
+        return jsonify({"error": "Lote grande demais."}), 413
+    itens = request.get_json(silent=True)
+    if not isinstance(itens, list) or not itens:
+        return jsonify({"error": "Envie uma lista de comparações."}), 400
+    if len(itens) > LOTE_MAX_ITENS:
+        return jsonify({"error": f"No máximo {LOTE_MAX_ITENS} comparações por lote."}), 413
+    if request.args.get('formato', 'zip') == 'pdf':
+        return _lote_em_documento(itens)
+
+    manifesto = [None] * len(itens)
+    arquivos = {}   # chave -> nome do membro no ZIP
+    futuros = {}    # futuro -> chave
+    for indice, item in enumerate(itens):
+        registro = {"indice": indice}
+        if isinstance(item, dict) and 'id' in item:
+            registro["id"] = item['id']
+        try:
+            comparacao = decodificar_comparacao(item, LIMITES_PAYLOAD)
+        except PayloadInvalido as e:
+            manifesto[indice] = {**registro, "status": "erro", "erro": str(e)}
+            continue
+        opcoes = opcoes_relatorio(item)
+        chave = chave_comparacao(comparacao, **opcoes)
+        if chave not in arquivos:
+            arquivos[chave] = f"{indice + 1:04d}-{chave[:12]}.pdf"
+            futuros[executor_lote.submit(_gerar_item_lote, chave, comparacao, opcoes)] = chave
+        manifesto[indice] = {**registro, "chave": chave, "arquivo": arquivos[chave]}
+
+    def membros():
+        erros = {}
+        try:
+            for futuro in as_completed(futuros):
+                # Fora do dicionário, o futuro (e os bytes do PDF) é liberado depois de enviado, não no fim do ZIP
+                chave = futuros.pop(futuro)
+                try:
+                    yield arquivos[chave], futuro.result()
+                except Exception as e:
+                    app.logger.error(f"Erro ao gerar PDF do lote: {e}")
+                    erros[chave] = str(e)
+        finally:
+            # Cliente desconectou: o que ainda não começou não precisa ser renderizado
+            for futuro in futuros:
+                futuro.cancel()
+        for registro in manifesto:
+            if "chave" in registro:
+                if registro["chave"] in erros:
+                    registro.update(status="erro", erro=erros[registro["chave"]], arquivo=None)
+                else:
+                    registro["status"] = "ok"
+        yield "manifesto.json", json.dumps({"itens": manifesto}, ensure_ascii=False, indent=2).encode('utf-8')
+
+    resposta = app.response_class(zip_em_fluxo(membros()), mimetype='application/zip')
+    resposta.headers['Content-Disposition'] = 'attachment; filename=comparativos.zip'
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta
+
+@app.route('/jobs', methods=['POST'])
+def criar_tarefa():
+    try:
+        data, comparacao = ler_comparacao()
+        opcoes = opcoes_relatorio(data)
+        chave = chave_comparacao(comparacao, **opcoes)
+        tarefa, _ = gerenciador_tarefas.submeter(chave, chave, pedido_relatorio(comparacao, opcoes))
+
+        resposta = jsonify(tarefa.como_dict())
+        resposta.status_code = 202
+        resposta.headers['Location'] = f"/jobs/{tarefa.id}"
+        return resposta
+
+    except PayloadInvalido as e:
+        return _resposta_payload_invalido(e)
+    except Exception as e:
+        app.logger.error(f"Erro ao criar tarefa: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/<id_tarefa>')
+def consultar_tarefa(id_tarefa):
+    tarefa = gerenciador_tarefas.obter(id_tarefa)
+    if tarefa is None:
+        return jsonify({"error": "Tarefa não encontrada ou expirada."}), 404
+    return jsonify(tarefa.como_dict())
+
+@app.route('/jobs/<id_tarefa>/pdf')
+def baixar_tarefa(id_tarefa):
+    tarefa = gerenciador_tarefas.obter(id_tarefa)
+    if tarefa is None:
+        return jsonify({"error": "Tarefa não encontrada ou expirada."}), 404
+    if tarefa.status != CONCLUIDA:
+        return jsonify({"error": "O PDF ainda não está pronto.", "status": tarefa.status}), 409
+    resposta = send_file(tarefa.caminho, mimetype='application/pdf', as_attachment=True, download_name='comparativo_produtos.pdf')
+    resposta.set_etag(tarefa.chave)
+    return resposta
+
+FORMATOS_PREVIA = {'json': 'application/json', 'svg': 'image/svg+xml', 'html': 'text/html'}
+
+def _previa_html(produtos, totais, posicoes, vencedora, svg):
+    linhas = "".join(f"<tr><td>{html.escape(str(p))}</td><td>{t:g} pts</td><td>{pos:g}º</td></tr>"
+                     for p, t, pos in zip(produtos, totais, posicoes))
+    return (f'<div class="previa"><p>VENCEDORA: <b>{html.escape(vencedora)}</b></p>'
+            f'<table><tr><th>Produto</th><th>Total</th><th>Posição</th></tr>{linhas}</table>{svg}</div>')
+
+@app.route('/previa', methods=['POST'])
+def previa():
+    """Totais, vencedora e empates sem gerar o PDF.
+
+    O formato vem de ?formato=json|svg|html ou do cabeçalho Accept (padrão: JSON).
+    """
+    try:
+        _, comparacao = ler_comparacao()
+    except PayloadInvalido as e:
+        return _resposta_payload_invalido(e)
+
+    formato = request.args.get('formato')
+    if formato is None:
+        melhor = request.accept_mimetypes.best_match(list(FORMATOS_PREVIA.values()), default='application/json')
+        formato = next(nome for nome, mimetype in FORMATOS_PREVIA.items() if mimetype == melhor)
+    elif formato not in FORMATOS_PREVIA:
+        return jsonify({"error": f"'formato' deve ser um de: {', '.join(FORMATOS_PREVIA)}."}), 400
+
+    produtos_atuais = list(comparacao.produtos)
+    resultado = comparacao.resultado
+    totais = comparacao.totais
+    vencedora = nome_vencedora(produtos_atuais, resultado)
+
+    if formato == 'json':
+        resposta = jsonify({
+            "produtos": produtos_atuais,
+            "totais": totais,
+            "posicoes": resultado.posicoes.tolist(),
+            "vencedora": vencedora,
+            "vencedoras": [produtos_atuais[i] for i in resultado.vencedoras],
+            "empate": len(resultado.vencedoras) > 1,
+            "empates": [[produtos_atuais[i] for i in grupo] for grupo in resultado.empates],
+            "criterios": len(comparacao.criterios),
+        })
+    else:
+        svg = motor_graficos.gerar_svg(produtos_atuais, totais, vencedora)
+        corpo = svg if formato == 'svg' else _previa_html(produtos_atuais, totais, resultado.posicoes.tolist(), vencedora, svg)
+        resposta = app.response_class(corpo, mimetype=FORMATOS_PREVIA[formato])
+    resposta.headers['Vary'] = 'Accept'
+    return resposta
+
+def _inteiro_opcional(data, campo, padrao=None, minimo=None, maximo=None):
+    """Inteiro opcional do payload; levanta `PayloadInvalido` se não for um inteiro dentro dos limites."""
+    valor = data.get(campo, padrao)
+    if valor is None:
+        return None
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        raise PayloadInvalido(f"'{campo}' deve ser um número inteiro.")
+    if (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo):
+        limites = f"estar entre {minimo} e {maximo}" if maximo is not None else f"ser maior ou igual a {minimo}"
+        raise PayloadInvalido(f"'{campo}' deve {limites}.")
+    return valor
+
+@app.route('/sensibilidade', methods=['POST'])
+def sensibilidade_route():
+    try:
+        data, comparacao = ler_comparacao()
+        amostras = _inteiro_opcional(data, 'amostras', AMOSTRAS_PADRAO, 1, SENSIBILIDADE_MAX_AMOSTRAS)
+        semente = _inteiro_opcional(data, 'semente', minimo=0)
+        variar_pontos = data.get('variar_pontos', True)
+        if not isinstance(variar_pontos, bool):
+            raise PayloadInvalido("'variar_pontos' deve ser true ou false.")
+
+        if not comparacao.criterios:
+            return jsonify({"error": "Dados insuficientes."}), 400
+        resultado = analisar_sensibilidade(comparacao.codigos, amostras=amostras, semente=semente,
+                                           variar_pontos=variar_pontos)
+        return jsonify(resultado.como_dict(comparacao.produtos, comparacao.criterios))
+
+    except PayloadInvalido as e:
+        return _resposta_payload_invalido(e)
+    except Exception as e:
+        app.logger.error(f"Erro na análise de sensibilidade: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/comparacoes')
+def historico_comparacoes():
+    """Histórico (mais recentes primeiro), com filtros opcionais ?produto=, ?criterio= e paginação por ?antes_de=<id>."""
+    limite = min(request.args.get('limite', 50, type=int), 500)
+    return jsonify(armazenamento.historico(produto=request.args.get('produto'), criterio=request.args.get('criterio'),
+                                           limite=limite, antes_de=request.args.get('antes_de', type=int))
+                   if armazenamento else [])
+
+@app.route('/comparacoes/<chave>/pdf')
+def reimprimir_comparacao(chave):
+    guardado = armazenamento.abrir_pdf(chave, da_comparacao=True) if armazenamento else None
+    if guardado is None:
+        return jsonify({"error": "Comparação não encontrada."}), 404
+    return _resposta_pdf(guardado, chave)
+
+@app.route('/ranking')
+def ranking_produtos():
+    ordem = request.args.get('ordem', 'vitorias')
+    if ordem not in ORDENACOES_RANKING:
+        return jsonify({"error": f"'ordem' deve ser um de: {', '.join(ORDENACOES_RANKING)}."}), 400
+    limite = min(request.args.get('limite', 20, type=int), 500)
+    return jsonify(armazenamento.ranking(ordem, limite) if armazenamento else [])
+
+@app.route('/estatisticas')
+def estatisticas():
+    return jsonify({
+        "cache_pdf": cache_pdf.estatisticas(),
+        "graficos": motor_graficos.estatisticas(),
+        "pool_renderizacao": pool_renderizacao.estatisticas() if pool_renderizacao else None,
+        "tarefas": gerenciador_tarefas.estatisticas(),
+        "armazenamento": armazenamento.estatisticas() if armazenamento else None,
+    })
+
+@app.route('/ready')
+def ready():
+    """200 depois do aquecimento; 503 enquanto aquece ou durante o encerramento (drenagem)."""
+    # Sob outro servidor WSGI ninguém chamou `aquecer`: a primeira sondagem o inicia em segundo plano
+    prontidao.aquecer_em_segundo_plano(aquecer)
+    resposta = jsonify(prontidao.como_dict())
+    resposta.status_code = 200 if prontidao.pronto else 503
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta
+
+@app.route('/metrics')
+def metrics():
+    return app.response_class(metricas.texto(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
+    prontidao.aquecer(aquecer)
+    if SERVIDOR_WORKERS > 0:
+        import logging
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(levelname)s %(message)s')
+        import shutil
+        import tempfile
+        # Cada worker publica suas métricas aqui; /metrics, em qualquer worker, soma as de todos
+        diretorio_metricas = tempfile.mkdtemp(prefix='comparador_metricas_')
+        try:
+            ServidorPreFork(app, porta=SERVIDOR_PORTA, workers=SERVIDOR_WORKERS, drenagem=SERVIDOR_DRENAGEM_S,
+                            prontidao=prontidao, antes_do_fork=_antes_do_fork,
+                            ao_iniciar_worker=lambda: metricas.compartilhar(diretorio_metricas),
+                            ao_encerrar_worker=metricas.publicar).servir()
+        finally:
+            shutil.rmtree(diretorio_metricas, ignore_errors=True)
+    else:
+        if pool_renderizacao is not None:
+            pool_renderizacao.aquecer()
+        app.run(host='0.0.0.0', port=SERVIDOR_PORTA)
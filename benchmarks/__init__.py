@@ -0,0 +1 @@
+"""Benchmarks do comparador (executar a partir da raiz do repositório com ``python -m``)."""
@@ -0,0 +1,432 @@
+"""Teste de carga das rotas HTTP do app.
+
+Gerador de carga em ``asyncio`` (HTTP/1.1 sobre ``asyncio.open_connection``,
+sem dependências): ``--concorrencia`` clientes mantêm cada um uma conexão
+aberta e enviam requisições em sequência durante ``--duracao`` segundos,
+sorteando a rota e o tamanho do payload pelos pesos de ``--rotas`` e
+``--tamanhos``. Informa vazão, latências p50/p95/p99, taxa de erros e a
+memória (PSS) do servidor ao longo do tempo, lida em ``/proc`` (o processo
+do servidor mais os filhos: workers do pré-fork e do pool).
+
+Com ``--iniciar`` o app é iniciado localmente (``python app.py``, até
+``/ready`` responder 200) e encerrado no fim; sem ele, a carga vai para
+``--url`` e o PSS só é medido se ``--pid`` for informado.
+
+Exemplos::
+
+    python -m benchmarks.carga --iniciar --duracao 30 --concorrencia 8 --saida benchmarks/carga.json
+    python -m benchmarks.carga --iniciar --workers 4 --rotas gerar_pdf=1 --tamanhos 3x5=9 40x1000=1
+    python -m benchmarks.carga --url http://127.0.0.1:5000 --pid 1234 --rota metrics=GET:/metrics
+    python -m benchmarks.carga --iniciar --baseline benchmarks/carga.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rota -> (método, caminho, corpo): corpo None, 'payload' (uma comparação) ou 'lote' (lista de comparações)
+ROTAS = {
+    "index": ("GET", "/", None),
+    "gerar_pdf": ("POST", "/gerar_pdf", "payload"),
+    "previa": ("POST", "/previa?formato=json", "payload"),
+    "sensibilidade": ("POST", "/sensibilidade", "payload"),
+    "lote": ("POST", "/gerar_pdf_lote?formato=pdf", "lote"),
+    "ready": ("GET", "/ready", None),
+}
+ROTAS_PADRAO = ["gerar_pdf=8", "index=1", "previa=1"]
+TAMANHOS_PADRAO = ["3x5=6", "10x50=3", "40x200=1"]
+ITENS_LOTE = 3
+MARCADOR = b"@@N@@"
+
+
+# --- Payloads ---
+
+def _pesos(especificacoes, conhecidos=None):
+    """``["nome=peso", ...]`` -> (nomes, pesos); sem ``=peso`` vale 1."""
+    nomes, pesos = [], []
+    for item in especificacoes:
+        nome, _, peso = item.partition('=')
+        if conhecidos is not None and nome not in conhecidos:
+            raise SystemExit(f"Rota desconhecida: {nome} (conhecidas: {', '.join(conhecidos)})")
+        nomes.append(nome)
+        pesos.append(float(peso or 1))
+    return nomes, pesos
+
+
+def preparar_corpos(tamanhos):
+    """Serializa uma vez cada tamanho de payload, com um marcador no nome do primeiro produto.
+
+    Trocar o marcador por um contador torna cada requisição única (sem acerto
+    no cache de PDFs) sem serializar o JSON de novo a cada envio.
+    """
+    from comparador.sintetico import gerar_payload
+
+    corpos = {}
+    for tamanho in tamanhos:
+        n_produtos, n_criterios = (int(x) for x in tamanho.lower().split('x'))
+        payload = gerar_payload(n_produtos, n_criterios)
+        payload["produtos"][0] += " #" + MARCADOR.decode()
+        texto = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        corpos[tamanho] = {"payload": texto, "lote": b"[" + b",".join([texto] * ITENS_LOTE) + b"]"}
+    return corpos
+
+
+# --- Cliente HTTP/1.1 mínimo ---
+
+class Conexao:
+    """Uma conexão keep-alive; reabre sozinha quando o servidor a fecha."""
+
+    def __init__(self, host, porta):
+        self.host, self.porta = host, porta
+        self.leitor = self.escritor = None
+
+    async def _abrir(self):
+        self.leitor, self.escritor = await asyncio.open_connection(self.host, self.porta, limit=2 ** 20)
+
+    def fechar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+        self.leitor = self.escritor = None
+
+    async def requisicao(self, metodo, caminho, corpo=None):
+        """Envia a requisição e lê a resposta inteira; retorna (status, bytes do corpo)."""
+        if self.escritor is None:
+            await self._abrir()
+        cabecalho = [f"{metodo} {caminho} HTTP/1.1", f"Host: {self.host}:{self.porta}", "Accept: */*"]
+        if corpo is not None:
+            cabecalho += ["Content-Type: application/json", f"Content-Length: {len(corpo)}"]
+        self.escritor.write(("\r\n".join(cabecalho) + "\r\n\r\n").encode('latin-1'))
+        if corpo is not None:
+            self.escritor.write(corpo)
+        await self.escritor.drain()
+
+        linha = await self.leitor.readline()
+        if not linha:
+            raise ConnectionError("conexão fechada pelo servidor")
+        status = int(linha.split()[1])
+        cabecalhos = {}
+        while True:
+            linha = await self.leitor.readline()
+            if linha in (b"\r\n", b"\n", b""):
+                break
+            nome, _, valor = linha.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+
+        if 'content-length' in cabecalhos:
+            tamanho = len(await self.leitor.readexactly(int(cabecalhos['content-length'])))
+        elif cabecalhos.get('transfer-encoding', '').lower() == 'chunked':
+            tamanho = 0
+            while True:
+                bloco = int((await self.leitor.readline()).split(b";")[0], 16)
+                if bloco:
+                    tamanho += len(await self.leitor.readexactly(bloco))
+                await self.leitor.readline()
+                if not bloco:
+                    break
+        else:
+            tamanho = len(await self.leitor.read())
+            cabecalhos['connection'] = 'close'
+        if cabecalhos.get('connection', '').lower() == 'close':
+            self.fechar()
+        return status, tamanho
+
+
+# --- Medição ---
+
+def percentil(ordenadas, p):
+    if not ordenadas:
+        return None
+    return ordenadas[min(len(ordenadas) - 1, int(round(p * (len(ordenadas) - 1))))]
+
+
+def _pids_da_arvore(pid):
+    """``pid`` e todos os descendentes, a partir do ppid de cada processo em /proc."""
+    filhos = {}
+    for entrada in os.listdir('/proc'):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entrada}/stat', 'rb') as arquivo:
+                # O nome do processo (2º campo) pode ter espaços: o ppid vem logo depois do ')'
+                ppid = int(arquivo.read().rsplit(b')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        filhos.setdefault(ppid, []).append(int(entrada))
+    pids, pendentes = [], [pid]
+    while pendentes:
+        atual = pendentes.pop()
+        pids.append(atual)
+        pendentes.extend(filhos.get(atual, []))
+    return pids
+
+
+def pss_mb(pid):
+    """PSS somado do processo e de seus descendentes, em MB (``None`` fora do Linux ou se o processo sumiu).
+
+    O PSS divide cada página compartilhada entre os processos que a usam,
+    então as páginas herdadas no ``fork`` (copy-on-write) contam uma vez
+    só; a soma dos RSS as contaria uma vez por worker.
+    """
+    total = 0
+    encontrado = False
+    for atual in _pids_da_arvore(pid):
+        try:
+            with open(f'/proc/{atual}/smaps_rollup') as arquivo:
+                for linha in arquivo:
+                    if linha.startswith('Pss:'):
+                        total += int(linha.split()[1])
+                        encontrado = True
+                        break
+        except OSError:
+            continue
+    return total / 1024 if encontrado else None
+
+
+class Resultados:
+    def __init__(self):
+        self.latencias = {}    # rota -> [s]
+        self.erros = {}        # rota -> {motivo: quantidade}
+        self.bytes = 0
+        self.serie = []        # uma entrada por intervalo: concluídas, erros, PSS
+        self._intervalo = {"concluidas": 0, "erros": 0}
+
+    def registrar(self, rota, duracao, erro=None, tamanho=0):
+        self.latencias.setdefault(rota, []).append(duracao)
+        self.bytes += tamanho
+        self._intervalo["concluidas"] += 1
+        if erro is not None:
+            contagem = self.erros.setdefault(rota, {})
+            contagem[erro] = contagem.get(erro, 0) + 1
+            self._intervalo["erros"] += 1
+
+    def fechar_intervalo(self, t, duracao, pss):
+        concluidas, erros = self._intervalo["concluidas"], self._intervalo["erros"]
+        self.serie.append({"t_s": round(t, 2), "req_s": concluidas / duracao, "erros": erros, "pss_mb": pss})
+        self._intervalo = {"concluidas": 0, "erros": 0}
+
+    def resumo(self, duracao):
+        def estatisticas(amostras, erros):
+            ordenadas = sorted(amostras)
+            return {
+                "requisicoes": len(ordenadas),
+                "req_s": len(ordenadas) / duracao,
+                "taxa_erros": erros / len(ordenadas) if ordenadas else 0.0,
+                "p50_ms": _ms(percentil(ordenadas, 0.50)),
+                "p95_ms": _ms(percentil(ordenadas, 0.95)),
+                "p99_ms": _ms(percentil(ordenadas, 0.99)),
+                "max_ms": _ms(ordenadas[-1] if ordenadas else None),
+            }
+
+        rotas = {rota: {**estatisticas(amostras, sum(self.erros.get(rota, {}).values())), "erros": self.erros.get(rota, {})}
+                 for rota, amostras in sorted(self.latencias.items())}
+        todas = [d for amostras in self.latencias.values() for d in amostras]
+        total = estatisticas(todas, sum(sum(c.values()) for c in self.erros.values()))
+        total["mb_recebidos"] = self.bytes / 2 ** 20
+        pss = [p["pss_mb"] for p in self.serie if p["pss_mb"] is not None]
+        if pss:
+            total["pss_inicial_mb"], total["pss_max_mb"], total["pss_final_mb"] = pss[0], max(pss), pss[-1]
+        return {"total": total, "rotas": rotas, "serie": self.serie}
+
+
+def _ms(segundos):
+    return None if segundos is None else round(segundos * 1000, 2)
+
+
+# --- Execução ---
+
+async def _cliente(host, porta, rotas, pesos_rotas, corpos, pesos_tamanhos, fim, resultados, contador, sorteio):
+    conexao = Conexao(host, porta)
+    tamanhos = list(corpos)
+    try:
+        while time.perf_counter() < fim:
+            rota = sorteio.choices(list(rotas), pesos_rotas)[0]
+            metodo, caminho, tipo_corpo = rotas[rota]
+            corpo = None
+            if tipo_corpo is not None:
+                tamanho = sorteio.choices(tamanhos, pesos_tamanhos)[0]
+                corpo = corpos[tamanho][tipo_corpo].replace(MARCADOR, str(next(contador)).encode())
+            inicio = time.perf_counter()
+            try:
+                status, recebidos = await conexao.requisicao(metodo, caminho, corpo)
+                erro = None if status < 400 else f"HTTP {status}"
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                conexao.fechar()
+                recebidos, erro = 0, type(e).__name__
+            resultados.registrar(rota, time.perf_counter() - inicio, erro, recebidos)
+    finally:
+        conexao.fechar()
+
+
+async def _amostrar(pid, inicio, fim, intervalo, resultados):
+    anterior = inicio
+    while anterior < fim:
+        await asyncio.sleep(max(min(anterior + intervalo, fim) - time.perf_counter(), 0))
+        agora = time.perf_counter()
+        resultados.fechar_intervalo(agora - inicio, agora - anterior, pss_mb(pid) if pid else None)
+        anterior = agora
+
+
+async def executar_carga(url, rotas, pesos_rotas, corpos, pesos_tamanhos, concorrencia, duracao, pid=None,
+                         intervalo=1.0, semente=0):
+    partes = urlsplit(url)
+    host, porta = partes.hostname or '127.0.0.1', partes.port or 80
+    resultados = Resultados()
+    inicio = time.perf_counter()
+    fim = inicio + duracao
+    contador = iter(range(sys.maxsize))
+    clientes = [_cliente(host, porta, rotas, pesos_rotas, corpos, pesos_tamanhos, fim, resultados, contador,
+                         random.Random(semente + i))
+                for i in range(concorrencia)]
+    await asyncio.gather(_amostrar(pid, inicio, fim, intervalo, resultados), *clientes)
+    return resultados.resumo(time.perf_counter() - inicio)
+
+
+def iniciar_servidor(porta, workers, processos, tempo_limite=120):
+    """Inicia ``python app.py`` e espera ``/ready`` responder 200; retorna o ``Popen``."""
+    ambiente = dict(os.environ, COMPARADOR_PORTA=str(porta), COMPARADOR_WORKERS=str(workers), COMPARADOR_BANCO="",
+                    COMPARADOR_DRENAGEM_S="0")
+    if processos is not None:
+        ambiente["COMPARADOR_PROCESSOS"] = str(processos)
+    servidor = subprocess.Popen([sys.executable, "app.py"], cwd=RAIZ, env=ambiente,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    async def pronto():
+        conexao = Conexao('127.0.0.1', porta)
+        try:
+            return (await conexao.requisicao("GET", "/ready"))[0] == 200
+        except OSError:
+            return False
+        finally:
+            conexao.fechar()
+
+    limite = time.monotonic() + tempo_limite
+    while time.monotonic() < limite:
+        if servidor.poll() is not None:
+            raise RuntimeError(f"o servidor terminou ao iniciar (código {servidor.returncode})")
+        if asyncio.run(pronto()):
+            return servidor
+        time.sleep(0.25)
+    encerrar_servidor(servidor)
+    raise RuntimeError(f"/ready não respondeu 200 em {tempo_limite}s")
+
+
+def encerrar_servidor(servidor, tempo_limite=30):
+    # SIGINT: o servidor do Flask sai por KeyboardInterrupt e encerra o pool de renderização
+    # (um SIGTERM o derruba e deixa os workers do pool órfãos); o pré-fork trata os dois sinais igual
+    servidor.send_signal(signal.SIGINT)
+    try:
+        servidor.wait(tempo_limite)
+    except subprocess.TimeoutExpired:
+        servidor.kill()
+        servidor.wait()
+
+
+def comparar(resultado, baseline):
+    """Linhas de comparação da vazão e das latências com um resultado salvo."""
+    linhas = []
+    for rota, atual in [("total", resultado["total"])] + list(resultado["rotas"].items()):
+        anterior = baseline["total"] if rota == "total" else baseline.get("rotas", {}).get(rota)
+        if not anterior:
+            continue
+        partes = []
+        for campo in ("req_s", "p50_ms", "p99_ms"):
+            if atual.get(campo) and anterior.get(campo):
+                partes.append(f"{campo}={atual[campo]:.1f} ({atual[campo] / anterior[campo] - 1:+.0%})")
+        linhas.append(f"{rota:>14}  " + "  ".join(partes))
+    return linhas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--iniciar', action='store_true', help="inicia o app localmente (porta de --url) e o encerra no fim")
+    parser.add_argument('--workers', type=int, default=0, help="com --iniciar: COMPARADOR_WORKERS (0 = servidor do Flask)")
+    parser.add_argument('--processos', type=int, help="com --iniciar: COMPARADOR_PROCESSOS")
+    parser.add_argument('--pid', type=int, help="processo do servidor para medir o PSS (sem --iniciar)")
+    parser.add_argument('--concorrencia', type=int, default=4, help="clientes simultâneos")
+    parser.add_argument('--duracao', type=float, default=20.0, help="segundos de carga")
+    parser.add_argument('--rotas', nargs='+', default=ROTAS_PADRAO, metavar='ROTA=PESO')
+    parser.add_argument('--rota', nargs='*', default=[], metavar='NOME=METODO:CAMINHO',
+                        help="rota extra (POST envia o payload de comparação)")
+    parser.add_argument('--tamanhos', nargs='+', default=TAMANHOS_PADRAO, metavar='PRODUTOSxCRITERIOS=PESO')
+    parser.add_argument('--intervalo', type=float, default=1.0, help="segundos entre amostras da série (vazão e PSS)")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', help="grava os resultados em JSON")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparação")
+    args = parser.parse_args(argv)
+
+    rotas_conhecidas = dict(ROTAS)
+    for item in args.rota:
+        nome, _, destino = item.partition('=')
+        metodo, _, caminho = destino.partition(':')
+        rotas_conhecidas[nome] = (metodo.upper(), caminho, "payload" if metodo.upper() == "POST" else None)
+        if not any(r.partition('=')[0] == nome for r in args.rotas):
+            args.rotas.append(f"{nome}=1")
+    nomes_rotas, pesos_rotas = _pesos(args.rotas, rotas_conhecidas)
+    rotas = {nome: rotas_conhecidas[nome] for nome in nomes_rotas}
+    tamanhos, pesos_tamanhos = _pesos(args.tamanhos)
+    corpos = preparar_corpos(tamanhos)
+
+    servidor = None
+    pid = args.pid
+    if args.iniciar:
+        porta = urlsplit(args.url).port or 5000
+        print(f"Iniciando o app na porta {porta} (workers={args.workers})...")
+        servidor = iniciar_servidor(porta, args.workers, args.processos)
+        pid = servidor.pid
+    try:
+        print(f"Carga: {args.concorrencia} clientes por {args.duracao:.0f}s em {args.url} "
+              f"(rotas {' '.join(args.rotas)}; tamanhos {' '.join(args.tamanhos)})")
+        resultado = asyncio.run(executar_carga(args.url, rotas, pesos_rotas, corpos, pesos_tamanhos, args.concorrencia,
+                                               args.duracao, pid, args.intervalo, args.semente))
+    finally:
+        if servidor is not None:
+            encerrar_servidor(servidor)
+
+    total = resultado["total"]
+    print(f"{'rota':>14}  {'req':>6}  {'req/s':>7}  {'erros':>6}  {'p50':>8}  {'p95':>8}  {'p99':>8}")
+    for rota, r in [("total", total)] + list(resultado["rotas"].items()):
+        print(f"{rota:>14}  {r['requisicoes']:>6}  {r['req_s']:>7.1f}  {r['taxa_erros']:>6.1%}  "
+              f"{r['p50_ms'] or 0:>6.1f}ms  {r['p95_ms'] or 0:>6.1f}ms  {r['p99_ms'] or 0:>6.1f}ms")
+    for rota, r in resultado["rotas"].items():
+        for motivo, quantidade in r["erros"].items():
+            print(f"  {rota}: {quantidade}× {motivo}")
+    if "pss_max_mb" in total:
+        print(f"PSS do servidor: {total['pss_inicial_mb']:.0f}MB no início, {total['pss_max_mb']:.0f}MB no pico, "
+              f"{total['pss_final_mb']:.0f}MB no fim")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            baseline = json.load(arquivo)["resultado"]
+        print("Comparação com o baseline:")
+        for linha in comparar(resultado, baseline):
+            print(linha)
+
+    if args.saida:
+        configuracao = {campo: getattr(args, campo) for campo in
+                        ("url", "workers", "processos", "concorrencia", "duracao", "rotas", "tamanhos", "semente")}
+        dados = {
+            "data": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "maquina": {"sistema": platform.platform(), "cpus": os.cpu_count()},
+            "configuracao": configuracao,
+            "resultado": resultado,
+        }
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(dados, arquivo, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.saida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
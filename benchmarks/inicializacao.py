@@ -0,0 +1,128 @@
+"""Benchmark do tempo de inicialização (``python -X importtime``).
+
+Importa cada ponto de entrada em um interpretador novo, várias vezes, e
+mede o tempo cumulativo de importação e o tempo total do processo. Falha
+(código de saída 1) se a mediana passar do orçamento do alvo ou se algum
+módulo pesado da renderização (ReportLab, Matplotlib) for importado antes
+do primeiro PDF.
+
+Exemplos::
+
+    python -m benchmarks.inicializacao
+    python -m benchmarks.inicializacao --alvos app --orcamento app=300 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# Alvo -> módulo importado
+ALVOS = {
+    "app": "app",
+    "gui": "comparador_produtos_gui",
+    "lote": "comparador.lote",
+}
+# Mediana máxima do tempo cumulativo de importação, em ms
+ORCAMENTOS_PADRAO = {"app": 400, "gui": 250, "lote": 150}
+# Pacotes que só podem ser carregados na primeira renderização
+PROIBIDOS = ("reportlab", "matplotlib", "PIL")
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def ler_importtime(saida):
+    """Lista de (modulo, self_us, cumulativo_us, profundidade) das linhas de ``-X importtime``."""
+    modulos = []
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:"):
+            continue
+        partes = linha[len("import time:"):].split("|")
+        if len(partes) != 3 or not partes[0].strip().isdigit():
+            continue  # cabeçalho
+        nome = partes[2].rstrip()
+        profundidade = (len(nome) - len(nome.lstrip())) // 2
+        modulos.append((nome.strip(), int(partes[0]), int(partes[1]), profundidade))
+    return modulos
+
+
+def medir_importacao(modulo):
+    """Importa ``modulo`` em um processo novo; retorna (tempo total em s, módulos importados)."""
+    ambiente = dict(os.environ, COMPARADOR_PROCESSOS="0", COMPARADOR_BANCO="", PYTHONPATH=RAIZ)
+    inicio = time.perf_counter()
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                              cwd=RAIZ, env=ambiente, capture_output=True, text=True)
+    duracao = time.perf_counter() - inicio
+    if processo.returncode != 0:
+        raise RuntimeError(f"import {modulo} falhou:\n{processo.stderr[-2000:]}")
+    return duracao, ler_importtime(processo.stderr)
+
+
+def medir_alvo(modulo, repeticoes, top):
+    totais, importacoes = [], []
+    por_pacote = defaultdict(list)
+    modulos = []
+    for _ in range(repeticoes):
+        total, modulos = medir_importacao(modulo)
+        totais.append(total)
+        importacoes.append(next(c for nome, _, c, p in reversed(modulos) if nome == modulo and p == 0) / 1e6)
+        soma = defaultdict(int)
+        for nome, proprio, _, _ in modulos:
+            soma[nome.split(".")[0]] += proprio
+        for pacote, us in soma.items():
+            por_pacote[pacote].append(us / 1e6)
+    # Pacotes ordenados pela mediana do tempo próprio somado (o que cada um custa de fato)
+    mais_lentos = sorted(((pacote, statistics.median(v)) for pacote, v in por_pacote.items()), key=lambda p: -p[1])
+    carregados = {nome.split(".")[0] for nome, _, _, _ in modulos}
+    return {
+        "importacao_s": statistics.median(importacoes),
+        "processo_s": statistics.median(totais),
+        "modulos": len(modulos),
+        "pacotes_mais_lentos": [{"pacote": p, "s": s} for p, s in mais_lentos[:top]],
+        "proibidos_carregados": sorted(carregados.intersection(PROIBIDOS)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--alvos', nargs='+', default=list(ALVOS), choices=list(ALVOS))
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--orcamento', nargs='*', default=[], metavar='ALVO=MS',
+                        help="substitui o orçamento de um alvo (mediana do tempo de importação, em ms)")
+    parser.add_argument('--top', type=int, default=8, help="pacotes mais lentos listados por alvo")
+    parser.add_argument('--saida', help="grava os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    orcamentos = dict(ORCAMENTOS_PADRAO)
+    for item in args.orcamento:
+        alvo, _, valor = item.partition('=')
+        orcamentos[alvo] = float(valor)
+
+    resultados, falhas = {}, []
+    for alvo in args.alvos:
+        resultado = resultados[alvo] = medir_alvo(ALVOS[alvo], args.repeticoes, args.top)
+        resultado["orcamento_ms"] = orcamentos.get(alvo)
+        importacao_ms = resultado["importacao_s"] * 1000
+        print(f"{alvo:>6}  importação={importacao_ms:.0f}ms (orçamento {resultado['orcamento_ms']:.0f}ms)  "
+              f"processo={resultado['processo_s'] * 1000:.0f}ms  módulos={resultado['modulos']}")
+        print("        " + ", ".join(f"{p['pacote']}={p['s'] * 1000:.0f}ms" for p in resultado["pacotes_mais_lentos"]))
+        if resultado["orcamento_ms"] is not None and importacao_ms > resultado["orcamento_ms"]:
+            falhas.append(f"{alvo}: {importacao_ms:.0f}ms acima do orçamento de {resultado['orcamento_ms']:.0f}ms")
+        if resultado["proibidos_carregados"]:
+            falhas.append(f"{alvo}: importa {', '.join(resultado['proibidos_carregados'])} na inicialização")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({"python": sys.version.split()[0], "resultados": resultados}, arquivo, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.saida}")
+
+    for falha in falhas:
+        print(f"FALHA {falha}")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Benchmark da geração de relatórios.
+
+Mede, para cada tamanho de comparação gerado por ``comparador.sintetico``:
+pontuação, gráfico, montagem da tabela, ``doc.build`` e a ida e volta
+completa de ``/gerar_pdf`` pelo cliente de testes do Flask. Os resultados
+são gravados em JSON e podem ser comparados com um baseline salvo.
+
+Exemplos::
+
+    python -m benchmarks.relatorio --salvar-baseline benchmarks/baseline.json
+    python -m benchmarks.relatorio --baseline benchmarks/baseline.json --limite 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+TAMANHOS_PADRAO = ["3x5", "3x50", "10x200", "40x1000"]
+
+
+def _resumo(amostras):
+    ordenadas = sorted(amostras)
+    p95 = ordenadas[min(len(ordenadas) - 1, int(round(0.95 * (len(ordenadas) - 1))))]
+    return {
+        "mediana_s": statistics.median(ordenadas),
+        "media_s": statistics.fmean(ordenadas),
+        "min_s": ordenadas[0],
+        "p95_s": p95,
+        "repeticoes": len(ordenadas),
+    }
+
+
+def medir_caso(app_modulo, n_produtos, n_criterios, distribuicao, semente, repeticoes):
+    from comparador.modelo import decodificar_comparacao
+    from comparador.sintetico import gerar_payload
+
+    payload = gerar_payload(n_produtos, n_criterios, distribuicao, semente)
+    cliente = app_modulo.app.test_client()
+    etapas = {"pontuacao": [], "tabela": [], "grafico": [], "build": [], "pdf_total": [], "rota": []}
+    tamanho_pdf = None
+
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        relatorio = app_modulo.montar_comparacao(decodificar_comparacao(payload))
+        etapas["pontuacao"].append(time.perf_counter() - inicio)
+
+        # Sem memoização do gráfico, para medir a renderização de verdade
+        app_modulo.motor_graficos.limpar_cache()
+        inicio = time.perf_counter()
+        pdf_bytes, tempos = app_modulo.renderizar_pdf(relatorio)
+        etapas["pdf_total"].append(time.perf_counter() - inicio)
+        for nome in ("tabela", "grafico", "build"):
+            etapas[nome].append(tempos.get(nome, 0.0))
+        tamanho_pdf = len(pdf_bytes)
+
+        app_modulo.motor_graficos.limpar_cache()
+        app_modulo.cache_pdf.limpar()
+        inicio = time.perf_counter()
+        resposta = cliente.post('/gerar_pdf', json=payload)
+        resposta.get_data()
+        etapas["rota"].append(time.perf_counter() - inicio)
+        if resposta.status_code != 200:
+            raise RuntimeError(f"/gerar_pdf respondeu {resposta.status_code}: {resposta.get_data(as_text=True)[:200]}")
+
+    resultado = {nome: _resumo(amostras) for nome, amostras in etapas.items()}
+    resultado["bytes_pdf"] = tamanho_pdf
+    return resultado
+
+
+def comparar(resultados, baseline, limite):
+    """Lista de regressões: (caso, etapa, mediana_base, mediana_atual, razão)."""
+    regressoes = []
+    for caso, etapas in resultados.items():
+        base_caso = baseline.get("resultados", {}).get(caso)
+        if not base_caso:
+            continue
+        for etapa, resumo in etapas.items():
+            if not isinstance(resumo, dict) or etapa not in base_caso:
+                continue
+            base = base_caso[etapa]["mediana_s"]
+            atual = resumo["mediana_s"]
+            # Etapas abaixo de 1 ms oscilam demais para servir de sinal
+            if base > 0.001 and atual / base > 1 + limite:
+                regressoes.append((caso, etapa, base, atual, atual / base))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--tamanhos', nargs='+', default=TAMANHOS_PADRAO, help="casos no formato PRODUTOSxCRITERIOS")
+    parser.add_argument('--distribuicao', default='uniforme')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--processos', type=int, default=0, help="workers do pool de renderização (0 = na thread)")
+    parser.add_argument('--saida', default='benchmarks/resultados.json')
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparação")
+    parser.add_argument('--limite', type=float, default=0.20, help="piora relativa tolerada na mediana (0.20 = 20%%)")
+    parser.add_argument('--salvar-baseline', metavar='ARQUIVO', help="grava também os resultados como novo baseline")
+    args = parser.parse_args(argv)
+
+    # Configurar o app antes de importá-lo
+    os.environ['COMPARADOR_PROCESSOS'] = str(args.processos)
+    os.environ['COMPARADOR_BANCO'] = ''  # sem histórico: toda ida e volta renderiza o PDF
+    import app as app_modulo
+
+    resultados = {}
+    for caso in args.tamanhos:
+        n_produtos, n_criterios = (int(v) for v in caso.lower().split('x'))
+        resultados[caso] = medir_caso(app_modulo, n_produtos, n_criterios, args.distribuicao, args.semente, args.repeticoes)
+        linha = "  ".join(f"{etapa}={resultados[caso][etapa]['mediana_s'] * 1000:.1f}ms"
+                          for etapa in ("pontuacao", "tabela", "grafico", "build", "rota"))
+        print(f"{caso:>10}  {linha}  pdf={resultados[caso]['bytes_pdf']}B")
+
+    if app_modulo.pool_renderizacao is not None:
+        app_modulo.pool_renderizacao.encerrar()
+
+    documento = {
+        "metadados": {
+            "data": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "plataforma": platform.platform(),
+            "processos": args.processos,
+            "distribuicao": args.distribuicao,
+            "semente": args.semente,
+        },
+        "resultados": resultados,
+    }
+    for destino in filter(None, (args.saida, args.salvar_baseline)):
+        with open(destino, 'w', encoding='utf-8') as arquivo:
+            json.dump(documento, arquivo, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {destino}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            baseline = json.load(arquivo)
+        regressoes = comparar(resultados, baseline, args.limite)
+        for caso, etapa, base, atual, razao in regressoes:
+            print(f"REGRESSÃO {caso}/{etapa}: {base * 1000:.1f}ms -> {atual * 1000:.1f}ms ({razao:.2f}x)")
+        if regressoes:
+            return 1
+        print(f"Sem regressões acima de {args.limite:.0%} em relação a {args.baseline}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Relatório do tamanho dos PDFs gerados.
+
+Gera o relatório web de cada tamanho de comparação (``comparador.sintetico``)
+em várias variantes e compara os bytes com a saída anterior ao perfil
+compacto (``legado``: streams em ASCII85 e gráfico PNG RGBA):
+
+* ``png``: streams binários, gráfico PNG RGBA;
+* ``compacto``: streams binários, gráfico PNG quantizado (o padrão do app);
+* ``vetorial``: streams binários, gráfico vetorial do ReportLab.
+
+Mede também um lote de comparações em PDFs separados contra um único
+documento (``gerar_pdf_varios``), e confere as fontes de cada PDF: fontes
+embutidas precisam ser subconjuntos (nome com prefixo ``ABCDEF+``); as
+14 fontes padrão do PDF não são embutidas. Sai com código 1 se alguma
+fonte for embutida inteira.
+
+Exemplos::
+
+    python -m benchmarks.tamanho
+    python -m benchmarks.tamanho --tamanhos 3x5 40x1000 --lote 20 --saida benchmarks/tamanho.json
+"""
+import argparse
+import copy
+import json
+import os
+import re
+import sys
+
+TAMANHOS_PADRAO = ["3x5", "10x50", "40x1000"]
+VARIANTES = ("legado", "png", "compacto", "vetorial")
+
+# O ReportLab grava os dicionários dos objetos sem compressão, então as fontes aparecem direto nos bytes
+_BASE_FONT = re.compile(rb'/BaseFont /([^\s/<>\[\]]+)')
+_DESCRITOR = re.compile(rb'<<[^<>]*?/FontFile[23]? [^<>]*?>>', re.S)
+_NOME_FONTE = re.compile(rb'/FontName /([^\s/<>\[\]]+)')
+_SUBCONJUNTO = re.compile(r'^[A-Z]{6}\+')
+
+
+def fontes(pdf):
+    """Fontes do PDF: (nomes referenciados, nomes embutidos inteiros, sem subconjunto)."""
+    nomes = sorted({m.decode('latin-1') for m in _BASE_FONT.findall(pdf)})
+    inteiras = []
+    for descritor in _DESCRITOR.findall(pdf):
+        nome = _NOME_FONTE.search(descritor)
+        nome = nome.group(1).decode('latin-1') if nome else '?'
+        if not _SUBCONJUNTO.match(nome):
+            inteiras.append(nome)
+    return nomes, sorted(set(inteiras))
+
+
+def _modelos(app_modulo):
+    png = copy.copy(app_modulo.MODELO_RELATORIO)
+    png.paleta_grafico = None
+    compacto = copy.copy(app_modulo.MODELO_RELATORIO)
+    compacto.paleta_grafico = 16
+    return png, compacto
+
+
+def gerar_variante(variante, relatorio, modelos):
+    from reportlab import rl_config
+
+    from comparador.relatorio import gerar_pdf
+
+    png, compacto = modelos
+    modelo = compacto if variante == 'compacto' else png
+    # A85 é uma opção global do ReportLab: ligada só durante a variante legada
+    rl_config.useA85 = int(variante == 'legado')
+    try:
+        return gerar_pdf(**relatorio, modelo=modelo, grafico_vetorial=variante == 'vetorial').getvalue()
+    finally:
+        rl_config.useA85 = 0
+
+
+def medir_lote(app_modulo, modelo, n_itens, n_produtos, n_criterios):
+    from comparador.modelo import decodificar_comparacao
+    from comparador.relatorio import gerar_pdf, gerar_pdf_varios
+    from comparador.sintetico import gerar_payload
+
+    # Metade dos itens repete uma comparação anterior (mesmo gráfico), como em lotes reais com reenvios
+    sementes = [i % max(n_itens // 2, 1) for i in range(n_itens)]
+    relatorios = [app_modulo.montar_comparacao(decodificar_comparacao(gerar_payload(n_produtos, n_criterios, semente=s)))
+                  for s in sementes]
+    separados = sum(len(gerar_pdf(**r, modelo=modelo).getvalue()) for r in relatorios)
+    documento = gerar_pdf_varios(relatorios, modelo).getvalue()
+    return {"itens": n_itens, "separados_bytes": separados, "documento_bytes": len(documento),
+            "imagens_no_documento": documento.count(b'/Subtype /Image')}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--tamanhos', nargs='+', default=TAMANHOS_PADRAO, help="casos no formato PRODUTOSxCRITERIOS")
+    parser.add_argument('--lote', type=int, default=10, help="comparações 3x5 no teste de documento único (0 = pular)")
+    parser.add_argument('--saida', help="grava os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    os.environ['COMPARADOR_PROCESSOS'] = '0'
+    os.environ['COMPARADOR_BANCO'] = ''
+    import app as app_modulo
+    from comparador.modelo import decodificar_comparacao
+    from comparador.relatorio import configurar_reportlab
+    from comparador.sintetico import gerar_payload
+
+    configurar_reportlab()  # antes da variante legada, que religa o ASCII85 temporariamente
+
+    modelos = _modelos(app_modulo)
+    resultados, falhas = {}, []
+    print(f"{'caso':>9}  " + "  ".join(f"{v:>16}" for v in VARIANTES))
+    for caso in args.tamanhos:
+        n_produtos, n_criterios = (int(x) for x in caso.lower().split('x'))
+        relatorio = app_modulo.montar_comparacao(decodificar_comparacao(gerar_payload(n_produtos, n_criterios)))
+        resultado = resultados[caso] = {}
+        for variante in VARIANTES:
+            pdf = gerar_variante(variante, relatorio, modelos)
+            nomes, inteiras = fontes(pdf)
+            resultado[variante] = {"bytes": len(pdf), "fontes": nomes, "fontes_inteiras": inteiras}
+            if inteiras:
+                falhas.append(f"{caso}/{variante}: fontes embutidas sem subconjunto: {', '.join(inteiras)}")
+        legado = resultado["legado"]["bytes"]
+        print(f"{caso:>9}  " + "  ".join(
+            f"{resultado[v]['bytes'] / 1024:>8.1f}KB ({resultado[v]['bytes'] / legado - 1:+4.0%})" for v in VARIANTES))
+
+    lote = None
+    if args.lote:
+        lote = medir_lote(app_modulo, modelos[1], args.lote, 3, 5)
+        print(f"Lote de {lote['itens']}: {lote['separados_bytes'] / 1024:.1f}KB em PDFs separados, "
+              f"{lote['documento_bytes'] / 1024:.1f}KB em um documento ({lote['imagens_no_documento']} imagens)")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({"resultados": resultados, "lote": lote}, arquivo, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.saida}")
+
+    for falha in falhas:
+        print(f"FALHA {falha}")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Componentes compartilhados pelo comparador web (``app.py``) e pela GUI."""
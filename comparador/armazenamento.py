@@ -0,0 +1,255 @@
+"""Histórico de comparações em SQLite, com o PDF gerado e rankings pré-calculados.
+
+Cada comparação vira linhas normalizadas (produtos, critérios e a opção de
+cada célula, com índices por produto e por critério) e guarda o PDF como
+BLOB para reimpressão sem renderizar de novo. As tabelas de agregados
+(``ranking_produtos``) são atualizadas na mesma transação da inserção, então
+as consultas de ranking não percorrem o histórico.
+
+A comparação é identificada pela chave sem as opções do relatório: gerar o
+mesmo payload com e sem a análise de sensibilidade conta uma vez só no
+histórico e nos rankings. Cada variante do PDF fica em ``pdfs``, pela sua
+própria chave (o ``ETag`` de ``/gerar_pdf``); com ``limite_pdfs_bytes``, os
+PDFs mais antigos são descartados quando o total passa do limite.
+"""
+import sqlite3
+import threading
+import time
+
+from comparador.cache_pdf import chave_comparacao
+from comparador.pontuacao import nome_vencedora
+from comparador.streaming import TAMANHO_BLOCO, tamanho_arquivo
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS comparacoes (
+    id          INTEGER PRIMARY KEY,
+    chave       TEXT NOT NULL UNIQUE,
+    criada_em   REAL NOT NULL,
+    vencedora   TEXT NOT NULL,
+    n_produtos  INTEGER NOT NULL,
+    n_criterios INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_comparacoes_criada_em ON comparacoes(criada_em);
+
+-- Um PDF por variante do relatório (chave = ETag, que inclui as opções); o BLOB fica por último na linha
+CREATE TABLE IF NOT EXISTS pdfs (
+    chave         TEXT NOT NULL UNIQUE,
+    comparacao_id INTEGER NOT NULL REFERENCES comparacoes(id),
+    tamanho       INTEGER NOT NULL,
+    pdf           BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pdfs_comparacao ON pdfs(comparacao_id);
+CREATE INDEX IF NOT EXISTS idx_pdfs_tamanho ON pdfs(tamanho);
+
+CREATE TABLE IF NOT EXISTS produtos  (id INTEGER PRIMARY KEY, nome TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS criterios (id INTEGER PRIMARY KEY, nome TEXT NOT NULL UNIQUE);
+
+-- Uma linha por produto da comparação (coluna = posição no payload)
+CREATE TABLE IF NOT EXISTS comparacao_produtos (
+    comparacao_id INTEGER NOT NULL REFERENCES comparacoes(id),
+    coluna        INTEGER NOT NULL,
+    produto_id    INTEGER NOT NULL REFERENCES produtos(id),
+    total         REAL NOT NULL,
+    posicao       REAL NOT NULL,
+    PRIMARY KEY (comparacao_id, coluna)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_comparacao_produtos_produto ON comparacao_produtos(produto_id, comparacao_id);
+
+-- Uma linha por célula: código da opção (índice de comparador.pontuacao.OPCOES)
+CREATE TABLE IF NOT EXISTS selecoes (
+    comparacao_id INTEGER NOT NULL REFERENCES comparacoes(id),
+    linha         INTEGER NOT NULL,
+    coluna        INTEGER NOT NULL,
+    criterio_id   INTEGER NOT NULL REFERENCES criterios(id),
+    produto_id    INTEGER NOT NULL REFERENCES produtos(id),
+    codigo        INTEGER NOT NULL,
+    PRIMARY KEY (comparacao_id, linha, coluna)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_selecoes_criterio ON selecoes(criterio_id, produto_id);
+CREATE INDEX IF NOT EXISTS idx_selecoes_produto ON selecoes(produto_id, criterio_id);
+
+-- Agregados mantidos a cada inserção
+CREATE TABLE IF NOT EXISTS ranking_produtos (
+    produto_id  INTEGER PRIMARY KEY REFERENCES produtos(id),
+    comparacoes INTEGER NOT NULL,
+    vitorias    INTEGER NOT NULL,
+    empates     INTEGER NOT NULL,
+    soma_pontos REAL NOT NULL
+);
+"""
+
+ORDENACOES_RANKING = {
+    "vitorias": "r.vitorias DESC, r.empates DESC",
+    "media": "r.soma_pontos / r.comparacoes DESC",
+    "comparacoes": "r.comparacoes DESC",
+}
+
+
+class Armazenamento:
+    """Acesso ao banco; uma conexão por thread e escritas serializadas por um lock."""
+
+    def __init__(self, caminho, limite_pdfs_bytes=None):
+        self.caminho = caminho
+        self.limite_pdfs_bytes = limite_pdfs_bytes
+        self._local = threading.local()
+        self._lock_escrita = threading.Lock()
+        conexao = self._conexao()
+        conexao.executescript(ESQUEMA)
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=30)
+            conexao.row_factory = sqlite3.Row
+            # WAL: leituras (histórico, reimpressões) não esperam pelas escritas
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def fechar(self):
+        """Fecha a conexão da thread atual (por exemplo, antes de um ``fork``)."""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is not None:
+            conexao.close()
+            self._local.conexao = None
+
+    @staticmethod
+    def _ids(conexao, tabela, nomes):
+        unicos = list(dict.fromkeys(nomes))
+        conexao.executemany(f"INSERT OR IGNORE INTO {tabela}(nome) VALUES (?)", ((nome,) for nome in unicos))
+        ids = {}
+        for inicio in range(0, len(unicos), 500):
+            parte = unicos[inicio:inicio + 500]
+            marcadores = ",".join("?" * len(parte))
+            ids.update(conexao.execute(f"SELECT nome, id FROM {tabela} WHERE nome IN ({marcadores})", parte).fetchall())
+        return [ids[nome] for nome in nomes]
+
+    def registrar(self, comparacao, pdf=None, chave_pdf=None):
+        """Grava uma ``Comparacao`` (e seu PDF, em bytes ou arquivo) e atualiza os agregados.
+
+        ``chave_pdf`` é a chave da variante do PDF (padrão: a da comparação,
+        sem opções). Retorna ``False`` se a comparação já existia; nesse caso
+        só o PDF é gravado, quando ainda não havia um com essa chave.
+        """
+        produtos, criterios, resultado = comparacao.produtos, comparacao.criterios, comparacao.resultado
+        chave = chave_comparacao(comparacao)
+        conexao = self._conexao()
+        with self._lock_escrita, conexao:
+            cursor = conexao.execute(
+                "INSERT OR IGNORE INTO comparacoes(chave, criada_em, vencedora, n_produtos, n_criterios) VALUES (?, ?, ?, ?, ?)",
+                (chave, time.time(), nome_vencedora(produtos, resultado), len(produtos), len(criterios)))
+            nova = cursor.rowcount == 1
+            if nova:
+                id_comparacao = cursor.lastrowid
+                ids_produtos = self._ids(conexao, "produtos", produtos)
+                ids_criterios = self._ids(conexao, "criterios", criterios)
+                totais = resultado.totais.tolist()
+                posicoes = resultado.posicoes.tolist()
+                conexao.executemany(
+                    "INSERT INTO comparacao_produtos VALUES (?, ?, ?, ?, ?)",
+                    ((id_comparacao, j, ids_produtos[j], totais[j], posicoes[j]) for j in range(len(produtos))))
+                conexao.executemany(
+                    "INSERT INTO selecoes VALUES (?, ?, ?, ?, ?, ?)",
+                    ((id_comparacao, i, j, ids_criterios[i], ids_produtos[j], codigo)
+                     for i, linha in enumerate(comparacao.codigos.tolist()) for j, codigo in enumerate(linha)))
+                empate = len(resultado.vencedoras) > 1
+                vencedoras = set(resultado.vencedoras)
+                conexao.executemany(
+                    "INSERT INTO ranking_produtos VALUES (?, 1, ?, ?, ?) "
+                    "ON CONFLICT(produto_id) DO UPDATE SET comparacoes = comparacoes + 1, "
+                    "vitorias = vitorias + excluded.vitorias, empates = empates + excluded.empates, "
+                    "soma_pontos = soma_pontos + excluded.soma_pontos",
+                    ((ids_produtos[j], int(j in vencedoras and not empate), int(j in vencedoras and empate), totais[j])
+                     for j in range(len(produtos))))
+            if pdf is not None:
+                if not nova:
+                    id_comparacao = conexao.execute("SELECT id FROM comparacoes WHERE chave = ?", (chave,)).fetchone()["id"]
+                self._gravar_pdf(conexao, id_comparacao, chave_pdf or chave, pdf)
+        return nova
+
+    def _gravar_pdf(self, conexao, id_comparacao, chave, pdf):
+        tamanho = len(pdf) if isinstance(pdf, bytes) else tamanho_arquivo(pdf)
+        if self.limite_pdfs_bytes is not None and tamanho > self.limite_pdfs_bytes:
+            return
+        if isinstance(pdf, bytes):
+            cursor = conexao.execute("INSERT OR IGNORE INTO pdfs(chave, comparacao_id, tamanho, pdf) VALUES (?, ?, ?, ?)",
+                                     (chave, id_comparacao, tamanho, pdf))
+        else:
+            # Arquivo (PDF grande vindo do spool): copia em blocos para um BLOB pré-alocado
+            cursor = conexao.execute("INSERT OR IGNORE INTO pdfs(chave, comparacao_id, tamanho, pdf) VALUES (?, ?, ?, zeroblob(?))",
+                                     (chave, id_comparacao, tamanho, tamanho))
+            if cursor.rowcount:
+                with conexao.blobopen("pdfs", "pdf", cursor.lastrowid) as blob:
+                    while bloco := pdf.read(TAMANHO_BLOCO):
+                        blob.write(bloco)
+                pdf.seek(0)
+        if cursor.rowcount and self.limite_pdfs_bytes is not None:
+            self._podar_pdfs(conexao, self.limite_pdfs_bytes)
+
+    @staticmethod
+    def _podar_pdfs(conexao, limite):
+        """Remove os PDFs mais antigos até o total caber em ``limite``; o histórico continua."""
+        excesso = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM pdfs").fetchone()[0] - limite
+        if excesso <= 0:
+            return
+        removidos = []
+        for linha in conexao.execute("SELECT rowid, tamanho FROM pdfs ORDER BY rowid"):
+            if excesso <= 0:
+                break
+            removidos.append((linha["rowid"],))
+            excesso -= linha["tamanho"]
+        conexao.executemany("DELETE FROM pdfs WHERE rowid = ?", removidos)
+
+    def abrir_pdf(self, chave, da_comparacao=False):
+        """PDF guardado, como um BLOB somente leitura (``read``/``seek``), ou ``None``.
+
+        Com ``da_comparacao``, ``chave`` também pode ser a chave da comparação
+        (a do histórico): sem o PDF sem opções, serve a variante mais recente.
+        """
+        conexao = self._conexao()
+        linha = conexao.execute("SELECT rowid FROM pdfs WHERE chave = ?", (chave,)).fetchone()
+        if linha is None and da_comparacao:
+            linha = conexao.execute(
+                "SELECT p.rowid FROM pdfs p JOIN comparacoes c ON c.id = p.comparacao_id "
+                "WHERE c.chave = ? ORDER BY p.rowid DESC LIMIT 1", (chave,)).fetchone()
+        if linha is None:
+            return None
+        return conexao.blobopen("pdfs", "pdf", linha["rowid"], readonly=True)
+
+    def historico(self, produto=None, criterio=None, limite=50, antes_de=None):
+        """Comparações mais recentes, opcionalmente só as que incluem ``produto`` e/ou ``criterio``."""
+        condicoes, parametros = [], []
+        if produto is not None:
+            condicoes.append("c.id IN (SELECT cp.comparacao_id FROM comparacao_produtos cp "
+                             "JOIN produtos p ON p.id = cp.produto_id WHERE p.nome = ?)")
+            parametros.append(produto)
+        if criterio is not None:
+            condicoes.append("c.id IN (SELECT s.comparacao_id FROM selecoes s "
+                             "JOIN criterios k ON k.id = s.criterio_id WHERE k.nome = ?)")
+            parametros.append(criterio)
+        if antes_de is not None:
+            condicoes.append("c.id < ?")
+            parametros.append(antes_de)
+        where = ("WHERE " + " AND ".join(condicoes)) if condicoes else ""
+        linhas = self._conexao().execute(
+            f"SELECT c.id, c.chave, c.criada_em, c.vencedora, c.n_produtos, c.n_criterios, "
+            f"EXISTS (SELECT 1 FROM pdfs p WHERE p.comparacao_id = c.id) AS tem_pdf "
+            f"FROM comparacoes c {where} ORDER BY c.id DESC LIMIT ?", (*parametros, limite)).fetchall()
+        return [dict(linha, tem_pdf=bool(linha["tem_pdf"])) for linha in linhas]
+
+    def ranking(self, ordem="vitorias", limite=20):
+        """Produtos por vitórias, média de pontos ou número de comparações (lidos dos agregados)."""
+        linhas = self._conexao().execute(
+            f"SELECT p.nome AS produto, r.comparacoes, r.vitorias, r.empates, r.soma_pontos / r.comparacoes AS media_pontos "
+            f"FROM ranking_produtos r JOIN produtos p ON p.id = r.produto_id "
+            f"ORDER BY {ORDENACOES_RANKING[ordem]}, p.nome LIMIT ?", (limite,)).fetchall()
+        return [dict(linha) for linha in linhas]
+
+    def estatisticas(self):
+        conexao = self._conexao()
+        return {
+            "comparacoes": conexao.execute("SELECT COUNT(*) FROM comparacoes").fetchone()[0],
+            "produtos": conexao.execute("SELECT COUNT(*) FROM produtos").fetchone()[0],
+            "criterios": conexao.execute("SELECT COUNT(*) FROM criterios").fetchone()[0],
+        }
@@ -0,0 +1,220 @@
+"""Cache endereçado por conteúdo para os PDFs gerados.
+
+A chave de cada relatório é o SHA-256 de uma forma canônica do payload
+(produtos + critérios não vazios) ou da ``Comparacao`` já decodificada,
+então cliques repetidos ou links compartilhados com os mesmos dados
+reaproveitam o PDF já pronto.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def forma_canonica(produtos, criterios, **opcoes):
+    """Normaliza o payload para que dados equivalentes gerem a mesma chave."""
+    criterios_normalizados = []
+    for criterio in criterios:
+        nome = (criterio.get('nome') or '').strip()
+        if not nome:
+            continue
+        criterios_normalizados.append([nome, list(criterio.get('pontuacoes', []))])
+    canonico = {"produtos": list(produtos), "criterios": criterios_normalizados}
+    if opcoes:
+        canonico["opcoes"] = opcoes
+    return json.dumps(canonico, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def chave_payload(produtos, criterios, **opcoes):
+    """Retorna a chave (hex SHA-256) do payload, usada também como ETag."""
+    return hashlib.sha256(forma_canonica(produtos, criterios, **opcoes).encode('utf-8')).hexdigest()
+
+
+def chave_comparacao(comparacao, **opcoes):
+    """Chave de uma ``Comparacao`` já decodificada: nomes e opções na forma normalizada + códigos."""
+    cabecalho = {"produtos": list(comparacao.produtos), "criterios": list(comparacao.criterios)}
+    if opcoes:
+        cabecalho["opcoes"] = opcoes
+    h = hashlib.sha256(json.dumps(cabecalho, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    h.update(comparacao.codigos.tobytes())
+    return h.hexdigest()
+
+
+class CachePDF:
+    """LRU em memória limitado por bytes, com transbordo opcional para disco.
+
+    Entradas removidas da memória por falta de espaço são gravadas em
+    ``diretorio_disco`` (quando informado, até ``limite_disco_bytes``) e
+    promovidas de volta à memória no próximo acerto. Os índices são
+    protegidos por um lock, pois o servidor do Flask atende requisições em
+    threads; a leitura e a escrita dos arquivos acontecem fora dele, então
+    um acesso ao disco não bloqueia os acertos em memória.
+    """
+
+    def __init__(self, limite_bytes=64 * 1024 * 1024, diretorio_disco=None, limite_disco_bytes=None):
+        self.limite_bytes = limite_bytes
+        self.diretorio_disco = diretorio_disco
+        self.limite_disco_bytes = limite_disco_bytes
+        self._entradas = OrderedDict()
+        self._bytes_memoria = 0
+        self._disco = OrderedDict()  # chave -> tamanho, em ordem de uso
+        self._bytes_disco = 0
+        self._em_gravacao = {}  # chave -> bytes ainda sendo gravados (servidos daqui enquanto isso)
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+        self.remocoes = 0
+        if diretorio_disco:
+            os.makedirs(diretorio_disco, exist_ok=True)
+
+    def obter(self, chave):
+        """Retorna os bytes do PDF ou ``None`` se a chave não estiver em cache."""
+        with self._lock:
+            dados = self._entradas.get(chave)
+            if dados is not None:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return dados
+            dados = self._em_gravacao.get(chave)
+            if dados is None:
+                if chave not in self._disco:
+                    self.falhas += 1
+                    return None
+                self._disco.move_to_end(chave)
+        if dados is None:
+            dados = self._ler_disco(chave)
+        gravar, remover = [], []
+        with self._lock:
+            if dados is None:
+                # Arquivo sumiu (removido por outro processo ou por uma remoção concorrente)
+                if chave in self._disco and chave not in self._em_gravacao:
+                    self._esquecer_disco(chave)
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            self.acertos_disco += 1
+            if chave not in self._entradas:
+                self._inserir_memoria(chave, dados, gravar, remover)
+        self._executar_disco(gravar, remover)
+        return dados
+
+    def contem(self, chave):
+        with self._lock:
+            return chave in self._entradas or chave in self._disco
+
+    def guardar(self, chave, dados):
+        """Armazena ``dados`` (bytes). PDFs maiores que o limite inteiro vão direto ao disco."""
+        gravar, remover = [], []
+        with self._lock:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                return
+            if len(dados) > self.limite_bytes:
+                self._reservar_disco(chave, dados, gravar, remover)
+            else:
+                self._inserir_memoria(chave, dados, gravar, remover)
+        self._executar_disco(gravar, remover)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes_memoria = 0
+            remover = [self._esquecer_disco(chave) for chave in list(self._disco)]
+        self._executar_disco([], remover)
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "acertos_disco": self.acertos_disco,
+                "falhas": self.falhas,
+                "taxa_acerto": (self.acertos / consultas) if consultas else 0.0,
+                "remocoes": self.remocoes,
+                "entradas_memoria": len(self._entradas),
+                "bytes_memoria": self._bytes_memoria,
+                "limite_bytes": self.limite_bytes,
+                "entradas_disco": len(self._disco),
+                "bytes_disco": self._bytes_disco,
+                "limite_disco_bytes": self.limite_disco_bytes,
+            }
+
+    # --- Internos (chamados com o lock adquirido) ---
+    # Só atualizam os índices; os arquivos a gravar e a remover vão para as
+    # listas ``gravar``/``remover``, processadas por ``_executar_disco`` depois
+    # que o lock é liberado.
+    def _inserir_memoria(self, chave, dados, gravar, remover):
+        self._entradas[chave] = dados
+        self._bytes_memoria += len(dados)
+        while self._bytes_memoria > self.limite_bytes and self._entradas:
+            chave_antiga, dados_antigos = self._entradas.popitem(last=False)
+            self._bytes_memoria -= len(dados_antigos)
+            self.remocoes += 1
+            if chave_antiga not in self._disco:
+                self._reservar_disco(chave_antiga, dados_antigos, gravar, remover)
+
+    def _reservar_disco(self, chave, dados, gravar, remover):
+        if not self.diretorio_disco or chave in self._disco:
+            return
+        if self.limite_disco_bytes is not None and len(dados) > self.limite_disco_bytes:
+            return
+        self._disco[chave] = len(dados)
+        self._bytes_disco += len(dados)
+        self._em_gravacao[chave] = dados
+        gravar.append((chave, dados))
+        while self.limite_disco_bytes is not None and self._bytes_disco > self.limite_disco_bytes:
+            remover.append(self._esquecer_disco(next(iter(self._disco))))
+
+    def _esquecer_disco(self, chave):
+        self._bytes_disco -= self._disco.pop(chave)
+        self._em_gravacao.pop(chave, None)
+        return chave
+
+    # --- Arquivos (chamados sem o lock) ---
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio_disco, f"{chave}.pdf")
+
+    def _executar_disco(self, gravar, remover):
+        for chave in remover:
+            self._remover_arquivo(chave)
+        for chave, dados in gravar:
+            gravado = self._gravar_arquivo(chave, dados)
+            with self._lock:
+                if self._em_gravacao.get(chave) is dados:
+                    del self._em_gravacao[chave]
+                    if not gravado:
+                        self._esquecer_disco(chave)
+                # Removida (ou o cache limpo) durante a gravação: o arquivo não é mais do índice
+                descartar = not gravado or chave not in self._disco
+            if descartar:
+                self._remover_arquivo(chave)
+
+    def _gravar_arquivo(self, chave, dados):
+        caminho = self._caminho(chave)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporario, 'wb') as arquivo:
+                arquivo.write(dados)
+            os.replace(temporario, caminho)
+        except OSError:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def _ler_disco(self, chave):
+        try:
+            with open(self._caminho(chave), 'rb') as arquivo:
+                return arquivo.read()
+        except OSError:
+            return None
+
+    def _remover_arquivo(self, chave):
+        try:
+            os.remove(self._caminho(chave))
+        except OSError:
+            pass
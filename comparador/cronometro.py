@@ -0,0 +1,28 @@
+"""Cronômetro por etapa da geração de relatórios."""
+import time
+from contextlib import contextmanager
+
+
+class Cronometro:
+    """Acumula a duração (em segundos) de cada etapa, na ordem em que aparecem."""
+
+    def __init__(self):
+        self.etapas = {}
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[nome] = self.etapas.get(nome, 0.0) + time.perf_counter() - inicio
+
+    def total(self):
+        return sum(self.etapas.values())
+
+    def como_dict(self):
+        return dict(self.etapas)
+
+    def server_timing(self):
+        """Valor do cabeçalho HTTP ``Server-Timing`` (durações em milissegundos)."""
+        return ", ".join(f"{nome};dur={duracao * 1000:.2f}" for nome, duracao in self.etapas.items())
@@ -0,0 +1,154 @@
+"""Motor de gráficos de comparação sem o estado global do ``pyplot``.
+
+Cada thread mantém um pequeno pool de ``Figure``/``FigureCanvasAgg``
+reutilizáveis, então requisições concorrentes do Flask nunca compartilham
+uma figura. Os PNGs prontos são memoizados por (produtos, totais,
+vencedora, paleta). Com ``paleta`` o PNG sai quantizado para poucas cores
+e sem canal alfa, o que reduz bastante o tamanho da imagem embutida no
+PDF. Há ainda um gráfico vetorial nativo do ReportLab, que dispensa a
+rasterização e a codificação PNG, e um SVG montado direto como texto para
+prévias.
+
+Matplotlib e ReportLab só são importados no primeiro gráfico de cada tipo,
+então criar o motor (e gerar SVGs) não os carrega.
+"""
+import functools
+import io
+import threading
+from xml.sax.saxutils import escape
+
+
+class MotorGraficos:
+    """Gera o gráfico de barras da pontuação total de cada produto."""
+
+    def __init__(self, cores, titulo='Comparativo de Pontuação (Vencedora: {vencedora})',
+                 tamanho=(8, 4), tamanho_rotulo=None, figuras_por_thread=2, memoizar=256):
+        self.cores = list(cores)
+        self.titulo = titulo
+        self.tamanho = tamanho
+        self.tamanho_rotulo = tamanho_rotulo
+        self.figuras_por_thread = figuras_por_thread
+        self._local = threading.local()
+        self._png_memoizado = functools.lru_cache(maxsize=memoizar)(self._renderizar_png)
+
+    # --- Pool de figuras por thread ---
+    def _pool(self):
+        pool = getattr(self._local, 'figuras', None)
+        if pool is None:
+            pool = self._local.figuras = []
+        return pool
+
+    def _adquirir_figura(self):
+        pool = self._pool()
+        if pool:
+            return pool.pop()
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=self.tamanho)
+        FigureCanvasAgg(fig)
+        return fig
+
+    def _liberar_figura(self, fig):
+        fig.clear()
+        pool = self._pool()
+        if len(pool) < self.figuras_por_thread:
+            pool.append(fig)
+
+    # --- Renderização ---
+    def _renderizar_png(self, produtos, pontuacoes, nome_vencedora, paleta=None):
+        fig = self._adquirir_figura()
+        try:
+            ax = fig.add_subplot()
+            barras = ax.bar(produtos, pontuacoes, color=self.cores)
+
+            ax.set_ylabel('Pontuação Total')
+            ax.set_title(self.titulo.format(vencedora=nome_vencedora))
+            ax.spines['right'].set_visible(False)
+            ax.spines['top'].set_visible(False)
+
+            extras = {'fontsize': self.tamanho_rotulo} if self.tamanho_rotulo else {}
+            for barra in barras:
+                yval = barra.get_height()
+                ax.text(barra.get_x() + barra.get_width()/2.0, yval, int(yval), ha='center', va='bottom', **extras)
+
+            buf = io.BytesIO()
+            fig.tight_layout()
+            if paleta:
+                from PIL import Image
+
+                fig.canvas.draw()
+                imagem = Image.frombuffer('RGBA', fig.canvas.get_width_height(), fig.canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+                imagem = imagem.convert('RGB').quantize(colors=paleta, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+                imagem.save(buf, format='PNG', optimize=True)
+            else:
+                fig.savefig(buf, format='png')
+            return buf.getvalue()
+        finally:
+            self._liberar_figura(fig)
+
+    def gerar_png(self, produtos, pontuacoes, nome_vencedora, paleta=None):
+        """Retorna os bytes PNG do gráfico (memoizados); ``paleta`` é o número de cores (``None`` = RGBA completo)."""
+        return self._png_memoizado(tuple(produtos), tuple(pontuacoes), nome_vencedora, paleta)
+
+    def limpar_cache(self):
+        self._png_memoizado.cache_clear()
+
+    def gerar_desenho(self, produtos, pontuacoes, nome_vencedora, largura=450, altura=225):
+        """Retorna um ``Drawing`` vetorial do ReportLab, pronto para entrar na Story."""
+        from reportlab.graphics.charts.barcharts import VerticalBarChart
+        from reportlab.graphics.shapes import Drawing, String
+        from reportlab.lib import colors
+
+        desenho = Drawing(largura, altura)
+        desenho.add(String(largura / 2, altura - 14, self.titulo.format(vencedora=nome_vencedora),
+                           fontName='Helvetica', fontSize=10, textAnchor='middle'))
+
+        grafico = VerticalBarChart()
+        grafico.x, grafico.y = 45, 30
+        grafico.width, grafico.height = largura - 60, altura - 60
+        grafico.data = [list(pontuacoes)]
+        grafico.categoryAxis.categoryNames = [str(p) for p in produtos]
+        grafico.categoryAxis.labels.fontSize = 8
+        grafico.valueAxis.valueMin = 0
+        grafico.valueAxis.labels.fontSize = 8
+        grafico.barLabelFormat = '%d'
+        grafico.barLabels.nudge = 6
+        grafico.barLabels.fontSize = 8
+        grafico.bars.strokeColor = None
+        for i in range(len(pontuacoes)):
+            grafico.bars[(0, i)].fillColor = colors.HexColor(self.cores[i % len(self.cores)])
+        desenho.add(grafico)
+        return desenho
+
+    def gerar_svg(self, produtos, pontuacoes, nome_vencedora, largura=480, altura=240):
+        """Mesmo gráfico de barras em SVG, gerado como texto (sem Matplotlib nem ReportLab)."""
+        margem_esq, margem_dir, margem_sup, margem_inf = 40, 10, 28, 36
+        area_l = largura - margem_esq - margem_dir
+        area_a = altura - margem_sup - margem_inf
+        maximo = max(max(pontuacoes, default=0), 1)
+        passo = area_l / max(len(produtos), 1)
+        barra = passo * 0.6
+        base = margem_sup + area_a
+
+        partes = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{largura}" height="{altura}" '
+            f'viewBox="0 0 {largura} {altura}" font-family="Helvetica, Arial, sans-serif" font-size="10">',
+            f'<text x="{largura / 2:.1f}" y="16" text-anchor="middle" font-size="12">'
+            f'{escape(self.titulo.format(vencedora=nome_vencedora))}</text>',
+            f'<line x1="{margem_esq}" y1="{base}" x2="{largura - margem_dir}" y2="{base}" stroke="#444"/>',
+        ]
+        for i, (produto, pontos) in enumerate(zip(produtos, pontuacoes)):
+            h = area_a * pontos / maximo
+            x = margem_esq + i * passo + (passo - barra) / 2
+            centro = x + barra / 2
+            partes.append(f'<rect x="{x:.1f}" y="{base - h:.1f}" width="{barra:.1f}" height="{h:.1f}" '
+                          f'fill="{self.cores[i % len(self.cores)]}"/>')
+            partes.append(f'<text x="{centro:.1f}" y="{base - h - 4:.1f}" text-anchor="middle">{pontos:g}</text>')
+            partes.append(f'<text x="{centro:.1f}" y="{base + 14}" text-anchor="middle">{escape(str(produto))}</text>')
+        partes.append('</svg>')
+        return ''.join(partes)
+
+    def estatisticas(self):
+        info = self._png_memoizado.cache_info()
+        return {"acertos": info.hits, "falhas": info.misses, "entradas": info.currsize}
@@ -0,0 +1,225 @@
+"""Geração de relatórios em lote, sem interface gráfica.
+
+As comparações são lidas em fluxo de um arquivo JSONL (um payload de
+``/gerar_pdf`` por linha, com ``"id"`` opcional) ou CSV no formato longo
+(colunas ``comparacao,criterio,produto,opcao``, com as linhas de cada
+comparação contíguas). Cada relatório é renderizado em um pool de
+processos e gravado com um nome único e estável em ``diretorio``.
+
+O manifesto (``manifesto.jsonl`` no diretório de saída) recebe uma linha
+por relatório concluído ou com erro; ao executar de novo, os relatórios
+já concluídos são pulados, então uma execução interrompida continua de
+onde parou. Itens repetidos na mesma entrada (mesmo arquivo de saída) são
+renderizados uma vez só.
+"""
+import csv
+import itertools
+import json
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from comparador.cache_pdf import chave_payload
+
+NOME_MANIFESTO = "manifesto.jsonl"
+COLUNAS_CSV = ("comparacao", "criterio", "produto", "opcao")
+
+
+# --- Leitura da entrada ---
+
+def ler_jsonl(caminho):
+    """Gera um item por linha; linhas inválidas viram itens com ``"_erro"``."""
+    with open(caminho, encoding="utf-8") as arquivo:
+        for numero, linha in enumerate(arquivo, 1):
+            if not linha.strip():
+                continue
+            try:
+                item = json.loads(linha)
+                if not isinstance(item, dict):
+                    raise ValueError("a linha não contém um objeto JSON")
+            except ValueError as e:
+                yield {"id": f"linha-{numero}", "_erro": f"JSON inválido: {e}"}
+                continue
+            item.setdefault("id", f"linha-{numero}")
+            yield item
+
+
+def ler_csv(caminho):
+    """Agrupa as linhas contíguas de cada ``comparacao`` em um payload."""
+    with open(caminho, encoding="utf-8", newline="") as arquivo:
+        leitor = csv.DictReader(arquivo)
+        faltando = set(COLUNAS_CSV) - set(leitor.fieldnames or ())
+        if faltando:
+            raise ValueError(f"Colunas ausentes no CSV: {', '.join(sorted(faltando))}")
+        for id_comparacao, linhas in itertools.groupby(leitor, key=lambda linha: linha["comparacao"]):
+            produtos = {}
+            criterios = {}
+            for linha in linhas:
+                produtos.setdefault(linha["produto"], len(produtos))
+                criterios.setdefault(linha["criterio"], {})[linha["produto"]] = linha["opcao"]
+            yield {
+                "id": id_comparacao,
+                "produtos": list(produtos),
+                "criterios": [{"nome": nome, "pontuacoes": [opcoes.get(p, "Selecione...") for p in produtos]}
+                              for nome, opcoes in criterios.items()],
+            }
+
+
+def ler_entrada(caminho, formato=None):
+    formato = formato or ("csv" if caminho.lower().endswith(".csv") else "jsonl")
+    if formato == "csv":
+        return ler_csv(caminho)
+    if formato == "jsonl":
+        return ler_jsonl(caminho)
+    raise ValueError(f"Formato desconhecido: {formato!r} (use csv ou jsonl)")
+
+
+def nome_arquivo(item):
+    """``<id>-<hash do conteúdo>.pdf``: único por conteúdo e estável entre execuções."""
+    slug = unicodedata.normalize("NFKD", str(item["id"])).encode("ascii", "ignore").decode()
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "-", slug).strip("-.")[:60] or "comparacao"
+    chave = chave_payload(item.get("produtos", []), item.get("criterios", []))
+    return f"{slug}-{chave[:12]}.pdf"
+
+
+# --- Manifesto (checkpoint) ---
+
+class Manifesto:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.concluidos = set()
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as arquivo:
+                for linha in arquivo:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue  # última linha truncada por uma interrupção
+                    if registro.get("status") == "ok":
+                        self.concluidos.add(registro["arquivo"])
+        self._arquivo = open(caminho, "a", encoding="utf-8")
+
+    def concluido(self, arquivo, diretorio):
+        return arquivo in self.concluidos and os.path.exists(os.path.join(diretorio, arquivo))
+
+    def registrar(self, registro):
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self._arquivo.flush()
+        if registro["status"] == "ok":
+            self.concluidos.add(registro["arquivo"])
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+# --- Execução ---
+
+@dataclass
+class ResumoLote:
+    concluidos: int = 0
+    erros: int = 0
+    pulados: int = 0
+    bytes: int = 0
+    segundos: float = 0.0
+    duracoes: list = field(default_factory=list)
+
+    @property
+    def relatorios_por_segundo(self):
+        return self.concluidos / self.segundos if self.segundos else 0.0
+
+    def percentil(self, p):
+        if not self.duracoes:
+            return 0.0
+        ordenadas = sorted(self.duracoes)
+        return ordenadas[min(len(ordenadas) - 1, int(round(p * (len(ordenadas) - 1))))]
+
+    def texto(self):
+        return (f"{self.concluidos} relatórios em {self.segundos:.1f}s "
+                f"({self.relatorios_por_segundo:.2f} relatórios/s, {self.bytes / 1e6:.1f} MB); "
+                f"por relatório: p50 {self.percentil(0.50) * 1000:.0f} ms, p95 {self.percentil(0.95) * 1000:.0f} ms; "
+                f"{self.erros} erros, {self.pulados} pulados (já concluídos ou repetidos)")
+
+
+def _executar_item(renderizar, item, caminho):
+    """Executada no worker: renderiza em um arquivo parcial e o renomeia ao terminar."""
+    inicio = time.perf_counter()
+    parcial = f"{caminho}.{os.getpid()}.parcial"  # único por worker, mesmo se o arquivo se repetir
+    try:
+        renderizar(item, parcial)
+        os.replace(parcial, caminho)
+    except Exception as e:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        return {"status": "erro", "erro": f"{type(e).__name__}: {e}", "segundos": time.perf_counter() - inicio}
+    return {"status": "ok", "bytes": os.path.getsize(caminho), "segundos": time.perf_counter() - inicio}
+
+
+def executar_lote(itens, renderizar, diretorio, processos=None, em_voo=None, ao_registrar=None):
+    """Renderiza ``itens`` com ``renderizar(item, caminho)`` e retorna um ``ResumoLote``.
+
+    ``renderizar`` precisa ser uma função de módulo (é enviada aos workers).
+    ``processos=0`` renderiza no processo atual. No máximo ``em_voo`` itens
+    (padrão: 2 por processo) ficam pendentes, então a entrada é lida aos poucos.
+    ``ao_registrar(registro)`` é chamada para cada linha gravada no manifesto.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    processos = (os.cpu_count() or 1) if processos is None else processos
+    em_voo = em_voo or 2 * max(processos, 1)
+    manifesto = Manifesto(os.path.join(diretorio, NOME_MANIFESTO))
+    resumo = ResumoLote()
+    inicio = time.perf_counter()
+
+    def registrar(item, arquivo, resultado):
+        registro = {"id": item["id"], "arquivo": arquivo, **resultado}
+        manifesto.registrar(registro)
+        if resultado["status"] == "ok":
+            resumo.concluidos += 1
+            resumo.bytes += resultado["bytes"]
+            resumo.duracoes.append(resultado["segundos"])
+        else:
+            resumo.erros += 1
+        if ao_registrar is not None:
+            ao_registrar(registro)
+
+    def pendentes_do_lote():
+        # Itens inválidos, já concluídos ou repetidos nesta execução são resolvidos aqui, sem ir para o pool
+        enviados = set()
+        for item in itens:
+            if "_erro" in item:
+                registrar(item, None, {"status": "erro", "erro": item["_erro"]})
+                continue
+            try:
+                arquivo = nome_arquivo(item)
+            except (AttributeError, TypeError, ValueError) as e:
+                # Payload fora do formato (ex.: critério que não é objeto): erro do item, não do lote
+                registrar(item, None, {"status": "erro", "erro": f"Payload inválido: {type(e).__name__}: {e}"})
+                continue
+            if arquivo in enviados or manifesto.concluido(arquivo, diretorio):
+                resumo.pulados += 1
+                continue
+            enviados.add(arquivo)
+            yield item, arquivo
+
+    try:
+        if processos == 0:
+            for item, arquivo in pendentes_do_lote():
+                registrar(item, arquivo, _executar_item(renderizar, item, os.path.join(diretorio, arquivo)))
+        else:
+            with ProcessPoolExecutor(max_workers=processos) as executor:
+                pendentes = {}
+                for item, arquivo in pendentes_do_lote():
+                    futuro = executor.submit(_executar_item, renderizar, item, os.path.join(diretorio, arquivo))
+                    pendentes[futuro] = (item, arquivo)
+                    if len(pendentes) >= em_voo:
+                        prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                        for futuro in prontos:
+                            registrar(*pendentes.pop(futuro), futuro.result())
+                for futuro in wait(pendentes).done:
+                    registrar(*pendentes.pop(futuro), futuro.result())
+    finally:
+        manifesto.fechar()
+        resumo.segundos = time.perf_counter() - inicio
+    return resumo
@@ -0,0 +1,238 @@
+"""Métricas no formato de texto do Prometheus (sem dependências externas).
+
+``Contador`` e ``Histograma`` acumulam valores por combinação de rótulos;
+``Medidor`` lê o valor atual de uma função no momento da coleta (útil
+para estatísticas que já existem em outros objetos, como o cache).
+
+Com vários processos servindo o app (workers do servidor pré-fork),
+``Registro.compartilhar`` faz cada processo publicar seu estado em um
+diretório comum; a coleta, em qualquer um deles, soma contadores e
+histogramas de todos (inclusive de workers que já terminaram, para que os
+contadores nunca diminuam) e mostra os medidores dos workers vivos com o
+rótulo ``worker``.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+BALDES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+def _formatar_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+
+    def _chave(self, rotulos):
+        if set(rotulos) != set(self.rotulos):
+            raise ValueError(f"{self.nome}: rótulos esperados {self.rotulos}, recebidos {tuple(rotulos)}")
+        return tuple(str(rotulos[nome]) for nome in self.rotulos)
+
+    def cabecalho(self):
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores = {}
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def estado(self):
+        with self._lock:
+            return [[list(chave), valor] for chave, valor in self._valores.items()]
+
+    def linhas(self, outros=None):
+        with self._lock:
+            valores = dict(self._valores)
+        for _, _, estado in outros or ():
+            for chave, valor in estado:
+                chave = tuple(chave)
+                valores[chave] = valores.get(chave, 0) + valor
+        return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}"
+                for chave, valor in sorted(valores.items())]
+
+
+class Medidor(_Metrica):
+    """Valor lido de ``funcao()`` a cada coleta; ``funcao`` pode retornar um número ou ``{rótulos: valor}``."""
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, funcao, rotulos=()):
+        super().__init__(nome, ajuda, rotulos)
+        self.funcao = funcao
+
+    def estado(self):
+        valor = self.funcao()
+        if valor is None:
+            return []
+        if not isinstance(valor, dict):
+            return [[[], valor]]
+        return [[list(chave) if isinstance(chave, tuple) else [chave], v] for chave, v in sorted(valor.items())]
+
+    def linhas(self, outros=None):
+        if outros is None:
+            return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(v)}"
+                    for chave, v in self.estado()]
+        # Vários processos: um valor por worker vivo, com o rótulo `worker`
+        por_worker = [(os.getpid(), self.estado())] + [(pid, estado) for pid, vivo, estado in outros if vivo]
+        return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave, ('worker', pid))} {_formatar_numero(v)}"
+                for pid, estado in sorted(por_worker) for chave, v in estado]
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), baldes=BALDES_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.baldes = tuple(sorted(baldes))
+        self._series = {}  # chave -> [contagens por balde..., soma, total]
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        indice = bisect.bisect_left(self.baldes, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [0] * (len(self.baldes) + 1) + [0.0, 0]
+            serie[indice] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def estado(self):
+        with self._lock:
+            return [[list(chave), list(serie)] for chave, serie in self._series.items()]
+
+    def linhas(self, outros=None):
+        with self._lock:
+            series = {chave: list(serie) for chave, serie in self._series.items()}
+        for _, _, estado in outros or ():
+            for chave, serie in estado:
+                atual = series.setdefault(tuple(chave), [0] * len(serie))
+                for i, valor in enumerate(serie):
+                    atual[i] += valor
+        itens = sorted(series.items())
+        linhas = []
+        for chave, serie in itens:
+            acumulado = 0
+            for limite, contagem in zip(self.baldes + (float('inf'),), serie):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(self.rotulos, chave, ('le', _formatar_numero(float(limite))))
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f"{self.nome}_sum{rotulos} {_formatar_numero(serie[-2])}")
+            linhas.append(f"{self.nome}_count{rotulos} {serie[-1]}")
+        return linhas
+
+
+def _vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = []
+        self._diretorio = None
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self.registrar(Contador(nome, ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), baldes=BALDES_LATENCIA):
+        return self.registrar(Histograma(nome, ajuda, rotulos, baldes))
+
+    def medidor(self, nome, ajuda, funcao, rotulos=()):
+        return self.registrar(Medidor(nome, ajuda, funcao, rotulos))
+
+    # --- Vários processos ---
+    def compartilhar(self, diretorio, intervalo=1.0):
+        """Publica o estado deste processo em ``diretorio`` a cada ``intervalo`` segundos e passa a somar os demais.
+
+        Chamada em cada worker, depois do ``fork`` (a thread de publicação não sobrevive a ele).
+        """
+        self._diretorio = diretorio
+        self.publicar()
+
+        def publicar_periodicamente():
+            while True:
+                time.sleep(intervalo)
+                self.publicar()
+
+        threading.Thread(target=publicar_periodicamente, name='metricas', daemon=True).start()
+
+    def publicar(self):
+        """Grava o estado atual deste processo em ``<diretorio>/<pid>.json``."""
+        if self._diretorio is None:
+            return
+        estado = {metrica.nome: metrica.estado() for metrica in self._metricas}
+        caminho = os.path.join(self._diretorio, f"{os.getpid()}.json")
+        with open(caminho + '.tmp', 'w', encoding='utf-8') as arquivo:
+            json.dump(estado, arquivo)
+        os.replace(caminho + '.tmp', caminho)
+
+    def _estados_dos_outros(self):
+        """[(pid, vivo, estado)] dos outros processos que publicaram no diretório."""
+        outros = []
+        for nome in os.listdir(self._diretorio):
+            pid, extensao = os.path.splitext(nome)
+            if extensao != '.json' or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            try:
+                with open(os.path.join(self._diretorio, nome), encoding='utf-8') as arquivo:
+                    estado = json.load(arquivo)
+            except (OSError, ValueError):
+                continue
+            outros.append((int(pid), _vivo(int(pid)), estado))
+        return outros
+
+    def texto(self):
+        """Exposição no formato ``text/plain; version=0.0.4``."""
+        outros = self._estados_dos_outros() if self._diretorio is not None else None
+        linhas = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.cabecalho())
+            if outros is None:
+                linhas.extend(metrica.linhas())
+            else:
+                linhas.extend(metrica.linhas([(pid, vivo, estado[metrica.nome])
+                                              for pid, vivo, estado in outros if metrica.nome in estado]))
+        return "\n".join(linhas) + "\n"
@@ -0,0 +1,141 @@
+"""Modelo compacto de uma comparação e decodificador estrito do payload.
+
+``Comparacao`` guarda nomes em tuplas e as opções como uma matriz ``int8``
+M×N (critérios × produtos) de códigos de ``comparador.pontuacao.OPCOES``,
+em vez de um dicionário por célula. A pontuação é calculada na primeira
+vez que é pedida, então a chave do cache sai antes de qualquer cálculo.
+
+``decodificar_comparacao`` valida tipos, tamanhos e opções em uma única
+passada, codificando cada linha à medida que a lê, e rejeita o payload
+com ``PayloadInvalido`` (HTTP 400) ou ``PayloadGrande`` (HTTP 413) antes
+de qualquer trabalho de renderização.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from comparador.pontuacao import CODIGOS, OPCOES_PONTOS, TEXTO_SEM_OPCAO, codificar_opcoes, pontuar
+
+# Texto "N pts (Opção)" de cada código, na ordem de OPCOES (o último é o de "sem opção")
+TEXTOS_CELULA = tuple(f"{pontos} pts ({opcao})" for opcao, pontos in OPCOES_PONTOS.items()) + (f"0 pts ({TEXTO_SEM_OPCAO})",)
+
+
+class PayloadInvalido(ValueError):
+    """Payload rejeitado pelo decodificador."""
+
+
+class PayloadGrande(PayloadInvalido):
+    """Payload acima dos limites de tamanho."""
+
+
+@dataclass(frozen=True)
+class Limites:
+    max_bytes: int = 8 * 1024 * 1024
+    max_produtos: int = 100
+    max_criterios: int = 20_000
+    max_nome: int = 200
+
+
+LIMITES_PADRAO = Limites()
+
+
+class Comparacao:
+    __slots__ = ('produtos', 'criterios', 'codigos', '_resultado')
+
+    def __init__(self, produtos, criterios, codigos, resultado=None):
+        self.produtos = tuple(produtos)
+        self.criterios = tuple(criterios)
+        self.codigos = codigos
+        self._resultado = resultado
+
+    @classmethod
+    def de_opcoes(cls, produtos, criterios, grade):
+        """Monta a comparação a partir de uma grade de textos de opção (uma lista por critério)."""
+        return cls(produtos, criterios, codificar_opcoes(grade, len(produtos)))
+
+    def __getstate__(self):
+        return self.produtos, self.criterios, self.codigos, self._resultado
+
+    def __setstate__(self, estado):
+        self.produtos, self.criterios, self.codigos, self._resultado = estado
+
+    @property
+    def resultado(self):
+        """``ResultadoPontuacao`` (calculado na primeira chamada)."""
+        if self._resultado is None:
+            self._resultado = pontuar(self.codigos)
+        return self._resultado
+
+    @property
+    def totais(self):
+        return self.resultado.totais.tolist()
+
+    @property
+    def totais_criterio(self):
+        return self.resultado.por_criterio.tolist()
+
+    def textos_linha(self, i):
+        """Textos "N pts (Opção)" do critério ``i``, um por produto."""
+        return [TEXTOS_CELULA[codigo] for codigo in self.codigos[i].tolist()]
+
+    def textos_colunas(self):
+        """Textos "N pts (Opção)" de cada produto, na ordem dos critérios (uma lista por produto)."""
+        return [[TEXTOS_CELULA[codigo] for codigo in coluna] for coluna in self.codigos.T.tolist()]
+
+    def __len__(self):
+        return len(self.criterios)
+
+    def __repr__(self):
+        return f"Comparacao({len(self.produtos)} produtos × {len(self.criterios)} critérios)"
+
+
+def _texto(valor, caminho, limites):
+    if not isinstance(valor, str):
+        raise PayloadInvalido(f"{caminho}: esperado texto, recebido {type(valor).__name__}.")
+    if len(valor) > limites.max_nome:
+        raise PayloadGrande(f"{caminho}: texto com mais de {limites.max_nome} caracteres.")
+    return valor
+
+
+def decodificar_comparacao(data, limites=LIMITES_PADRAO):
+    """Valida o payload de ``/gerar_pdf`` e retorna a ``Comparacao`` (critérios sem nome são ignorados).
+
+    Cada critério precisa ter exatamente uma opção por produto; opções
+    fora de ``OPCOES`` são rejeitadas, exceto ``""``/``"Selecione..."``/``null``,
+    que valem "sem opção".
+    """
+    if not isinstance(data, dict):
+        raise PayloadInvalido("O payload deve ser um objeto JSON.")
+    produtos = data.get('produtos')
+    criterios = data.get('criterios')
+    if not produtos or not criterios:
+        raise PayloadInvalido("Dados insuficientes.")
+    if not isinstance(produtos, list) or not isinstance(criterios, list):
+        raise PayloadInvalido("'produtos' e 'criterios' devem ser listas.")
+    if len(produtos) > limites.max_produtos:
+        raise PayloadGrande(f"No máximo {limites.max_produtos} produtos por comparação.")
+    if len(criterios) > limites.max_criterios:
+        raise PayloadGrande(f"No máximo {limites.max_criterios} critérios por comparação.")
+    produtos = [_texto(p, f"produtos[{j}]", limites) for j, p in enumerate(produtos)]
+
+    n_produtos = len(produtos)
+    codigos = np.empty((len(criterios), n_produtos), dtype=np.int8)
+    nomes = []
+    for i, criterio in enumerate(criterios):
+        if not isinstance(criterio, dict):
+            raise PayloadInvalido(f"criterios[{i}]: esperado objeto com 'nome' e 'pontuacoes'.")
+        nome = _texto(criterio.get('nome', ''), f"criterios[{i}].nome", limites).strip()
+        pontuacoes = criterio.get('pontuacoes')
+        if not isinstance(pontuacoes, list) or len(pontuacoes) != n_produtos:
+            raise PayloadInvalido(f"criterios[{i}].pontuacoes: esperada uma lista com {n_produtos} opções.")
+        if not nome:
+            continue
+        try:
+            codigos[len(nomes)] = [CODIGOS[opcao] for opcao in pontuacoes]
+        except (KeyError, TypeError):
+            invalida = next(o for o in pontuacoes if not isinstance(o, (str, type(None))) or o not in CODIGOS)
+            raise PayloadInvalido(f"criterios[{i}].pontuacoes: opção desconhecida {invalida!r}.") from None
+        nomes.append(nome)
+    if len(nomes) < len(criterios):
+        codigos = codigos[:len(nomes)].copy()
+    return Comparacao(produtos, nomes, codigos)
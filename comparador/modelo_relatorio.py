@@ -0,0 +1,97 @@
+"""Modelo de relatório pré-compilado.
+
+Folha de estilos, ``TableStyle``s e as seções estáticas (bloco de título e
+regras de pontuação) são montados uma única vez, na primeira renderização
+(é aí que o ReportLab é importado), e reaproveitados por todas as chamadas
+de ``comparador.relatorio.gerar_pdf``. Os flowables estáticos são
+entregues como cópias rasas: o texto já vem analisado, mas cada documento
+mede e desenha sua própria instância, então builds concorrentes não
+compartilham estado de layout.
+
+O modelo também descreve o que muda entre as variantes do relatório (web
+e GUI): cores, seções numeradas, coluna de total por critério, tamanho
+do gráfico e o número de cores do PNG do gráfico (perfil compacto).
+"""
+import copy
+import threading
+
+from comparador.pontuacao import OPCOES_PONTOS
+
+TITULO_PADRAO = "Relatório de Comparação de Produtos"
+
+
+def criar_estilos():
+    """Folha de estilos padrão mais os estilos personalizados dos relatórios."""
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='TitleCustom', parent=styles['Title'], fontSize=20, spaceAfter=20, alignment=1))
+    styles.add(ParagraphStyle(name='Heading2Custom', parent=styles['Heading2'], fontSize=14, spaceBefore=10, spaceAfter=10))
+    styles.add(ParagraphStyle(name='NormalCustom', parent=styles['Normal'], fontSize=10))
+    return styles
+
+
+class ModeloRelatorio:
+    """Estilos, seções estáticas e opções de layout de uma variante do relatório.
+
+    ``estilos_tabela`` mapeia um nome para a lista de comandos do ``TableStyle``
+    (cores como texto: ``'#1a237e'``, ``'beige'``...); ``titulo_regras`` é o
+    cabeçalho da seção "Regras de Pontuação" (ou ``None`` para um modelo sem
+    essa seção) e ``graficos`` o ``MotorGraficos`` usado no gráfico.
+    ``paleta_grafico`` quantiza o PNG do gráfico para esse número de cores
+    (``None`` embute o PNG RGBA completo).
+    """
+
+    def __init__(self, estilos_tabela, titulo=TITULO_PADRAO, titulo_regras=None, opcoes_pontos=OPCOES_PONTOS,
+                 graficos=None, cor_cabecalho='#1a237e', cor_linhas='#f0f4f8', secoes_numeradas=False,
+                 total_por_criterio=False, largura_produto=100, tamanho_grafico=(450, 225), invariante=False,
+                 paleta_grafico=None):
+        self.graficos = graficos
+        self.cor_cabecalho = cor_cabecalho
+        self.cor_linhas = cor_linhas
+        self.secoes_numeradas = secoes_numeradas
+        self.total_por_criterio = total_por_criterio
+        self.largura_produto = largura_produto
+        self.tamanho_grafico = tamanho_grafico
+        self.paleta_grafico = paleta_grafico
+        # invariant=1 no ReportLab: o mesmo relatório gera sempre os mesmos bytes
+        self.invariante = invariante
+        self._config = (estilos_tabela, titulo, titulo_regras, opcoes_pontos)
+        self._montado = None
+        self._lock = threading.Lock()
+
+    def _montar(self):
+        from reportlab.platypus import Paragraph, Spacer, TableStyle
+
+        estilos_tabela, titulo, titulo_regras, opcoes_pontos = self._config
+        estilos = criar_estilos()
+        tabelas = {nome: TableStyle(comandos) for nome, comandos in estilos_tabela.items()}
+        cabecalho = [Paragraph(titulo, estilos['TitleCustom'])]
+        regras = []
+        if titulo_regras is not None:
+            regras.append(Paragraph(titulo_regras, estilos['Heading2Custom']))
+            regras.append(Paragraph("As pontuações foram atribuídas com base nas seguintes regras:", estilos['NormalCustom']))
+            for opcao, pontos in opcoes_pontos.items():
+                regras.append(Paragraph(f"<b>{opcao}</b>: {pontos} pontos", estilos['NormalCustom']))
+            regras.append(Spacer(1, 12))
+        return estilos, tabelas, cabecalho, regras
+
+    def _partes(self):
+        if self._montado is None:
+            with self._lock:
+                if self._montado is None:
+                    self._montado = self._montar()
+        return self._montado
+
+    @property
+    def estilos(self):
+        return self._partes()[0]
+
+    def estilo_tabela(self, nome):
+        return self._partes()[1][nome]
+
+    def titulo(self):
+        return [copy.copy(flowable) for flowable in self._partes()[2]]
+
+    def secao_regras(self):
+        return [copy.copy(flowable) for flowable in self._partes()[3]]
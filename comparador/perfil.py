@@ -0,0 +1,96 @@
+"""Perfilamento sob demanda de uma única requisição.
+
+``PerfilDeterministico`` usa o cProfile (custo alto, contagem exata de
+chamadas); ``AmostradorPilha`` consulta a pilha da thread alvo a cada
+``intervalo`` segundos por ``sys._current_frames`` e quase não interfere
+no tempo medido. Ambos produzem um relatório em texto simples.
+"""
+import cProfile
+import collections
+import io
+import pstats
+import sys
+import threading
+import time
+
+MODOS = ('cprofile', 'amostragem')
+
+
+class PerfilDeterministico:
+    def __init__(self, ordenar='cumulative', limite=40):
+        self.ordenar = ordenar
+        self.limite = limite
+        self._perfil = cProfile.Profile()
+
+    def iniciar(self):
+        self._perfil.enable()
+
+    def parar(self):
+        self._perfil.disable()
+
+    def relatorio(self):
+        saida = io.StringIO()
+        pstats.Stats(self._perfil, stream=saida).strip_dirs().sort_stats(self.ordenar).print_stats(self.limite)
+        return saida.getvalue()
+
+
+class AmostradorPilha:
+    """Amostra a pilha de ``thread_id`` (padrão: a thread que chamou ``iniciar``)."""
+
+    def __init__(self, intervalo=0.001, limite=40, thread_id=None):
+        self.intervalo = intervalo
+        self.limite = limite
+        self.thread_id = thread_id
+        self.pilhas = collections.Counter()
+        self.proprias = collections.Counter()
+        self.amostras = 0
+        self._parar = threading.Event()
+        self._thread = None
+        self._inicio = self._duracao = 0.0
+
+    def iniciar(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._inicio = time.perf_counter()
+        self._thread = threading.Thread(target=self._amostrar, name='amostrador-pilha', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._duracao = time.perf_counter() - self._inicio
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.thread_id)
+            if quadro is None:
+                continue
+            pilha = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                pilha.append(f"{codigo.co_name} ({codigo.co_filename.rsplit('/', 1)[-1]}:{quadro.f_lineno})")
+                quadro = quadro.f_back
+            pilha.reverse()
+            self.pilhas[';'.join(pilha)] += 1
+            self.proprias[pilha[-1]] += 1
+            self.amostras += 1
+
+    def relatorio(self):
+        linhas = [f"{self.amostras} amostras em {self._duracao:.3f}s (intervalo {self.intervalo * 1000:.1f} ms)", "",
+                  "Tempo próprio por função:"]
+        for funcao, n in self.proprias.most_common(self.limite):
+            linhas.append(f"{n:8d} {100 * n / max(self.amostras, 1):6.1f}%  {funcao}")
+        # Pilhas no formato "colapsado" (uma por linha), aceito por ferramentas de flame graph.
+        linhas += ["", "Pilhas mais frequentes:"]
+        for pilha, n in self.pilhas.most_common(self.limite):
+            linhas.append(f"{pilha} {n}")
+        return "\n".join(linhas) + "\n"
+
+
+def criar_perfilador(modo):
+    if modo == 'cprofile':
+        return PerfilDeterministico()
+    if modo == 'amostragem':
+        return AmostradorPilha()
+    raise ValueError(f"Modo de perfil desconhecido: {modo!r} (use {', '.join(MODOS)})")
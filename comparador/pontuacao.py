@@ -0,0 +1,86 @@
+"""Motor de pontuação vetorizado (N produtos × M critérios).
+
+A grade de opções é codificada uma única vez como matriz de inteiros
+(critérios nas linhas, produtos nas colunas) e os pontos saem de uma
+tabela de consulta indexada por esse código. Totais, somas por critério,
+posições e empates são calculados com poucas operações do NumPy.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+OPCOES_PONTOS = {
+    "Excelente": 10,
+    "Bom": 5,
+    "Regular": 3,
+    "Não possui": 0
+}
+
+OPCOES = tuple(OPCOES_PONTOS)
+# Código usado para qualquer valor fora de OPCOES_PONTOS (ex.: "Selecione..."), que vale 0 pontos
+CODIGO_SEM_OPCAO = len(OPCOES)
+TABELA_PONTOS = np.array(list(OPCOES_PONTOS.values()) + [0], dtype=np.int64)
+TEXTO_SEM_OPCAO = "Selecione..."
+
+# Código de cada opção, mais os valores aceitos para "nenhuma opção escolhida"
+CODIGOS = {opcao: codigo for codigo, opcao in enumerate(OPCOES)}
+for _vazio in ("", TEXTO_SEM_OPCAO, None):
+    CODIGOS[_vazio] = CODIGO_SEM_OPCAO
+
+
+def codificar_opcoes(grade, n_produtos):
+    """Converte uma lista de linhas de opções (uma por critério) na matriz ``int8`` M×N.
+
+    Cada linha precisa ter ao menos ``n_produtos`` opções; valores extras são ignorados.
+    """
+    for linha in grade:
+        if len(linha) < n_produtos:
+            raise ValueError(f"Critério com {len(linha)} pontuações para {n_produtos} produtos.")
+    codigos = np.fromiter(
+        (CODIGOS.get(opcao, CODIGO_SEM_OPCAO) for linha in grade for opcao in linha[:n_produtos]),
+        dtype=np.int8,
+        count=len(grade) * n_produtos,
+    )
+    return codigos.reshape(len(grade), n_produtos)
+
+
+@dataclass
+class ResultadoPontuacao:
+    pontos: np.ndarray         # M×N, pontos de cada célula
+    totais: np.ndarray         # N, total (ponderado, se houver pesos) por produto
+    por_criterio: np.ndarray   # M, soma dos pontos de cada critério entre os produtos
+    posicoes: np.ndarray       # N, posição de cada produto (1 = melhor; empatados dividem a posição)
+    vencedoras: list           # índices dos produtos com o maior total
+    empates: list              # grupos (listas de índices) de produtos com o mesmo total
+
+    @property
+    def vencedora(self):
+        """Índice da primeira vencedora (na ordem dos produtos)."""
+        return self.vencedoras[0]
+
+
+def pontuar(codigos, pesos=None, tabela=TABELA_PONTOS):
+    """Calcula o resultado para a matriz de ``codigos``; ``pesos`` (um por critério) é opcional."""
+    pontos = tabela[codigos]
+    por_criterio = pontos.sum(axis=1)
+    if pesos is None:
+        totais = pontos.sum(axis=0)
+    else:
+        totais = np.asarray(pesos, dtype=np.float64) @ pontos
+
+    # Posição no estilo "competição": 1 + quantos produtos têm total estritamente maior
+    posicoes = (totais[None, :] > totais[:, None]).sum(axis=1) + 1
+
+    valores, grupo, contagem = np.unique(totais, return_inverse=True, return_counts=True)
+    grupo = grupo.ravel()
+    empates = [np.flatnonzero(grupo == g).tolist() for g in np.flatnonzero(contagem > 1)]
+    vencedoras = np.flatnonzero(totais == valores[-1]).tolist() if len(totais) else []
+
+    return ResultadoPontuacao(pontos, totais, por_criterio, posicoes, vencedoras, empates)
+
+
+def nome_vencedora(produtos, resultado):
+    """Nome da vencedora, ou "Empate: A e B" quando mais de um produto tem o maior total."""
+    if len(resultado.vencedoras) > 1:
+        return "Empate: " + " e ".join(produtos[i] for i in resultado.vencedoras)
+    return produtos[resultado.vencedora]
@@ -0,0 +1,172 @@
+"""Pool de processos para a renderização de relatórios.
+
+ReportLab e Matplotlib são CPU puro e, dentro da thread da requisição,
+ficam serializados pelo GIL. O ``PoolRenderizacao`` envia o trabalho para
+um ``ProcessPoolExecutor`` cujos workers importam (e aquecem) essas
+bibliotecas uma única vez, limita quantas tarefas podem estar pendentes
+e mede profundidade da fila e tempo ocupado dos workers.
+"""
+import importlib
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from comparador.relatorio import MODULOS_RENDERIZACAO
+
+MODULOS_PADRAO = MODULOS_RENDERIZACAO
+
+
+class FilaCheia(Exception):
+    """Levantada quando o pool já tem o máximo de tarefas pendentes."""
+
+    def __init__(self, tentar_novamente_em):
+        super().__init__("Fila de renderização cheia.")
+        self.tentar_novamente_em = tentar_novamente_em
+
+
+def _inicializar_worker(modulos, aquecimento):
+    for modulo in modulos:
+        importlib.import_module(modulo)
+    if aquecimento is not None:
+        aquecimento()
+
+
+def _executar_medido(funcao, args, kwargs):
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+
+class PoolRenderizacao:
+    """``ProcessPoolExecutor`` com workers aquecidos e fila limitada.
+
+    ``fila_maxima`` é o número de tarefas que podem aguardar além das que já
+    estão em execução; ao ultrapassá-lo, ``submeter`` levanta ``FilaCheia``
+    em vez de enfileirar sem limite. O executor só é criado na primeira
+    submissão, para não criar processos ao importar o app.
+    """
+
+    def __init__(self, processos=None, fila_maxima=None, modulos=MODULOS_PADRAO, aquecimento=None, contexto=None):
+        self.processos = processos or os.cpu_count() or 1
+        self.fila_maxima = self.processos * 2 if fila_maxima is None else fila_maxima
+        self.modulos = tuple(modulos)
+        self.aquecimento = aquecimento
+        self.contexto = contexto
+        self._executor = None
+        self._lock = threading.Lock()
+        self._vagas = threading.BoundedSemaphore(self.processos + self.fila_maxima)
+        self._inicio = time.monotonic()
+        self.em_andamento = 0
+        self.concluidas = 0
+        self.falhas = 0
+        self.rejeitadas = 0
+        self.tempo_ocupado = 0.0
+
+    def _obter_executor(self):
+        with self._lock:
+            if self._executor is None:
+                contexto = multiprocessing.get_context(self.contexto) if self.contexto else None
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processos,
+                    mp_context=contexto,
+                    initializer=_inicializar_worker,
+                    initargs=(self.modulos, self.aquecimento),
+                )
+                self._inicio = time.monotonic()
+            return self._executor
+
+    def _descartar_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def aquecer(self):
+        """Cria os workers imediatamente (em vez de na primeira requisição)."""
+        executor = self._obter_executor()
+        futuros = [executor.submit(_executar_medido, int, (), {}) for _ in range(self.processos)]
+        for futuro in futuros:
+            futuro.result()
+
+    def tempo_estimado_espera(self):
+        """Estimativa, em segundos inteiros, até uma vaga ser liberada (para ``Retry-After``)."""
+        with self._lock:
+            media = (self.tempo_ocupado / self.concluidas) if self.concluidas else 1.0
+            na_fila = max(0, self.em_andamento - self.processos)
+        return max(1, math.ceil(media * (na_fila + 1) / self.processos))
+
+    def submeter(self, funcao, *args, **kwargs):
+        """Agenda ``funcao(*args, **kwargs)`` em um worker e retorna um ``Future``.
+
+        ``funcao`` precisa ser importável pelo worker (definida no nível de módulo).
+        """
+        if not self._vagas.acquire(blocking=False):
+            with self._lock:
+                self.rejeitadas += 1
+            raise FilaCheia(self.tempo_estimado_espera())
+
+        executor = self._obter_executor()
+        externo = Future()
+        externo.set_running_or_notify_cancel()
+        with self._lock:
+            self.em_andamento += 1
+        try:
+            interno = executor.submit(_executar_medido, funcao, args, kwargs)
+        except (BrokenProcessPool, RuntimeError):
+            self._finalizar(None, 0.0)
+            self._descartar_executor(executor)
+            raise
+
+        def concluir(futuro):
+            try:
+                resultado, duracao = futuro.result()
+            except BaseException as erro:
+                self._finalizar(erro, 0.0)
+                if isinstance(erro, BrokenProcessPool):
+                    self._descartar_executor(executor)
+                externo.set_exception(erro)
+            else:
+                self._finalizar(None, duracao)
+                externo.set_result(resultado)
+
+        interno.add_done_callback(concluir)
+        return externo
+
+    def executar(self, funcao, *args, timeout=None, **kwargs):
+        """Versão síncrona de ``submeter``: espera e retorna o resultado."""
+        return self.submeter(funcao, *args, **kwargs).result(timeout=timeout)
+
+    def _finalizar(self, erro, duracao):
+        with self._lock:
+            self.em_andamento -= 1
+            if erro is None:
+                self.concluidas += 1
+                self.tempo_ocupado += duracao
+            else:
+                self.falhas += 1
+        self._vagas.release()
+
+    def estatisticas(self):
+        with self._lock:
+            decorrido = max(time.monotonic() - self._inicio, 1e-9)
+            return {
+                "processos": self.processos,
+                "fila_maxima": self.fila_maxima,
+                "em_andamento": self.em_andamento,
+                "profundidade_fila": max(0, self.em_andamento - self.processos),
+                "concluidas": self.concluidas,
+                "falhas": self.falhas,
+                "rejeitadas": self.rejeitadas,
+                "tempo_ocupado_s": self.tempo_ocupado,
+                "utilizacao": min(1.0, self.tempo_ocupado / (decorrido * self.processos)) if self._executor else 0.0,
+            }
+
+    def encerrar(self, esperar=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=esperar)
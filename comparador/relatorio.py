@@ -0,0 +1,230 @@
+"""Geração do PDF de uma comparação, compartilhada pelo app web e pela GUI.
+
+As duas interfaces diferem só na aparência, descrita pelo
+``ModeloRelatorio`` de cada uma. ReportLab e Matplotlib não são
+importados junto com este módulo, e sim na primeira renderização, então
+a GUI abre e o servidor fica pronto sem carregá-los; ``precarregar`` faz
+essa importação antes (workers do pool, aquecimento).
+
+``gerar_pdf_varios`` junta várias comparações em um único documento, que
+guarda uma só vez o que se repete entre elas: fontes, seção de regras e
+imagens de gráfico idênticas (o ReportLab reaproveita o XObject de uma
+imagem com o mesmo conteúdo).
+"""
+import importlib
+import io
+from xml.sax.saxutils import escape
+
+from comparador.cronometro import Cronometro
+
+# Módulos pesados usados na renderização (importados por `precarregar`)
+MODULOS_RENDERIZACAO = (
+    'reportlab.platypus',
+    'reportlab.graphics.charts.barcharts',
+    'matplotlib.figure',
+    'matplotlib.backends.backend_agg',
+    'comparador.tabela_grande',
+)
+
+
+def precarregar(modulos=MODULOS_RENDERIZACAO):
+    """Importa as bibliotecas de renderização agora, em vez de no primeiro PDF."""
+    for modulo in modulos:
+        importlib.import_module(modulo)
+    configurar_reportlab()
+
+
+_reportlab_configurado = False
+
+def configurar_reportlab():
+    """Ajusta as opções globais do ReportLab usadas pelos relatórios (uma vez por processo)."""
+    # Streams comprimidos gravados em binário: o padrão do ReportLab (ASCII85) aumenta cada um em 25%
+    global _reportlab_configurado
+    if not _reportlab_configurado:
+        from reportlab import rl_config
+
+        rl_config.useA85 = 0
+        _reportlab_configurado = True
+
+
+def _documento(destino, modelo):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+
+    configurar_reportlab()
+    return SimpleDocTemplate(destino, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18,
+                             pageCompression=1, invariant=int(modelo.invariante))
+
+
+def _sem_progresso(fracao, mensagem):
+    pass
+
+
+def gerar_tabela(comparacao, modelo):
+    """Tabela de pontuação (um Paragraph por célula) para comparações que cabem em uma página."""
+    from reportlab.platypus import Paragraph, Table
+
+    normal = modelo.estilos['NormalCustom']
+    produtos = list(comparacao.produtos)
+    # Na variante com total por critério, a última coluna soma os pontos do critério entre os produtos
+    totais_criterio = comparacao.totais_criterio if modelo.total_por_criterio else None
+    extras = ["TOTAL"] if totais_criterio is not None else []
+    data = [["CRITÉRIOS"] + produtos + extras]
+
+    for i, criterio in enumerate(comparacao.criterios):
+        row = [Paragraph(escape(criterio), normal)] + [Paragraph(texto, normal) for texto in comparacao.textos_linha(i)]
+        if totais_criterio is not None:
+            row.append(Paragraph(str(totais_criterio[i]), normal))
+        data.append(row)
+
+    linha_total = [Paragraph("<b>PONTUAÇÃO FINAL</b>", normal)]
+    linha_total += [Paragraph(f"<b>{int(total)} pts</b>", normal) for total in comparacao.totais]
+    if totais_criterio is not None:
+        linha_total.append(Paragraph("---", normal))
+    data.append(linha_total)
+
+    table = Table(data, colWidths=[200] + [modelo.largura_produto] * (len(produtos) + len(extras)))
+    table.setStyle(modelo.estilo_tabela('detalhes'))
+    return table
+
+
+def secao_sensibilidade(sensibilidade, modelo):
+    """Flowables da seção opcional com o resultado de `analisar_sensibilidade` (já em dicionário)."""
+    from reportlab.platypus import Paragraph, Spacer, Table
+
+    styles = modelo.estilos
+    secao = [
+        Spacer(1, 12),
+        Paragraph("Análise de Sensibilidade", styles['Heading2Custom']),
+        Paragraph(
+            f"Em {sensibilidade['amostras']:_} cenários com pesos e pontos sorteados, ".replace('_', '.') +
+            f"<b>{escape(sensibilidade['vencedora_base'])}</b> venceu em {sensibilidade['estabilidade']:.1%} deles.",
+            styles['NormalCustom']),
+        Spacer(1, 6),
+    ]
+    data = [["PRODUTO", "VITÓRIAS", "POSIÇÃO ESPERADA"]]
+    for item in sensibilidade['produtos']:
+        data.append([item['produto'], f"{item['probabilidade_vitoria']:.1%}", f"{item['posicao_esperada']:.2f}"])
+    table = Table(data, colWidths=[200, 100, 120])
+    table.setStyle(modelo.estilo_tabela('sensibilidade'))
+    secao.append(table)
+    if sensibilidade['criterios_decisivos']:
+        nomes = ", ".join(escape(c['criterio']) for c in sensibilidade['criterios_decisivos'])
+        secao.append(Spacer(1, 6))
+        secao.append(Paragraph(f"Critérios que mais alteram o resultado: {nomes}", styles['NormalCustom']))
+    return secao
+
+
+def _secao_comparacao(doc, comparacao, nome_vencedora, modelo, grafico_vetorial, sensibilidade, cronometro, avisar):
+    """Flowables de uma comparação: vencedora, tabela, gráfico e, se houver, a análise de sensibilidade."""
+    from reportlab.lib import colors
+    from reportlab.platypus import Image, Paragraph, Spacer
+
+    from comparador.tabela_grande import montar_tabelas, precisa_tabela_grande
+
+    styles = modelo.estilos
+    Story = [Paragraph(f"<b>VENCEDORA: {escape(nome_vencedora)}</b>", styles['Heading2Custom']), Spacer(1, 12)]
+
+    produtos = comparacao.produtos
+    with cronometro.etapa('tabela'):
+        if modelo.secoes_numeradas:
+            Story.append(Paragraph("<b>1. Tabela Detalhada de Pontuação</b>", styles['Heading2Custom']))
+        # Tabelas que não cabem na largura da página (ou com muitos critérios) usam o renderizador paginado
+        if precisa_tabela_grande(len(produtos), len(comparacao.criterios), doc.pagesize[0] - 72,
+                                 largura_produto=modelo.largura_produto, colunas_extras=int(modelo.total_por_criterio)):
+            Story.extend(montar_tabelas(produtos, comparacao.criterios, comparacao.textos_colunas(), comparacao.totais,
+                                        doc.width, cor_cabecalho=colors.toColor(modelo.cor_cabecalho),
+                                        cor_linhas=colors.toColor(modelo.cor_linhas),
+                                        totais_criterio=comparacao.totais_criterio if modelo.total_por_criterio else None))
+        else:
+            Story.append(gerar_tabela(comparacao, modelo))
+        Story.append(Spacer(1, 24))
+
+    avisar(0.15, "Gerando o gráfico...")
+    largura, altura = modelo.tamanho_grafico
+    with cronometro.etapa('grafico'):
+        if grafico_vetorial:
+            grafico = modelo.graficos.gerar_desenho(produtos, comparacao.totais, nome_vencedora, largura=largura, altura=altura)
+        else:
+            png = modelo.graficos.gerar_png(produtos, comparacao.totais, nome_vencedora, paleta=modelo.paleta_grafico)
+            grafico = Image(io.BytesIO(png), width=largura, height=altura)
+    if modelo.secoes_numeradas:
+        Story.append(Paragraph("<b>2. Gráfico de Comparação de Pontuação Total</b>", styles['Heading2Custom']))
+        Story.append(grafico)
+        Story.append(Spacer(1, 12))
+    else:
+        Story.append(grafico)
+
+    if sensibilidade:
+        Story.extend(secao_sensibilidade(sensibilidade, modelo))
+    return Story
+
+
+def gerar_pdf(comparacao, nome_vencedora, modelo, grafico_vetorial=False, sensibilidade=None, cronometro=None,
+              progresso=None, destino=None):
+    """Gera o PDF da ``Comparacao`` com a aparência de ``modelo`` e retorna ``destino``.
+
+    ``destino`` é um nome de arquivo ou um arquivo aberto (padrão: um novo
+    ``BytesIO``, devolvido já no início). ``cronometro`` recebe a duração de
+    cada etapa e ``progresso(fracao, mensagem)`` é chamado ao longo da
+    geração; se levantar uma exceção, o PDF não é concluído.
+    """
+    cronometro = cronometro or Cronometro()
+    avisar = progresso or _sem_progresso
+    destino = io.BytesIO() if destino is None else destino
+    doc = _documento(destino, modelo)
+    avisar(0.05, "Montando a tabela...")
+
+    Story = modelo.titulo()
+    Story.extend(_secao_comparacao(doc, comparacao, nome_vencedora, modelo, grafico_vetorial, sensibilidade,
+                                   cronometro, avisar))
+    Story.extend(modelo.secao_regras())
+
+    # Paginação: de 25% a 100%, conforme os flowables são consumidos (`fracao=None` só atualiza a mensagem)
+    if progresso is not None:
+        avisar(0.25, "Paginando o documento...")
+        estimativa = [max(len(Story), 1)]
+        def progresso_build(tipo, valor):
+            if tipo == 'SIZE_EST':
+                estimativa[0] = max(valor, 1)
+            elif tipo == 'PROGRESS':
+                avisar(0.25 + 0.75 * min(valor / estimativa[0], 1.0), "Paginando o documento...")
+            elif tipo == 'PAGE':
+                # Páginas também são pontos de cancelamento dentro de uma tabela longa
+                avisar(None, f"Paginando o documento (página {valor})...")
+        doc.setProgressCallBack(progresso_build)
+
+    with cronometro.etapa('build'):
+        doc.build(Story)
+    if not isinstance(destino, str):
+        destino.seek(0)
+    return destino
+
+
+def gerar_pdf_varios(relatorios, modelo, grafico_vetorial=False, cronometro=None, destino=None):
+    """Gera um único PDF com várias comparações, uma a partir de cada página, e retorna ``destino``.
+
+    ``relatorios`` é uma lista de dicionários com ``comparacao``,
+    ``nome_vencedora`` e, opcionalmente, ``sensibilidade`` (os argumentos de
+    ``gerar_pdf``). A seção de regras aparece uma vez, no fim.
+    """
+    from reportlab.platypus import PageBreak, Paragraph
+
+    cronometro = cronometro or Cronometro()
+    destino = io.BytesIO() if destino is None else destino
+    doc = _documento(destino, modelo)
+
+    Story = modelo.titulo()
+    for numero, relatorio in enumerate(relatorios, 1):
+        if numero > 1:
+            Story.append(PageBreak())
+        Story.append(Paragraph(f"Comparação {numero} de {len(relatorios)}", modelo.estilos['NormalCustom']))
+        Story.extend(_secao_comparacao(doc, relatorio['comparacao'], relatorio['nome_vencedora'], modelo, grafico_vetorial,
+                                       relatorio.get('sensibilidade'), cronometro, _sem_progresso))
+    Story.extend(modelo.secao_regras())
+
+    with cronometro.etapa('build'):
+        doc.build(Story)
+    if not isinstance(destino, str):
+        destino.seek(0)
+    return destino
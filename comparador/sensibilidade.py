@@ -0,0 +1,150 @@
+"""Análise de estabilidade da vencedora (Monte Carlo sobre pesos e pontos).
+
+Cada amostra sorteia um peso por critério e uma tabela de pontos que
+preserva a ordem das opções (Excelente ≥ Bom ≥ Regular ≥ Não possui = 0).
+Os totais de todas as amostras de um lote saem de produtos de matrizes
+``(S×M) @ (M×N)``, um por opção, sem laço Python por amostra.
+"""
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from comparador.pontuacao import CODIGO_SEM_OPCAO, OPCOES_PONTOS, pontuar
+
+AMOSTRAS_PADRAO = 200_000
+# Análises com o número de amostras automático (relatório em PDF) sorteiam no máximo este total de
+# células (amostras × critérios × produtos): comparações grandes usam menos amostras, até AMOSTRAS_MINIMAS
+ORCAMENTO_CELULAS = 200_000_000
+AMOSTRAS_MINIMAS = 1_000
+# Limite de elementos por matriz intermediária de um lote (controla a memória)
+ELEMENTOS_POR_LOTE = 2_000_000
+
+
+@dataclass
+class ResultadoSensibilidade:
+    amostras: int
+    vencedora_base: int
+    probabilidade_vitoria: np.ndarray   # N, fração das amostras vencidas por produto
+    posicao_esperada: np.ndarray        # N, posição média (1 = melhor)
+    influencia: np.ndarray              # M, o quanto pesar mais o critério tende a trocar a vencedora
+    duracao_s: float
+
+    @property
+    def estabilidade(self):
+        """Probabilidade de a vencedora com os pontos fixos continuar vencendo."""
+        return float(self.probabilidade_vitoria[self.vencedora_base])
+
+    def criterios_decisivos(self, limite=5):
+        """Índices dos critérios com influência positiva, do mais ao menos decisivo."""
+        ordem = np.argsort(-self.influencia, kind='stable')
+        return [int(m) for m in ordem[:limite] if self.influencia[m] > 0]
+
+    def como_dict(self, produtos, criterios):
+        return {
+            "amostras": self.amostras,
+            "vencedora_base": produtos[self.vencedora_base],
+            "estabilidade": self.estabilidade,
+            "produtos": [
+                {
+                    "produto": produto,
+                    "probabilidade_vitoria": float(self.probabilidade_vitoria[j]),
+                    "posicao_esperada": float(self.posicao_esperada[j]),
+                }
+                for j, produto in enumerate(produtos)
+            ],
+            "criterios_decisivos": [
+                {"criterio": criterios[m], "influencia": float(self.influencia[m])}
+                for m in self.criterios_decisivos()
+            ],
+            "duracao_s": self.duracao_s,
+        }
+
+
+def amostras_para(n_criterios, n_produtos, maximo=AMOSTRAS_PADRAO):
+    """Número de amostras para uma comparação M×N dentro de ``ORCAMENTO_CELULAS``."""
+    return max(AMOSTRAS_MINIMAS, min(maximo, ORCAMENTO_CELULAS // max(n_criterios * n_produtos, 1)))
+
+
+def _sortear_pontos(rng, tamanho, variar_pontos):
+    """Tabelas de pontos (S×K+1) com ordem preservada; a última coluna é o código sem opção."""
+    n_opcoes = CODIGO_SEM_OPCAO
+    pontos = np.zeros((tamanho, n_opcoes + 1), dtype=np.float32)
+    if not variar_pontos:
+        pontos[:, :n_opcoes] = list(OPCOES_PONTOS.values())
+        return pontos
+    maximo = max(OPCOES_PONTOS.values())
+    # "Não possui" continua valendo 0; as demais opções recebem valores ordenados em [0, maximo]
+    sorteados = rng.random((tamanho, n_opcoes - 1), dtype=np.float32) * maximo
+    pontos[:, :n_opcoes - 1] = -np.sort(-sorteados, axis=1)
+    return pontos
+
+
+def analisar_sensibilidade(codigos, amostras=AMOSTRAS_PADRAO, semente=None, variar_pontos=True):
+    """Roda a simulação para a matriz de ``codigos`` (M×N) de ``pontuacao.codificar_opcoes``."""
+    inicio = time.perf_counter()
+    n_criterios, n_produtos = codigos.shape
+    vencedora_base = pontuar(codigos).vencedora
+    rng = np.random.default_rng(semente)
+
+    # Matrizes indicadoras por opção: indicadores[k][m, j] = 1 se o produto j tem a opção k no critério m
+    opcoes_presentes = [k for k in range(CODIGO_SEM_OPCAO) if (codigos == k).any()]
+    indicadores = [(codigos == k).astype(np.float32) for k in opcoes_presentes]
+
+    vitorias = np.zeros(n_produtos, dtype=np.float64)
+    soma_posicoes = np.zeros(n_produtos, dtype=np.float64)
+    soma_fracao_perde = np.zeros(n_criterios, dtype=np.float64)
+    soma_fracao_ganha = np.zeros(n_criterios, dtype=np.float64)
+    n_perde = 0
+
+    lote = max(1, min(amostras, ELEMENTOS_POR_LOTE // max(n_criterios, n_produtos, 1)))
+    posicoes_base = np.arange(1, n_produtos + 1, dtype=np.float64)
+    feitas = 0
+    while feitas < amostras:
+        tamanho = min(lote, amostras - feitas)
+        feitas += tamanho
+
+        # Pesos exponenciais: a vencedora só depende dos pesos relativos (equivale a um Dirichlet uniforme)
+        pesos = rng.exponential(size=(tamanho, n_criterios)).astype(np.float32)
+        pontos = _sortear_pontos(rng, tamanho, variar_pontos)
+
+        totais = np.zeros((tamanho, n_produtos), dtype=np.float32)
+        for k, indicador in zip(opcoes_presentes, indicadores):
+            totais += (pesos @ indicador) * pontos[:, k:k + 1]
+
+        # Vitórias: empates dividem a amostra entre os empatados
+        maximos = totais.max(axis=1, keepdims=True)
+        empatados = totais >= maximos
+        vitorias += (empatados / empatados.sum(axis=1, keepdims=True)).sum(axis=0)
+
+        # Posições por competição, como em `pontuar`: empatados recebem a melhor posição do grupo.
+        # Na linha ordenada, cada início de grupo de totais iguais marca sua posição e o máximo acumulado a propaga.
+        ordem = np.argsort(-totais, axis=1, kind='stable')
+        ordenados = np.take_along_axis(totais, ordem, axis=1)
+        inicio_grupo = np.ones(ordenados.shape, dtype=bool)
+        inicio_grupo[:, 1:] = ordenados[:, 1:] != ordenados[:, :-1]
+        posicoes_ordenadas = np.maximum.accumulate(np.where(inicio_grupo, posicoes_base, 0.0), axis=1)
+        posicoes = np.empty_like(posicoes_ordenadas)
+        np.put_along_axis(posicoes, ordem, posicoes_ordenadas, axis=1)
+        soma_posicoes += posicoes.sum(axis=0)
+
+        fracoes = pesos / pesos.sum(axis=1, keepdims=True)
+        perde = ~empatados[:, vencedora_base]
+        n_perde += int(perde.sum())
+        soma_fracao_perde += fracoes[perde].sum(axis=0)
+        soma_fracao_ganha += fracoes[~perde].sum(axis=0)
+
+    n_ganha = amostras - n_perde
+    if n_perde and n_ganha:
+        influencia = soma_fracao_perde / n_perde - soma_fracao_ganha / n_ganha
+    else:
+        influencia = np.zeros(n_criterios)
+
+    return ResultadoSensibilidade(
+        amostras=amostras,
+        vencedora_base=vencedora_base,
+        probabilidade_vitoria=vitorias / amostras,
+        posicao_esperada=soma_posicoes / amostras,
+        influencia=influencia,
+        duracao_s=time.perf_counter() - inicio,
+    )
@@ -0,0 +1,192 @@
+"""Servidor pré-fork com aquecimento e prontidão.
+
+O processo pai importa o app e executa o aquecimento (fontes do ReportLab,
+cache de fontes e backend Agg do Matplotlib, estilos do relatório) antes
+de abrir o socket. Só então cria os workers com ``fork``: eles herdam o
+estado já aquecido por cópia na escrita (``gc.freeze`` evita que o coletor
+de lixo toque nessas páginas) e atendem o socket compartilhado com o
+servidor WSGI multithread do Werkzeug. Workers que terminam sem motivo
+são recriados a partir do pai, também já aquecidos.
+
+Em um ``SIGTERM`` (ou ``SIGINT``) os workers passam a responder 503 em
+``/ready``, continuam atendendo por ``drenagem`` segundos para o
+balanceador tirá-los de rotação, terminam as requisições em andamento e
+saem; o pai espera todos antes de sair.
+"""
+import gc
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+INICIANDO = 'iniciando'
+AQUECENDO = 'aquecendo'
+PRONTO = 'pronto'
+FALHOU = 'falhou'
+ENCERRANDO = 'encerrando'
+
+
+class Prontidao:
+    """Estado de prontidão do processo, exposto em ``/ready``."""
+
+    def __init__(self):
+        self.estado = INICIANDO
+        self.aquecimento_s = None
+        self.erro = None
+        self._lock = threading.Lock()
+
+    @property
+    def pronto(self):
+        return self.estado == PRONTO
+
+    def aquecer(self, funcao):
+        """Executa ``funcao`` (o aquecimento) e marca o processo como pronto, ou como falho se ela levantar."""
+        with self._lock:
+            self.estado = AQUECENDO
+        inicio = time.perf_counter()
+        try:
+            funcao()
+        except Exception as e:
+            logger.exception("Falha no aquecimento")
+            with self._lock:
+                self.estado, self.erro = FALHOU, f"{type(e).__name__}: {e}"
+            raise
+        with self._lock:
+            self.aquecimento_s = time.perf_counter() - inicio
+            if self.estado == AQUECENDO:
+                self.estado = PRONTO
+
+    def aquecer_em_segundo_plano(self, funcao):
+        """Inicia o aquecimento em uma thread, se ainda não foi feito (servidores WSGI externos)."""
+        with self._lock:
+            if self.estado != INICIANDO:
+                return
+            self.estado = AQUECENDO
+        threading.Thread(target=self._aquecer_sem_propagar, args=(funcao,), name='aquecimento', daemon=True).start()
+
+    def _aquecer_sem_propagar(self, funcao):
+        try:
+            self.aquecer(funcao)
+        except Exception:
+            pass  # já registrado em `erro`
+
+    def encerrar(self):
+        with self._lock:
+            self.estado = ENCERRANDO
+
+    def como_dict(self):
+        with self._lock:
+            dados = {"estado": self.estado, "pid": os.getpid(), "aquecimento_s": self.aquecimento_s}
+            if self.erro is not None:
+                dados["erro"] = self.erro
+            return dados
+
+
+class ServidorPreFork:
+    """Abre o socket, cria ``workers`` processos e os supervisiona até o encerramento.
+
+    ``antes_do_fork()`` é chamada no pai antes de criar os workers (por
+    exemplo, para fechar conexões de banco que não podem ser herdadas);
+    ``ao_iniciar_worker()`` e ``ao_encerrar_worker()`` rodam em cada worker,
+    logo depois do ``fork`` e depois da drenagem.
+    """
+
+    def __init__(self, aplicacao, host='0.0.0.0', porta=5000, workers=2, drenagem=5.0, prontidao=None,
+                 antes_do_fork=None, ao_iniciar_worker=None, ao_encerrar_worker=None, backlog=1024):
+        self.aplicacao = aplicacao
+        self.host = host
+        self.porta = porta
+        self.workers = workers
+        self.drenagem = drenagem
+        self.prontidao = prontidao or Prontidao()
+        self.antes_do_fork = antes_do_fork
+        self.ao_iniciar_worker = ao_iniciar_worker
+        self.ao_encerrar_worker = ao_encerrar_worker
+        self.backlog = backlog
+        self._pids = {}  # pid -> instante de criação
+        self._encerrando = False
+
+    # --- Pai ---
+    def servir(self):
+        soquete = socket.create_server((self.host, self.porta), backlog=self.backlog)
+        soquete.set_inheritable(True)
+        if self.antes_do_fork is not None:
+            self.antes_do_fork()
+        # Objetos criados até aqui (app importado e aquecido) ficam fora da coleta: as páginas continuam compartilhadas
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._ao_sinal)
+        signal.signal(signal.SIGINT, self._ao_sinal)
+        for _ in range(self.workers):
+            self._criar_worker(soquete)
+        logger.info("Servindo em %s:%s com %d workers", self.host, self.porta, self.workers)
+
+        while self._pids:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            criado_em = self._pids.pop(pid, None)
+            if criado_em is None or self._encerrando:
+                continue
+            logger.warning("Worker %d terminou (status %d); criando outro", pid, status)
+            if time.monotonic() - criado_em < 1.0:
+                time.sleep(1.0)  # evita um laço de recriação se o worker falha ao iniciar
+            self._criar_worker(soquete)
+        soquete.close()
+
+    def _ao_sinal(self, numero, quadro):
+        if self._encerrando:
+            return
+        self._encerrando = True
+        logger.info("Encerrando: drenando %d workers", len(self._pids))
+        for pid in list(self._pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _criar_worker(self, soquete):
+        pid = os.fork()
+        if pid == 0:
+            codigo = 1
+            try:
+                self._executar_worker(soquete)
+                codigo = 0
+            except BaseException:
+                logger.exception("Erro no worker %d", os.getpid())
+            finally:
+                os._exit(codigo)
+        self._pids[pid] = time.monotonic()
+
+    # --- Worker ---
+    def _executar_worker(self, soquete):
+        from werkzeug.serving import make_server
+
+        servidor = make_server(self.host, self.porta, self.aplicacao, threaded=True, fd=soquete.fileno())
+        soquete.close()
+        # Ao sair de `serve_forever`, `server_close` espera as requisições em andamento
+        servidor.daemon_threads = False
+        servidor.block_on_close = True
+
+        def drenar():
+            time.sleep(self.drenagem)
+            servidor.shutdown()
+
+        def ao_sinal(numero, quadro):
+            if self.prontidao.estado != ENCERRANDO:
+                self.prontidao.encerrar()
+                threading.Thread(target=drenar, name='drenagem', daemon=True).start()
+
+        signal.signal(signal.SIGTERM, ao_sinal)
+        signal.signal(signal.SIGINT, ao_sinal)
+        if self.ao_iniciar_worker is not None:
+            self.ao_iniciar_worker()
+        servidor.serve_forever()
+        if self.ao_encerrar_worker is not None:
+            self.ao_encerrar_worker()
@@ -0,0 +1,37 @@
+"""Gerador de comparações sintéticas (N produtos × M critérios).
+
+Produz o payload JSON de ``/gerar_pdf`` com tamanho, distribuição de
+opções e semente configuráveis. Usado pelos benchmarks, pelo aquecimento
+do servidor e pelo teste de carga.
+"""
+import numpy as np
+
+from comparador.pontuacao import OPCOES
+
+SEM_SELECAO = "Selecione..."
+
+# Probabilidade de cada opção, na ordem de OPCOES (+ "Selecione..." no fim)
+DISTRIBUICOES = {
+    'uniforme': (0.25, 0.25, 0.25, 0.25, 0.0),
+    'otimista': (0.45, 0.30, 0.15, 0.10, 0.0),
+    'pessimista': (0.10, 0.15, 0.30, 0.45, 0.0),
+    'incompleta': (0.20, 0.20, 0.20, 0.20, 0.20),
+}
+
+
+def gerar_grade(n_produtos, n_criterios, distribuicao='uniforme', semente=0):
+    """Matriz M×N de opções (strings) sorteadas com a distribuição escolhida."""
+    probabilidades = DISTRIBUICOES[distribuicao] if isinstance(distribuicao, str) else distribuicao
+    valores = np.array(OPCOES + (SEM_SELECAO,), dtype=object)
+    rng = np.random.default_rng(semente)
+    return rng.choice(valores, size=(n_criterios, n_produtos), p=probabilidades).tolist()
+
+
+def gerar_payload(n_produtos=3, n_criterios=5, distribuicao='uniforme', semente=0):
+    """Payload no formato aceito por ``/gerar_pdf``."""
+    grade = gerar_grade(n_produtos, n_criterios, distribuicao, semente)
+    return {
+        "produtos": [f"Produto {j + 1}" for j in range(n_produtos)],
+        "criterios": [{"nome": f"Critério {i + 1}", "pontuacoes": linha} for i, linha in enumerate(grade)],
+    }
+
@@ -0,0 +1,137 @@
+"""Saída em streaming dos PDFs, com memória limitada e suporte a ``Range``.
+
+O PDF é gravado em um ``SpooledTemporaryFile``: fica em memória até
+``limite_memoria`` bytes e passa para disco a partir daí. A resposta é
+enviada em blocos, com ``Content-Length`` e ``Accept-Ranges``, e responde
+``206``/``416`` a requisições ``Range`` para que clientes possam retomar
+downloads interrompidos.
+
+``zip_em_fluxo`` monta um ZIP em blocos, membro a membro, para respostas
+com vários relatórios.
+"""
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+from flask import Response, request
+
+TAMANHO_BLOCO = 64 * 1024
+
+
+def abrir_spool(limite_memoria):
+    return tempfile.SpooledTemporaryFile(max_size=limite_memoria, mode='w+b')
+
+
+def tamanho_arquivo(arquivo):
+    # tell() em vez do retorno de seek(): BLOBs do sqlite3 também servem de arquivo e seek() retorna None
+    arquivo.seek(0, os.SEEK_END)
+    tamanho = arquivo.tell()
+    arquivo.seek(0)
+    return tamanho
+
+
+def finalizar_spool(spool, limite_memoria, portavel=False):
+    """Retorna os bytes de um PDF pequeno ou o próprio arquivo para PDFs maiores que o limite.
+
+    Com ``portavel=True`` (resultado que volta de um worker do pool de processos)
+    o PDF grande é copiado para um arquivo temporário nomeado e o retorno é o
+    caminho, que o processo principal abre com ``abrir_desvinculado``.
+    """
+    if tamanho_arquivo(spool) <= limite_memoria:
+        with spool:
+            return spool.read()
+    if not portavel:
+        return spool
+    with spool, tempfile.NamedTemporaryFile(prefix='comparador_', suffix='.pdf', delete=False) as destino:
+        shutil.copyfileobj(spool, destino, TAMANHO_BLOCO)
+        return destino.name
+
+
+def abrir_desvinculado(caminho):
+    """Abre o arquivo e remove sua entrada do diretório; o espaço é liberado ao fechar."""
+    arquivo = open(caminho, 'rb')
+    os.unlink(caminho)
+    return arquivo
+
+
+def _blocos(arquivo, inicio, fim, tamanho_bloco):
+    try:
+        arquivo.seek(inicio)
+        restante = fim - inicio
+        while restante > 0:
+            bloco = arquivo.read(min(tamanho_bloco, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            yield bloco
+    finally:
+        arquivo.close()
+
+
+def resposta_streaming(arquivo, mimetype='application/pdf', download_name=None, etag=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Resposta Flask que envia ``arquivo`` em blocos, respeitando o cabeçalho ``Range``.
+
+    ``arquivo`` é fechado quando a resposta termina (ou no 416).
+    """
+    tamanho = tamanho_arquivo(arquivo)
+    cabecalhos = {'Accept-Ranges': 'bytes'}
+    if download_name:
+        cabecalhos['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    if etag:
+        cabecalhos['ETag'] = f'"{etag}"'
+
+    inicio, fim, status = 0, tamanho, 200
+    # If-Range: só atende o Range se o cliente ainda tiver a mesma versão do PDF
+    if_range = request.if_range
+    sem_if_range = if_range.etag is None and if_range.date is None
+    if request.range is not None and (sem_if_range or (etag is not None and if_range.etag == etag)):
+        intervalo = request.range.range_for_length(tamanho)
+        if intervalo is None:
+            arquivo.close()
+            cabecalhos['Content-Range'] = f'bytes */{tamanho}'
+            return Response(status=416, headers=cabecalhos)
+        inicio, fim = intervalo
+        status = 206
+        cabecalhos['Content-Range'] = f'bytes {inicio}-{fim - 1}/{tamanho}'
+
+    resposta = Response(_blocos(arquivo, inicio, fim, tamanho_bloco), status=status, mimetype=mimetype,
+                        headers=cabecalhos, direct_passthrough=True)
+    resposta.content_length = fim - inicio
+    return resposta
+
+
+class _SaidaAcumulada(io.RawIOBase):
+    """Arquivo somente de escrita e não posicionável; os bytes escritos são retirados com ``drenar``."""
+
+    def __init__(self):
+        super().__init__()
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def drenar(self):
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def zip_em_fluxo(membros, compressao=zipfile.ZIP_STORED):
+    """Gera os bytes de um ZIP à medida que ``membros`` (pares ``(nome, bytes)``) ficam prontos.
+
+    Como a saída não é posicionável, o ``zipfile`` grava cada membro com
+    descritor de dados e o diretório central no fim; nada além do membro
+    atual fica em memória. PDFs já são comprimidos, por isso ``ZIP_STORED``.
+    """
+    saida = _SaidaAcumulada()
+    with zipfile.ZipFile(saida, 'w', compression=compressao) as arquivo_zip:
+        for nome, dados in membros:
+            arquivo_zip.writestr(nome, dados)
+            yield saida.drenar()
+    yield saida.drenar()
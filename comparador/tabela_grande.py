@@ -0,0 +1,126 @@
+"""Tabela de pontuação para comparações grandes.
+
+Os produtos são divididos em grupos de colunas que cabem na largura da
+página, e cada grupo vira uma sequência de ``LongTable`` com o cabeçalho
+repetido a cada página. As células são strings simples com estilo
+definido por ``TableStyle`` (sem um ``Paragraph`` por célula); só nomes
+de critério longos demais para uma linha usam ``Paragraph``. Tabelas são
+limitadas a ``linhas_por_bloco`` linhas para que a quebra de páginas do
+ReportLab não fique quadrática no número de critérios.
+"""
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import LongTable, Paragraph, Spacer, TableStyle
+
+FONTE = 'Helvetica'
+FONTE_NEGRITO = 'Helvetica-Bold'
+TAMANHO_FONTE = 8
+ALTURA_LINHA = 14
+PADDING_HORIZONTAL = 6
+
+ESTILO_CRITERIO = ParagraphStyle('CriterioTabelaGrande', fontName=FONTE, fontSize=TAMANHO_FONTE, leading=10)
+ESTILO_GRUPO = ParagraphStyle('GrupoTabelaGrande', fontName=FONTE_NEGRITO, fontSize=10, leading=12)
+
+
+def precisa_tabela_grande(n_produtos, n_criterios, largura_disponivel, largura_criterio=200, largura_produto=100,
+                          colunas_extras=0, limite_criterios=150):
+    """Indica se a tabela simples não cabe na página ou tem critérios demais."""
+    largura = largura_criterio + largura_produto * (n_produtos + colunas_extras)
+    return largura > largura_disponivel or n_criterios > limite_criterios
+
+
+def grupos_de_colunas(n_produtos, largura_disponivel, largura_criterio, largura_produto, colunas_extras=0):
+    """Divide os produtos em intervalos ``(inicio, fim)`` que cabem na largura disponível."""
+    por_grupo = max(1, int((largura_disponivel - largura_criterio) // largura_produto) - colunas_extras)
+    return [(inicio, min(inicio + por_grupo, n_produtos)) for inicio in range(0, n_produtos, por_grupo)]
+
+
+def montar_tabelas(produtos, criterios, colunas, totais, largura_disponivel, estilo_criterio=ESTILO_CRITERIO,
+                   cor_cabecalho=colors.HexColor('#1a237e'), cor_linhas=colors.HexColor('#f0f4f8'),
+                   totais_criterio=None, largura_criterio=140, largura_produto=77, linhas_por_bloco=400):
+    """Retorna os flowables da tabela paginada.
+
+    ``colunas`` tem uma lista de textos por produto (ver ``Comparacao.textos_colunas``) e
+    ``totais`` o total de cada produto. Com ``totais_criterio`` (um valor por
+    critério) cada grupo ganha a coluna TOTAL usada pela versão da GUI.
+    """
+    colunas_extras = 1 if totais_criterio is not None else 0
+    grupos = grupos_de_colunas(len(produtos), largura_disponivel, largura_criterio, largura_produto, colunas_extras)
+    largura_texto = largura_criterio - 2 * PADDING_HORIZONTAL
+
+    # Nomes de critério que não cabem em uma linha viram Paragraph (quebra de linha); os demais ficam como texto
+    nomes = [
+        Paragraph(escape(nome), estilo_criterio) if stringWidth(nome, FONTE, TAMANHO_FONTE) > largura_texto else nome
+        for nome in criterios
+    ]
+
+    flowables = []
+    for numero, (inicio, fim) in enumerate(grupos):
+        if len(grupos) > 1:
+            if numero:
+                flowables.append(Spacer(1, 12))
+            flowables.append(Paragraph(f"Produtos {inicio + 1} a {fim} de {len(produtos)}", ESTILO_GRUPO))
+            flowables.append(Spacer(1, 4))
+
+        cabecalho = ["CRITÉRIOS"] + list(produtos[inicio:fim]) + (["TOTAL"] if colunas_extras else [])
+        cabecalho = [_encurtar(texto, largura_produto if i else largura_criterio) for i, texto in enumerate(cabecalho)]
+        larguras = [largura_criterio] + [largura_produto] * (fim - inicio + colunas_extras)
+        colunas_grupo = colunas[inicio:fim]
+
+        for bloco_inicio in range(0, len(criterios), linhas_por_bloco):
+            bloco_fim = min(bloco_inicio + linhas_por_bloco, len(criterios))
+            data = [cabecalho]
+            for m in range(bloco_inicio, bloco_fim):
+                linha = [nomes[m]] + [coluna[m] for coluna in colunas_grupo]
+                if colunas_extras:
+                    linha.append(str(totais_criterio[m]))
+                data.append(linha)
+            ultimo_bloco = bloco_fim == len(criterios)
+            if ultimo_bloco:
+                linha_total = ["PONTUAÇÃO FINAL"] + [f"{int(t)} pts" for t in totais[inicio:fim]]
+                data.append(linha_total + (["---"] if colunas_extras else []))
+
+            # Sem Paragraph no bloco, todas as linhas têm altura fixa e o ReportLab não precisa medi-las
+            fixas = not any(isinstance(nomes[m], Paragraph) for m in range(bloco_inicio, bloco_fim))
+            tabela = LongTable(data, colWidths=larguras, repeatRows=1,
+                               rowHeights=[ALTURA_LINHA] * len(data) if fixas else None)
+            tabela.setStyle(_estilo(cor_cabecalho, cor_linhas, ultimo_bloco))
+            flowables.append(tabela)
+    return flowables
+
+
+def _encurtar(texto, largura):
+    limite = largura - 2 * PADDING_HORIZONTAL
+    if stringWidth(texto, FONTE_NEGRITO, TAMANHO_FONTE) <= limite:
+        return texto
+    while texto and stringWidth(texto + "…", FONTE_NEGRITO, TAMANHO_FONTE) > limite:
+        texto = texto[:-1]
+    return texto + "…"
+
+
+_ESTILOS = {}
+
+
+def _estilo(cor_cabecalho, cor_linhas, com_total):
+    chave = (cor_cabecalho.hexval(), cor_linhas.hexval(), com_total)
+    estilo = _ESTILOS.get(chave)
+    if estilo is None:
+        comandos = [
+            ('FONTNAME', (0, 0), (-1, -1), FONTE),
+            ('FONTSIZE', (0, 0), (-1, -1), TAMANHO_FONTE),
+            ('BACKGROUND', (0, 0), (-1, 0), cor_cabecalho),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), FONTE_NEGRITO),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('BACKGROUND', (0, 1), (-1, -2 if com_total else -1), cor_linhas),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ]
+        if com_total:
+            comandos.append(('FONTNAME', (0, -1), (-1, -1), FONTE_NEGRITO))
+        estilo = _ESTILOS[chave] = TableStyle(comandos)
+    return estilo
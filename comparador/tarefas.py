@@ -0,0 +1,181 @@
+"""Tarefas assíncronas de geração de relatório (submeter, consultar, baixar).
+
+Cada tarefa roda em um pool local de threads; o PDF pronto é gravado em
+disco e expira após ``ttl`` segundos. Payloads idênticos (mesma chave do
+``cache_pdf``) enquanto uma tarefa ainda está na fila ou executando
+reaproveitam essa tarefa em vez de criar outra.
+
+O estado de cada tarefa também é gravado no diretório (``<id>.json``, ao
+lado do PDF), então qualquer processo que compartilhe o diretório — os
+workers do servidor pré-fork — consulta e baixa tarefas criadas pelos
+outros.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+_ID_VALIDO = re.compile(r'[0-9a-f]{32}')
+
+NA_FILA = 'queued'
+EXECUTANDO = 'running'
+CONCLUIDA = 'done'
+FALHOU = 'failed'
+
+
+class Tarefa:
+    __slots__ = ('id', 'chave', 'status', 'criada_em', 'iniciada_em', 'concluida_em',
+                 'expira_em', 'caminho', 'tamanho', 'erro')
+
+    def __init__(self, chave):
+        self.id = uuid.uuid4().hex
+        self.chave = chave
+        self.status = NA_FILA
+        self.criada_em = time.time()
+        self.iniciada_em = None
+        self.concluida_em = None
+        self.expira_em = None
+        self.caminho = None
+        self.tamanho = None
+        self.erro = None
+
+    def como_dict(self):
+        tempos = {"criada_em": self.criada_em, "iniciada_em": self.iniciada_em, "concluida_em": self.concluida_em}
+        if self.iniciada_em is not None:
+            tempos["espera_s"] = self.iniciada_em - self.criada_em
+        if self.concluida_em is not None and self.iniciada_em is not None:
+            tempos["execucao_s"] = self.concluida_em - self.iniciada_em
+        dados = {"id": self.id, "status": self.status, "tempos": tempos}
+        if self.status == CONCLUIDA:
+            dados["tamanho"] = self.tamanho
+            dados["expira_em"] = self.expira_em
+        if self.erro is not None:
+            dados["erro"] = self.erro
+        return dados
+
+    def estado(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    @classmethod
+    def de_estado(cls, estado):
+        tarefa = cls.__new__(cls)
+        for campo in cls.__slots__:
+            setattr(tarefa, campo, estado.get(campo))
+        return tarefa
+
+
+class GerenciadorTarefas:
+    """Agenda ``executar(*args) -> bytes`` em threads e guarda o resultado em disco."""
+
+    def __init__(self, executar, diretorio=None, trabalhadores=2, ttl=15 * 60):
+        self.executar = executar
+        self.ttl = ttl
+        self._diretorio_temporario = diretorio is None
+        self.diretorio = diretorio or tempfile.mkdtemp(prefix='comparador_tarefas_')
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix='tarefa-pdf')
+        self._tarefas = {}
+        self._em_voo = {}  # chave -> tarefa na fila ou executando
+        self._lock = threading.Lock()
+        self.deduplicadas = 0
+
+    def submeter(self, chave, *args):
+        """Retorna ``(tarefa, nova)``; ``nova`` é ``False`` quando a tarefa foi deduplicada."""
+        self.limpar_expiradas()
+        with self._lock:
+            existente = self._em_voo.get(chave)
+            if existente is not None:
+                self.deduplicadas += 1
+                return existente, False
+            tarefa = Tarefa(chave)
+            self._tarefas[tarefa.id] = tarefa
+            self._em_voo[chave] = tarefa
+        self._salvar(tarefa)
+        self._executor.submit(self._rodar, tarefa, args)
+        return tarefa, True
+
+    def obter(self, id_tarefa):
+        """Tarefa deste processo ou, pelo estado gravado no diretório, de outro; ``None`` se não existe ou expirou."""
+        self.limpar_expiradas()
+        with self._lock:
+            tarefa = self._tarefas.get(id_tarefa)
+        if tarefa is not None or not _ID_VALIDO.fullmatch(id_tarefa):
+            return tarefa
+        try:
+            with open(self._caminho_estado(id_tarefa), encoding='utf-8') as arquivo:
+                tarefa = Tarefa.de_estado(json.load(arquivo))
+        except (OSError, ValueError):
+            return None
+        if tarefa.expira_em is not None and tarefa.expira_em <= time.time():
+            self._remover_arquivos(tarefa)
+            return None
+        return tarefa
+
+    def _caminho_estado(self, id_tarefa):
+        return os.path.join(self.diretorio, f"{id_tarefa}.json")
+
+    def _salvar(self, tarefa):
+        # Gravação atômica: quem lê nunca vê um JSON pela metade
+        caminho = self._caminho_estado(tarefa.id)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(tarefa.estado(), arquivo)
+        os.replace(temporario, caminho)
+
+    def _remover_arquivos(self, tarefa):
+        for caminho in (tarefa.caminho, self._caminho_estado(tarefa.id)):
+            if caminho:
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+
+    def _rodar(self, tarefa, args):
+        tarefa.iniciada_em = time.time()
+        tarefa.status = EXECUTANDO
+        self._salvar(tarefa)
+        try:
+            pdf_bytes = self.executar(*args)
+            caminho = os.path.join(self.diretorio, f"{tarefa.id}.pdf")
+            with open(caminho, 'wb') as arquivo:
+                arquivo.write(pdf_bytes)
+        except Exception as erro:
+            tarefa.erro = str(erro)
+            status = FALHOU
+        else:
+            tarefa.caminho = caminho
+            tarefa.tamanho = len(pdf_bytes)
+            status = CONCLUIDA
+        with self._lock:
+            tarefa.concluida_em = time.time()
+            tarefa.expira_em = tarefa.concluida_em + self.ttl
+            tarefa.status = status
+            if self._em_voo.get(tarefa.chave) is tarefa:
+                del self._em_voo[tarefa.chave]
+        self._salvar(tarefa)
+
+    def limpar_expiradas(self):
+        agora = time.time()
+        with self._lock:
+            expiradas = [t for t in self._tarefas.values() if t.expira_em is not None and t.expira_em <= agora]
+            for tarefa in expiradas:
+                del self._tarefas[tarefa.id]
+        for tarefa in expiradas:
+            self._remover_arquivos(tarefa)
+
+    def estatisticas(self):
+        with self._lock:
+            contagem = {NA_FILA: 0, EXECUTANDO: 0, CONCLUIDA: 0, FALHOU: 0}
+            for tarefa in self._tarefas.values():
+                contagem[tarefa.status] += 1
+            return {"por_status": contagem, "deduplicadas": self.deduplicadas}
+
+    def encerrar(self):
+        self._executor.shutdown(wait=True)
+        if self._diretorio_temporario:
+            shutil.rmtree(self.diretorio, ignore_errors=True)
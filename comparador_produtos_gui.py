@@ -1,336 +1,461 @@
 import tkinter as tk
 from tkinter import ttk
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib import colors
-import matplotlib.pyplot as plt
-import io
+import queue
+import threading
+
+import numpy as np
+
+from comparador.graficos import MotorGraficos
+from comparador.modelo import TEXTO_SEM_OPCAO, Comparacao, decodificar_comparacao
+from comparador.modelo_relatorio import ModeloRelatorio
+from comparador.pontuacao import CODIGO_SEM_OPCAO, OPCOES, TABELA_PONTOS, nome_vencedora
+from comparador.relatorio import gerar_pdf as gerar_pdf_relatorio
 
 # --- Configurações Fixas ---
-OPCOES_PONTOS = {
-    "Excelente": 10,
-    "Bom": 5,
-    "Regular": 3,
-    "Não possui": 0
-}
+motor_graficos = MotorGraficos(cores=['#4B0082', '#6A5ACD', '#9370DB'], # Cores inspiradas na imagem
+                               titulo='Comparativo de Pontuação Total (Vencedora: {vencedora})',
+                               tamanho_rotulo=10)
+
+# Aparência do relatório da GUI: seções numeradas, coluna TOTAL por critério e "Regras de Pontuação"
+# (estilos, tabela e seções estáticas são montados uma única vez, no primeiro PDF)
+MODELO_RELATORIO = ModeloRelatorio(
+    estilos_tabela={'detalhes': [
+        ('BACKGROUND', (0, 0), (-1, 0), 'darkblue'),
+        ('TEXTCOLOR', (0, 0), (-1, 0), 'white'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'), # Alinhar critérios à esquerda
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -2), 'beige'),
+        ('GRID', (0, 0), (-1, -1), 1, 'black'),
+        ('BACKGROUND', (0, -1), (-1, -1), 'lightgrey'),
+    ]},
+    titulo_regras="<b>3. Regras de Pontuação</b>",
+    graficos=motor_graficos,
+    cor_cabecalho='darkblue',
+    cor_linhas='beige',
+    secoes_numeradas=True,
+    total_por_criterio=True,
+    largura_produto=80,
+    tamanho_grafico=(400, 200),
+)
 
 # --- Funções de Geração de PDF ---
 
-def gerar_grafico_comparacao(dados_comparacao, nome_vencedora):
-    """Gera um gráfico de barras comparando a pontuação total dos produtos."""
-    produtos = list(dados_comparacao.keys())
-    pontuacoes = [dados_comparacao[prod]["Total"] for prod in produtos]
+class GeracaoCancelada(Exception):
+    """Levantada pelo callback de progresso para interromper a geração do PDF."""
 
-    fig, ax = plt.subplots(figsize=(8, 4))
-    barras = ax.bar(produtos, pontuacoes, color=['#4B0082', '#6A5ACD', '#9370DB']) # Cores inspiradas na imagem
-    
-    ax.set_ylabel('Pontuação Total')
-    ax.set_title(f'Comparativo de Pontuação Total (Vencedora: {nome_vencedora})')
-    ax.spines['right'].set_visible(False)
-    ax.spines['top'].set_visible(False)
-    
-    # Adicionar rótulos de valor nas barras
-    for barra in barras:
-        yval = barra.get_height()
-        ax.text(barra.get_x() + barra.get_width()/2.0, yval, int(yval), ha='center', va='bottom', fontsize=10)
-
-    # Salvar o gráfico em um buffer de memória
-    buf = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format='png')
-    plt.close(fig)
-    buf.seek(0)
-    return buf
-
-def gerar_pdf(dados_comparacao, nome_vencedora, criterios_usados):
-    """Cria o PDF detalhado com a tabela de comparação e o gráfico.
-       Recebe a lista de critérios usados para garantir a ordem correta na tabela."""
-    
-    # 1. Configuração do Documento
-    doc = SimpleDocTemplate("comparativo_produtos.pdf", pagesize=A4,
-                            rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    styles = getSampleStyleSheet()
-    
-    # Estilos personalizados
-    styles.add(ParagraphStyle(name='TitleCustom', parent=styles['Title'], fontSize=20, spaceAfter=20, alignment=1))
-    styles.add(ParagraphStyle(name='Heading2Custom', parent=styles['Heading2'], fontSize=14, spaceBefore=10, spaceAfter=10))
-    styles.add(ParagraphStyle(name='NormalCustom', parent=styles['Normal'], fontSize=10))
+def gerar_pdf(comparacao, nome_vencedora, grafico_vetorial=False, cronometro=None, progresso=None,
+              destino="comparativo_produtos.pdf"):
+    """Cria o PDF detalhado com a tabela de comparação (`Comparacao`) e o gráfico.
+       Com `grafico_vetorial=True` o gráfico é desenhado pelo próprio ReportLab;
+       `cronometro` (opcional) recebe a duração de cada etapa e `progresso(fracao, mensagem)`
+       (opcional) é chamado ao longo da geração — se levantar uma exceção, o PDF não é gravado.
+       Retorna `destino` (nome do arquivo ou buffer em que o PDF foi gravado)."""
+    return gerar_pdf_relatorio(comparacao, nome_vencedora, MODELO_RELATORIO, grafico_vetorial=grafico_vetorial,
+                               cronometro=cronometro, progresso=progresso, destino=destino)
 
-    Story = []
+def calcular_comparacao(produtos, criterios_usados, codigos):
+    """Monta a `Comparacao` da matriz de códigos e retorna ela e o nome da vencedora (com tratamento de empates)."""
+    comparacao = Comparacao(produtos, criterios_usados, codigos)
+    if not produtos or not criterios_usados:
+        return comparacao, "Nenhuma (Sem critérios ou pontuação)"
+    return comparacao, nome_vencedora(comparacao.produtos, comparacao.resultado)
 
-    # 2. Título
-    Story.append(Paragraph("Relatório de Comparação de Produtos", styles['TitleCustom']))
-    Story.append(Paragraph(f"<b>VENCEDORA: {nome_vencedora}</b>", styles['Heading2Custom']))
-    Story.append(Spacer(1, 12))
+def renderizar_comparacao(item, caminho):
+    """Gera o PDF de um payload no formato de `/gerar_pdf` (usado pelo modo em lote)."""
+    comparacao = decodificar_comparacao(item)
+    if not comparacao.criterios:
+        raise ValueError("Dados insuficientes.")
+    _, vencedora = calcular_comparacao(comparacao.produtos, comparacao.criterios, comparacao.codigos)
+    gerar_pdf(comparacao, vencedora, destino=caminho)
 
-    # 3. Tabela de Detalhes
-    
-    # Preparar dados para a tabela
-    produtos = list(dados_comparacao.keys())
-    
-    # Cabeçalho: CRITÉRIOS + Nomes dos Produtos + TOTAL
-    data = [["CRITÉRIOS"] + produtos + ["TOTAL"]]
-    
-    # Linhas de Critérios
-    for criterio in criterios_usados:
-        row = [Paragraph(criterio, styles['NormalCustom'])]
-        
-        # Coletar pontuações para o critério em todos os produtos
-        pontuacoes_criterio = []
-        for produto in produtos:
-            # Buscar dados do critério no dicionário de dados_comparacao
-            criterio_data = dados_comparacao[produto]["Criterios"].get(criterio, {"Opcao": "N/A", "Pontos": 0})
-            
-            pontos = criterio_data["Pontos"]
-            opcao = criterio_data["Opcao"]
-            texto_celula = f"{pontos} pts ({opcao})"
-            row.append(Paragraph(texto_celula, styles['NormalCustom']))
-            pontuacoes_criterio.append(pontos)
-        
-        # Adicionar a pontuação total do critério (soma das colunas)
-        total_criterio = sum(pontuacoes_criterio)
-        row.append(Paragraph(str(total_criterio), styles['NormalCustom']))
-        data.append(row)
-        
-    # Linha de Totais
-    linha_total = [Paragraph("<b>PONTUAÇÃO FINAL</b>", styles['NormalCustom'])]
-    for produto in produtos:
-        linha_total.append(Paragraph(f"<b>{int(dados_comparacao[produto]['Total'])} pts</b>", styles['NormalCustom']))
-    linha_total.append(Paragraph("---", styles['NormalCustom'])) # Célula vazia para o total geral
-    data.append(linha_total)
-
-    # Criar e estilizar a tabela
-    table = Table(data, colWidths=[200] + [80] * len(produtos) + [80])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'), # Alinhar critérios à esquerda
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-    ]))
-    
-    Story.append(Paragraph("<b>1. Tabela Detalhada de Pontuação</b>", styles['Heading2Custom']))
-    Story.append(table)
-    Story.append(Spacer(1, 24))
+# --- Modelo de Dados dos Critérios ---
 
-    # 4. Gráfico de Comparação
-    
-    # Gerar o gráfico
-    grafico_buffer = gerar_grafico_comparacao(dados_comparacao, nome_vencedora)
-    img = Image(grafico_buffer, width=400, height=200)
-    
-    Story.append(Paragraph("<b>2. Gráfico de Comparação de Pontuação Total</b>", styles['Heading2Custom']))
-    Story.append(img)
-    Story.append(Spacer(1, 12))
-    
-    # 5. Notas Finais
-    Story.append(Paragraph("<b>3. Regras de Pontuação</b>", styles['Heading2Custom']))
-    Story.append(Paragraph("As pontuações foram atribuídas com base nas seguintes regras:", styles['NormalCustom']))
-    regras = [f"<b>{opcao}</b>: {pontos} pontos" for opcao, pontos in OPCOES_PONTOS.items()]
-    for regra in regras:
-        Story.append(Paragraph(regra, styles['NormalCustom']))
-    Story.append(Spacer(1, 12))
-    
-    # 6. Construir o PDF
-    doc.build(Story)
-    return "comparativo_produtos.pdf"
+PONTOS_POR_CODIGO = TABELA_PONTOS.tolist()
+
+class ModeloCriterios:
+    """Critérios da GUI em estruturas simples, sem widgets.
+
+    Cada critério guarda o nome e um ``bytearray`` com o código da opção de cada
+    produto (índices de ``OPCOES``). Os totais por produto são mantidos por
+    diferença, então seleções, renomeações e remoções não percorrem a grade.
+    Critérios sem nome não entram nos totais nem no relatório.
+    """
+
+    def __init__(self, n_produtos):
+        self.n_produtos = n_produtos
+        self.nomes = []
+        self.codigos = []
+        self.totais = [0] * n_produtos
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def _somar(self, indice, sinal):
+        if self.nomes[indice].strip():
+            for produto, codigo in enumerate(self.codigos[indice]):
+                self.totais[produto] += sinal * PONTOS_POR_CODIGO[codigo]
+
+    def adicionar(self, nome="Novo Critério", codigos=None):
+        self.nomes.append(nome)
+        self.codigos.append(bytearray(codigos) if codigos is not None else bytearray([CODIGO_SEM_OPCAO]) * self.n_produtos)
+        self._somar(len(self.nomes) - 1, 1)
+        return len(self.nomes) - 1
+
+    def remover(self, indice):
+        self._somar(indice, -1)
+        del self.nomes[indice]
+        del self.codigos[indice]
+
+    def renomear(self, indice, nome):
+        self._somar(indice, -1)
+        self.nomes[indice] = nome
+        self._somar(indice, 1)
+
+    def selecionar(self, indice, produto, codigo):
+        """Altera uma célula; retorna a variação do total do produto."""
+        linha = self.codigos[indice]
+        delta = PONTOS_POR_CODIGO[codigo] - PONTOS_POR_CODIGO[linha[produto]]
+        linha[produto] = codigo
+        if self.nomes[indice].strip():
+            self.totais[produto] += delta
+            return delta
+        return 0
+
+    def matriz(self):
+        """Critérios com nome e a matriz ``int8`` M×N de códigos (cópia independente da GUI)."""
+        ativos = [i for i, nome in enumerate(self.nomes) if nome.strip()]
+        codigos = np.frombuffer(b"".join(self.codigos[i] for i in ativos), dtype=np.int8)
+        return [self.nomes[i].strip() for i in ativos], codigos.reshape(len(ativos), self.n_produtos)
+
+# --- Grade Virtualizada ---
+
+class GradeVirtual(ttk.Frame):
+    """Grade de critérios com um número fixo de editores, reaproveitados durante a rolagem.
+
+    Só existem widgets para as linhas visíveis; rolar apenas revincula esses
+    editores a outros índices do `ModeloCriterios`. A rolagem vertical é por
+    linha inteira e a horizontal (muitos produtos) fica a cargo do Canvas.
+    """
+    ALTURA_LINHA = 30
+    LARGURA_CRITERIO = 300
+    LARGURA_PRODUTO = 130
+    LARGURA_BOTAO = 40
+    LINHAS_CABECALHO = 2  # nomes dos produtos e pontuação parcial
+
+    def __init__(self, master, modelo, vars_produtos, linhas_visiveis=12):
+        super().__init__(master)
+        self.modelo = modelo
+        self._topo = 0         # índice do critério exibido na primeira linha
+        self._visiveis = 0     # linhas que cabem na área atual
+        self._editores = []
+        self._vinculando = False
+
+        self.largura = self.LARGURA_CRITERIO + modelo.n_produtos * self.LARGURA_PRODUTO + self.LARGURA_BOTAO
+        altura = (linhas_visiveis + self.LINHAS_CABECALHO) * self.ALTURA_LINHA
+
+        self.canvas = tk.Canvas(self, width=min(self.largura, 900), height=altura, highlightthickness=0)
+        self.rolagem_y = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.rolar)
+        self.rolagem_x = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        self.canvas.configure(xscrollcommand=self.rolagem_x.set, scrollregion=(0, 0, self.largura, altura))
+        self.canvas.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.rolagem_y.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.rolagem_x.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.interno = ttk.Frame(self.canvas, width=self.largura, height=altura)
+        self._janela = self.canvas.create_window(0, 0, window=self.interno, anchor="nw")
+
+        # Cabeçalho: nomes dos produtos (editáveis) e pontuação parcial
+        h = self.ALTURA_LINHA
+        ttk.Label(self.interno, text="CRITÉRIOS", font=("Helvetica", 10, "bold")).place(x=5, y=0, height=h)
+        ttk.Label(self.interno, text="PONTUAÇÃO", font=("Helvetica", 10, "bold")).place(x=5, y=h, height=h)
+        self.vars_totais = [tk.StringVar(self.interno, value="0 pts") for _ in range(modelo.n_produtos)]
+        for i, var_prod in enumerate(vars_produtos):
+            ttk.Entry(self.interno, textvariable=var_prod).place(x=self._x_produto(i), y=2, width=self.LARGURA_PRODUTO - 10, height=h - 4)
+            ttk.Label(self.interno, textvariable=self.vars_totais[i], font=("Helvetica", 10, "bold")).place(x=self._x_produto(i), y=h, height=h)
+
+        self.canvas.bind("<Configure>", self._redimensionar)
+        self._ligar_roda(self.canvas)
+        self._ligar_roda(self.interno)
+
+    def _x_produto(self, produto):
+        return self.LARGURA_CRITERIO + produto * self.LARGURA_PRODUTO
+
+    # --- Editores reaproveitados ---
+
+    def _criar_editor(self):
+        h = self.ALTURA_LINHA
+        frame = ttk.Frame(self.interno, width=self.largura, height=h)
+        editor = {"frame": frame, "indice": None, "nome": tk.StringVar(frame), "combos": []}
+
+        entry = ttk.Entry(frame, textvariable=editor["nome"])
+        entry.place(x=5, y=2, width=self.LARGURA_CRITERIO - 10, height=h - 4)
+        editor["nome"].trace_add("write", lambda *_, e=editor: self._renomear(e))
+        self._ligar_roda(frame)
+        self._ligar_roda(entry)
+
+        opcoes = list(OPCOES)
+        for i in range(self.modelo.n_produtos):
+            combo = ttk.Combobox(frame, values=opcoes, state="readonly")
+            combo.place(x=self._x_produto(i), y=2, width=self.LARGURA_PRODUTO - 10, height=h - 4)
+            combo.bind("<<ComboboxSelected>>", lambda _, e=editor, i=i: self._selecionar(e, i))
+            # A roda do mouse rola a grade em vez de trocar a opção do Combobox
+            self._ligar_roda(combo)
+            editor["combos"].append(combo)
+
+        botao = ttk.Button(frame, text="X", command=lambda e=editor: self._remover(e))
+        botao.place(x=self._x_produto(self.modelo.n_produtos), y=2, width=self.LARGURA_BOTAO - 10, height=h - 4)
+        self._ligar_roda(botao)
+        self._editores.append(editor)
+
+    def _vincular(self, editor, indice):
+        editor["indice"] = indice
+        self._vinculando = True
+        try:
+            editor["nome"].set(self.modelo.nomes[indice])
+            for combo, codigo in zip(editor["combos"], self.modelo.codigos[indice]):
+                combo.set(OPCOES[codigo] if codigo < CODIGO_SEM_OPCAO else TEXTO_SEM_OPCAO)
+        finally:
+            self._vinculando = False
+
+    def _renomear(self, editor):
+        if self._vinculando or editor["indice"] is None:
+            return
+        self.modelo.renomear(editor["indice"], editor["nome"].get())
+        self.mostrar_totais()
+
+    def _selecionar(self, editor, produto):
+        codigo = editor["combos"][produto].current()
+        if self.modelo.selecionar(editor["indice"], produto, codigo if codigo >= 0 else CODIGO_SEM_OPCAO):
+            self.mostrar_totais(produto)
+
+    def _remover(self, editor):
+        if editor["indice"] is not None:
+            self.modelo.remover(editor["indice"])
+            self.atualizar()
+
+    # --- Rolagem e redesenho ---
+
+    def _redimensionar(self, event):
+        self.canvas.itemconfigure(self._janela, height=event.height)
+        self.canvas.configure(scrollregion=(0, 0, self.largura, event.height))
+        self._visiveis = max(1, event.height // self.ALTURA_LINHA - self.LINHAS_CABECALHO)
+        while len(self._editores) < self._visiveis:
+            self._criar_editor()
+        self.atualizar()
+
+    def atualizar(self):
+        """Revincula os editores às linhas visíveis e ajusta a barra de rolagem."""
+        total = len(self.modelo)
+        self._topo = max(0, min(self._topo, total - self._visiveis))
+        for k, editor in enumerate(self._editores):
+            indice = self._topo + k
+            if k < self._visiveis and indice < total:
+                self._vincular(editor, indice)
+                editor["frame"].place(x=0, y=(k + self.LINHAS_CABECALHO) * self.ALTURA_LINHA, width=self.largura, height=self.ALTURA_LINHA)
+            else:
+                editor["indice"] = None
+                editor["frame"].place_forget()
+        if total:
+            self.rolagem_y.set(self._topo / total, min(1.0, (self._topo + self._visiveis) / total))
+        else:
+            self.rolagem_y.set(0.0, 1.0)
+        self.mostrar_totais()
+
+    def rolar(self, acao, quantidade, unidade=None):
+        """Comando da barra de rolagem vertical ('moveto' fração ou 'scroll' n units/pages)."""
+        if acao == "moveto":
+            topo = round(float(quantidade) * len(self.modelo))
+        else:
+            passo = self._visiveis if unidade == "pages" else 1
+            topo = self._topo + int(quantidade) * passo
+        self.rolar_para(topo)
+
+    def rolar_para(self, indice):
+        self._topo = indice
+        self.atualizar()
+
+    def rolar_para_fim(self):
+        self.rolar_para(len(self.modelo))
+
+    def _ligar_roda(self, widget):
+        widget.bind("<MouseWheel>", self._roda)  # Windows/macOS
+        widget.bind("<Button-4>", self._roda)    # X11
+        widget.bind("<Button-5>", self._roda)
+
+    def _roda(self, event):
+        if getattr(event, "num", None) == 5 or getattr(event, "delta", 0) < 0:
+            self.rolar("scroll", 3)
+        else:
+            self.rolar("scroll", -3)
+        return "break"
+
+    def mostrar_totais(self, produto=None):
+        produtos = range(self.modelo.n_produtos) if produto is None else (produto,)
+        for i in produtos:
+            self.vars_totais[i].set(f"{self.modelo.totais[i]} pts")
 
 # --- Lógica da Aplicação ---
 
 class ComparadorApp:
-    def __init__(self, master):
+    INTERVALO_FILA_MS = 50  # Frequência com que a thread da GUI lê as mensagens do trabalhador
+
+    def __init__(self, master, produtos=None):
         self.master = master
         master.title("Gerador de PDF para Comparação de Produtos")
         
-        self.produtos = ["ADAPTA", "INNER AI", "TESS AI (PARETO)"]
+        self.produtos = produtos or ["ADAPTA", "INNER AI", "TESS AI (PARETO)"]
         
-        # Lista para armazenar as variáveis de controle e widgets de cada critério
-        # Cada item será um dicionário: {"criterio_var": tk.StringVar, "combos": [ttk.Combobox, ...]}
-        self.criterio_rows = [] 
+        # Critérios e seleções ficam no modelo; a grade só mantém editores para as linhas visíveis
+        self.modelo = ModeloCriterios(len(self.produtos))
         
         # Variáveis para armazenar os nomes dos produtos (editáveis)
         self.vars_produtos = [tk.StringVar(master, value=prod) for prod in self.produtos]
+
+        # Geração em segundo plano: o trabalhador só escreve na fila; a GUI lê com after()
+        self._fila = queue.Queue()
+        self._cancelar = threading.Event()
+        self._trabalhador = None
         
         self.criar_widgets()
 
     def criar_widgets(self):
-        # Frame principal para o layout
+        # Frame principal para o layout (a grade acompanha o tamanho da janela)
+        self.master.columnconfigure(0, weight=1)
+        self.master.rowconfigure(0, weight=1)
         self.main_frame = ttk.Frame(self.master, padding="10 10 10 10")
         self.main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        
-        # Frame para os cabeçalhos e critérios (para facilitar a inserção dinâmica)
-        self.header_frame = ttk.Frame(self.main_frame)
-        self.header_frame.grid(row=0, column=0, sticky=(tk.W, tk.E))
-        
-        self.criterios_frame = ttk.Frame(self.main_frame)
-        self.criterios_frame.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        self.main_frame.columnconfigure(0, weight=1)
+        self.main_frame.rowconfigure(1, weight=1)
         
         # Título
-        ttk.Label(self.header_frame, text="COMPARAÇÃO DE PRODUTOS", font=("Helvetica", 16, "bold")).grid(row=0, column=0, columnspan=len(self.produtos) + 1, pady=10)
+        ttk.Label(self.main_frame, text="COMPARAÇÃO DE PRODUTOS", font=("Helvetica", 16, "bold")).grid(row=0, column=0, pady=10)
         
-        # Linha dos Nomes dos Produtos (Editáveis)
-        ttk.Label(self.header_frame, text="CRITÉRIOS", font=("Helvetica", 10, "bold")).grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
-        for i, var_prod in enumerate(self.vars_produtos):
-            entry_prod = ttk.Entry(self.header_frame, textvariable=var_prod, width=20)
-            entry_prod.grid(row=1, column=i+1, padx=5, pady=5)
-            # Configurar expansão de colunas
-            self.header_frame.columnconfigure(i+1, weight=1)
-        self.header_frame.columnconfigure(0, weight=1)
+        # Grade de critérios (nomes dos produtos, pontuação parcial e uma linha por critério)
+        self.grade = GradeVirtual(self.main_frame, self.modelo, self.vars_produtos)
+        self.grade.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
         # Botão para adicionar novo critério
         self.add_button = ttk.Button(self.main_frame, text="Adicionar Critério", command=self.adicionar_criterio)
         self.add_button.grid(row=2, column=0, pady=10, sticky=tk.W)
         
-        # Botão para Gerar PDF
-        self.pdf_button = ttk.Button(self.main_frame, text="GERAR PDF DETALHADO", command=self.processar_e_gerar_pdf)
-        self.pdf_button.grid(row=3, column=0, pady=20)
+        # Botões para Gerar PDF e Cancelar a geração em andamento
+        acoes_frame = ttk.Frame(self.main_frame)
+        acoes_frame.grid(row=3, column=0, pady=20)
+        self.pdf_button = ttk.Button(acoes_frame, text="GERAR PDF DETALHADO", command=self.processar_e_gerar_pdf)
+        self.pdf_button.grid(row=0, column=0, padx=5)
+        self.cancel_button = ttk.Button(acoes_frame, text="Cancelar", command=self.cancelar_geracao, state="disabled")
+        self.cancel_button.grid(row=0, column=1, padx=5)
 
         # Label de Status
         self.status_var = tk.StringVar(self.main_frame)
         self.status_label = ttk.Label(self.main_frame, textvariable=self.status_var, foreground="blue")
         self.status_label.grid(row=4, column=0)
+
+        # Barra de Progresso
+        self.progresso_var = tk.DoubleVar(self.main_frame, value=0.0)
+        self.progress_bar = ttk.Progressbar(self.main_frame, variable=self.progresso_var, maximum=1.0, length=300)
+        self.progress_bar.grid(row=5, column=0, pady=5)
         
         # Adicionar 3 critérios iniciais (opcional, para iniciar com a aparência da imagem)
-        self.adicionar_criterio("Preço e condições")
-        self.adicionar_criterio("IA para texto e funcionalidades")
-        self.adicionar_criterio("Outros modelos de IA e ferramentas...")
+        for nome in ("Preço e condições", "IA para texto e funcionalidades", "Outros modelos de IA e ferramentas..."):
+            self.modelo.adicionar(nome)
+        self.grade.atualizar()
 
 
     def adicionar_criterio(self, nome_criterio="Novo Critério"):
-        """Adiciona uma nova linha de critério com entrada de texto e comboboxes."""
-        
-        row_index = len(self.criterio_rows)
-        row_frame = ttk.Frame(self.criterios_frame)
-        row_frame.grid(row=row_index, column=0, sticky=(tk.W, tk.E), pady=2)
-        
-        # 1. Entrada do Nome do Critério
-        criterio_var = tk.StringVar(row_frame, value=nome_criterio)
-        entry_criterio = ttk.Entry(row_frame, textvariable=criterio_var, width=40)
-        entry_criterio.grid(row=0, column=0, sticky=tk.W, padx=5)
-        
-        # 2. Comboboxes para os Produtos
-        combos = []
-        opcoes = list(OPCOES_PONTOS.keys())
-        
-        for i, produto in enumerate(self.produtos):
-            var_selecao = tk.StringVar(row_frame)
-            var_selecao.set("Selecione...") # Valor inicial
-            
-            combo = ttk.Combobox(row_frame, textvariable=var_selecao, values=opcoes, state="readonly", width=15)
-            combo.grid(row=0, column=i + 1, padx=5)
-            combos.append(combo)
-
-        # 3. Botão de Remoção
-        # Usamos uma função lambda para passar a referência da linha para a função de remoção
-        remove_button = ttk.Button(row_frame, text="X", width=3, command=lambda rf=row_frame: self.remover_criterio(rf))
-        remove_button.grid(row=0, column=len(self.produtos) + 1, padx=5)
-        
-        # Armazenar a linha
-        self.criterio_rows.append({
-            "frame": row_frame,
-            "criterio_var": criterio_var,
-            "combos": combos
-        })
-        
-        # Configurar expansão de colunas
-        row_frame.columnconfigure(0, weight=1)
-        for i in range(len(self.produtos)):
-            row_frame.columnconfigure(i+1, weight=1)
-        self.criterios_frame.columnconfigure(0, weight=1)
+        """Adiciona um critério ao modelo e rola a grade até ele."""
+        self.modelo.adicionar(nome_criterio)
+        self.grade.rolar_para_fim()
 
+    # --- Geração do PDF em segundo plano ---
 
-    def remover_criterio(self, row_frame):
-        """Remove a linha de critério da interface e da lista de controle."""
-        # Encontrar e remover o item correspondente na lista de controle
-        self.criterio_rows = [row for row in self.criterio_rows if row["frame"] is not row_frame]
-        
-        # Destruir o frame (e todos os seus widgets)
-        row_frame.destroy()
-        
-        # Reorganizar as linhas restantes (opcional, mas bom para manter a ordem)
-        for i, row in enumerate(self.criterio_rows):
-            row["frame"].grid(row=i, column=0)
+    def processar_e_gerar_pdf(self):
+        """Coleta os dados do modelo e dispara a pontuação e a geração do PDF em uma thread separada."""
+        if self._trabalhador is not None:
+            self.status_var.set("Já existe um PDF sendo gerado. Aguarde ou cancele.")
+            return
 
+        # 1. Coletar os nomes dos produtos e as seleções (critérios sem nome são ignorados);
+        #    a matriz é uma cópia, então a grade pode continuar sendo editada durante a geração
+        produtos_atuais = [var.get() for var in self.vars_produtos]
+        criterios_usados, codigos = self.modelo.matriz()
 
-    def processar_e_gerar_pdf(self):
-        """Coleta os dados dinâmicos, calcula a pontuação e chama a função de geração de PDF."""
+        self._cancelar.clear()
+        self.pdf_button.state(["disabled"])
+        self.cancel_button.state(["!disabled"])
+        self.progresso_var.set(0.0)
         self.status_var.set("Processando dados e gerando PDF...")
-        self.master.update()
+        self.status_label.config(foreground="blue")
 
-        # 1. Coletar os nomes dos produtos atualizados
-        produtos_atuais = [var.get() for var in self.vars_produtos]
-        
-        dados_comparacao = {prod: {"Total": 0, "Criterios": {}} for prod in produtos_atuais}
-        criterios_usados = []
-        
-        # 2. Coletar as seleções e calcular pontuações
-        pontuacoes_totais = {prod: 0 for prod in produtos_atuais}
-        
-        for row in self.criterio_rows:
-            criterio = row["criterio_var"].get().strip()
-            
-            # Ignorar critérios vazios
-            if not criterio:
-                continue
-                
-            criterios_usados.append(criterio)
-            
-            for i, produto in enumerate(produtos_atuais):
-                combo_var = row["combos"][i].cget("textvariable")
-                # É necessário obter o valor da variável associada ao Combobox
-                # Como o Combobox é criado com `textvariable=var_selecao`, precisamos acessar o valor
-                # A maneira mais robusta é usar o `get()` do widget, mas o Tkinter retorna o nome da variável
-                # Vamos assumir que o `textvariable` é uma variável de controle (tk.StringVar)
-                
-                # Acessar a variável de controle através do nome (mais complexo) ou
-                # Acessar o valor diretamente do Combobox (mais simples, mas depende da implementação do ttk)
-                
-                # Solução mais simples: como criamos o `tk.StringVar` e o passamos, vamos tentar acessá-lo.
-                # No entanto, o `row["combos"][i]` é o widget Combobox.
-                # Acessar o valor do Combobox:
-                opcao_selecionada = row["combos"][i].get()
-                
-                pontos = OPCOES_PONTOS.get(opcao_selecionada, 0)
-                
-                pontuacoes_totais[produto] += pontos
-                
-                dados_comparacao[produto]["Criterios"][criterio] = {
-                    "Opcao": opcao_selecionada,
-                    "Pontos": pontos
-                }
-        
-        # 3. Finalizar a estrutura de dados e determinar a Vencedora
-        for produto in produtos_atuais:
-            dados_comparacao[produto]["Total"] = pontuacoes_totais[produto]
+        self._trabalhador = threading.Thread(target=self._gerar_em_segundo_plano,
+                                             args=(produtos_atuais, criterios_usados, codigos), daemon=True)
+        self._trabalhador.start()
+        self.master.after(self.INTERVALO_FILA_MS, self._verificar_fila)
 
-        if not pontuacoes_totais or not criterios_usados:
-            nome_vencedora = "Nenhuma (Sem critérios ou pontuação)"
-        else:
-            vencedora = max(pontuacoes_totais, key=pontuacoes_totais.get)
-            max_pontos = pontuacoes_totais[vencedora]
-            
-            # Checar por empates
-            empates = [prod for prod, pontos in pontuacoes_totais.items() if pontos == max_pontos]
-            
-            if len(empates) > 1:
-                nome_vencedora = "Empate: " + " e ".join(empates)
-            else:
-                nome_vencedora = vencedora
+    def cancelar_geracao(self):
+        if self._trabalhador is not None:
+            self._cancelar.set()
+            self.cancel_button.state(["disabled"])
+            self.status_var.set("Cancelando...")
+
+    def _gerar_em_segundo_plano(self, produtos_atuais, criterios_usados, codigos):
+        """Executada na thread trabalhadora: não toca em widgets, só publica mensagens na fila."""
+        def progresso(fracao, mensagem):
+            if self._cancelar.is_set():
+                raise GeracaoCancelada()
+            self._fila.put(("progresso", fracao, mensagem))
 
-        # 4. Gerar o PDF
         try:
-            nome_arquivo = gerar_pdf(dados_comparacao, nome_vencedora, criterios_usados)
-            self.status_var.set(f"Sucesso! PDF gerado como: {nome_arquivo}")
-            self.status_label.config(foreground="green")
+            # 2. Calcular pontuações e determinar a Vencedora (com tratamento de empates)
+            progresso(0.0, "Calculando pontuações...")
+            comparacao, nome_vencedora_atual = calcular_comparacao(produtos_atuais, criterios_usados, codigos)
+
+            # 3. Gerar o PDF
+            nome_arquivo = gerar_pdf(comparacao, nome_vencedora_atual, progresso=progresso)
+            self._fila.put(("concluido", nome_arquivo))
+        except GeracaoCancelada:
+            self._fila.put(("cancelado",))
         except Exception as e:
-            self.status_var.set(f"Erro ao gerar PDF: {e}")
-            self.status_label.config(foreground="red")
+            self._fila.put(("erro", e))
+
+    def _verificar_fila(self):
+        """Aplica na GUI as mensagens publicadas pelo trabalhador (executada via after())."""
+        try:
+            while True:
+                mensagem = self._fila.get_nowait()
+                tipo = mensagem[0]
+                if tipo == "progresso":
+                    _, fracao, texto = mensagem
+                    if fracao is not None:
+                        self.progresso_var.set(fracao)
+                    if not self._cancelar.is_set():
+                        self.status_var.set(texto)
+                    continue
+                if tipo == "concluido":
+                    self.progresso_var.set(1.0)
+                    self.status_var.set(f"Sucesso! PDF gerado como: {mensagem[1]}")
+                    self.status_label.config(foreground="green")
+                elif tipo == "cancelado":
+                    self.progresso_var.set(0.0)
+                    self.status_var.set("Geração do PDF cancelada.")
+                    self.status_label.config(foreground="blue")
+                else:
+                    self.status_var.set(f"Erro ao gerar PDF: {mensagem[1]}")
+                    self.status_label.config(foreground="red")
+                self._finalizar_geracao()
+                return
+        except queue.Empty:
+            pass
+        self.master.after(self.INTERVALO_FILA_MS, self._verificar_fila)
+
+    def _finalizar_geracao(self):
+        self._trabalhador = None
+        self.pdf_button.state(["!disabled"])
+        self.cancel_button.state(["disabled"])
 
 
 # --- SIMULAÇÃO PARA GERAÇÃO DE PDF DE EXEMPLO (PARA AMBIENTE SEM GUI) ---
@@ -370,34 +495,46 @@ def simular_dados():
         }
     }
     
-    dados_comparacao_simulados = {}
-    pontuacoes_totais = {}
-    
-    for produto in produtos_simulados:
-        total = 0
-        criterios_data = {}
-        for criterio in criterios_simulados:
-            opcao = mapa_simulado[produto].get(criterio, "Não possui")
-            pontos = OPCOES_PONTOS.get(opcao, 0)
-            total += pontos
-            criterios_data[criterio] = {"Opcao": opcao, "Pontos": pontos}
+    grade_opcoes = [[mapa_simulado[produto].get(criterio, "Não possui") for produto in produtos_simulados]
+                    for criterio in criterios_simulados]
+    comparacao_simulada = Comparacao.de_opcoes(produtos_simulados, criterios_simulados, grade_opcoes)
+    nome_vencedora_simulada = nome_vencedora(produtos_simulados, comparacao_simulada.resultado)
         
-        dados_comparacao_simulados[produto] = {"Total": total, "Criterios": criterios_data}
-        pontuacoes_totais[produto] = total
+    return comparacao_simulada, nome_vencedora_simulada
 
-    # Determinar a Vencedora Simulada
-    vencedora = max(pontuacoes_totais, key=pontuacoes_totais.get)
-    max_pontos = pontuacoes_totais[vencedora]
-    empates = [prod for prod, pontos in pontuacoes_totais.items() if pontos == max_pontos]
-    
-    if len(empates) > 1:
-        nome_vencedora_simulada = "Empate: " + " e ".join(empates)
-    else:
-        nome_vencedora_simulada = vencedora
-        
-    return dados_comparacao_simulados, nome_vencedora_simulada, criterios_simulados
+def executar_lote_cli(argv=None):
+    """Modo em lote: `python comparador_produtos_gui.py --lote entrada.jsonl --saida relatorios/`."""
+    import argparse
+    from comparador.lote import executar_lote, ler_entrada
+
+    parser = argparse.ArgumentParser(description="Gera relatórios em lote a partir de CSV ou JSONL, sem abrir a GUI.")
+    parser.add_argument("--lote", required=True, metavar="ENTRADA", help="arquivo .jsonl (payloads de /gerar_pdf) ou .csv (comparacao,criterio,produto,opcao)")
+    parser.add_argument("--saida", default="relatorios", help="diretório dos PDFs e do manifesto (padrão: relatorios)")
+    parser.add_argument("--formato", choices=("csv", "jsonl"), help="formato da entrada (padrão: pela extensão)")
+    parser.add_argument("--processos", type=int, help="processos de renderização (padrão: núcleos da CPU; 0 = no processo atual)")
+    parser.add_argument("--silencioso", action="store_true", help="não lista cada relatório gerado")
+    args = parser.parse_args(argv)
+
+    def mostrar(registro):
+        if registro["status"] != "ok":
+            print(f"ERRO {registro['id']}: {registro['erro']}")
+        elif not args.silencioso:
+            print(f"ok   {registro['arquivo']} ({registro['segundos'] * 1000:.0f} ms)")
+
+    try:
+        resumo = executar_lote(ler_entrada(args.lote, args.formato), renderizar_comparacao, args.saida,
+                               processos=args.processos, ao_registrar=mostrar)
+    except KeyboardInterrupt:
+        print("Interrompido. Execute o mesmo comando para continuar de onde parou.")
+        return 130
+    print(resumo.texto())
+    return 1 if resumo.erros else 0
 
 if __name__ == "__main__":
+    import sys
+    if "--lote" in sys.argv[1:]:
+        sys.exit(executar_lote_cli())
+
     # Se estiver em um ambiente que suporta GUI, executa a aplicação normalmente
     try:
         root = tk.Tk()
@@ -407,10 +544,10 @@ if __name__ == "__main__":
         # Se falhar (ambiente sem GUI, como o sandbox), gera um PDF de exemplo com dados simulados
         print("Ambiente sem suporte a GUI detectado. Gerando PDF de exemplo com dados simulados.")
         
-        dados_comparacao_simulados, nome_vencedora_simulada, criterios_simulados = simular_dados()
+        comparacao_simulada, nome_vencedora_simulada = simular_dados()
 
         try:
-            nome_arquivo = gerar_pdf(dados_comparacao_simulados, nome_vencedora_simulada, criterios_simulados)
+            nome_arquivo = gerar_pdf(comparacao_simulada, nome_vencedora_simulada)
             print(f"PDF de exemplo gerado com sucesso: {nome_arquivo}")
         except Exception as e:
             print(f"Erro ao gerar PDF de exemplo: {e}")
@@ -0,0 +1,64 @@
+"""Testes do cache de PDFs com transbordo para disco (``comparador.cache_pdf``)."""
+import os
+import threading
+
+from comparador.cache_pdf import CachePDF
+
+
+def arquivos(diretorio):
+    return sorted(os.listdir(diretorio))
+
+
+def test_transbordo_e_promocao(tmp_path):
+    cache = CachePDF(limite_bytes=10, diretorio_disco=str(tmp_path))
+    cache.guardar("a", b"a" * 6)
+    cache.guardar("b", b"b" * 6)  # tira "a" da memória
+    assert arquivos(tmp_path) == ["a.pdf"]
+    assert cache.obter("a") == b"a" * 6
+    assert cache.estatisticas()["acertos_disco"] == 1
+    assert arquivos(tmp_path) == ["a.pdf", "b.pdf"]  # "b" saiu da memória quando "a" voltou
+
+
+def test_limite_do_disco(tmp_path):
+    cache = CachePDF(limite_bytes=5, diretorio_disco=str(tmp_path), limite_disco_bytes=12)
+    for chave in "abcd":
+        cache.guardar(chave, chave.encode() * 6)  # maior que a memória: vai direto ao disco
+    assert arquivos(tmp_path) == ["c.pdf", "d.pdf"]
+    assert cache.estatisticas()["bytes_disco"] == 12
+    cache.guardar("grande", b"x" * 13)  # maior que o limite do disco: não é guardado
+    assert cache.obter("grande") is None
+    assert arquivos(tmp_path) == ["c.pdf", "d.pdf"]
+
+
+def test_arquivo_removido_vira_falha(tmp_path):
+    cache = CachePDF(limite_bytes=5, diretorio_disco=str(tmp_path))
+    cache.guardar("a", b"a" * 6)
+    os.remove(tmp_path / "a.pdf")
+    assert cache.obter("a") is None
+    assert not cache.contem("a")
+    assert cache.estatisticas()["bytes_disco"] == 0
+
+
+def test_threads_mantem_indice_e_disco_consistentes(tmp_path):
+    cache = CachePDF(limite_bytes=40, diretorio_disco=str(tmp_path), limite_disco_bytes=100)
+
+    def trabalhar(n):
+        for i in range(300):
+            chave = f"{(i * 7 + n) % 40:02d}"
+            if cache.obter(chave) is None:
+                cache.guardar(chave, chave.encode() * 5)
+            else:
+                assert cache.obter(chave) in (None, chave.encode() * 5)
+
+    threads = [threading.Thread(target=trabalhar, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.estatisticas()["bytes_disco"] <= 100
+    assert sum(os.path.getsize(tmp_path / nome) for nome in arquivos(tmp_path)) <= 100
+    assert all(nome.endswith(".pdf") for nome in arquivos(tmp_path))
+    # Nenhum arquivo fora do índice (um arquivo do índice pode faltar, o que vira uma falha na leitura)
+    assert {nome[:-len(".pdf")] for nome in arquivos(tmp_path)} <= set(cache._disco)
+    cache.limpar()
+    assert arquivos(tmp_path) == []
@@ -0,0 +1,123 @@
+"""Testes do decodificador do payload de ``/gerar_pdf`` (``comparador.modelo``)."""
+import numpy as np
+import pytest
+
+from comparador.modelo import Limites, PayloadGrande, PayloadInvalido, decodificar_comparacao
+from comparador.pontuacao import CODIGO_SEM_OPCAO, OPCOES
+
+
+def criterio(nome, *pontuacoes):
+    return {"nome": nome, "pontuacoes": list(pontuacoes)}
+
+
+def payload(produtos=("A", "B"), criterios=None):
+    if criterios is None:
+        criterios = [criterio("Preço", "Excelente", "Bom")]
+    return {"produtos": list(produtos), "criterios": criterios}
+
+
+# --- Payloads rejeitados com 400 ---
+
+@pytest.mark.parametrize("data, mensagem", [
+    ([], "objeto JSON"),
+    ("texto", "objeto JSON"),
+    ({}, "Dados insuficientes"),
+    (payload(produtos=()), "Dados insuficientes"),
+    (payload(criterios=[]), "Dados insuficientes"),
+    ({"produtos": "AB", "criterios": [criterio("Preço", "Bom")]}, "devem ser listas"),
+    ({"produtos": ["A"], "criterios": {"nome": "Preço"}}, "devem ser listas"),
+    (payload(produtos=("A", 2)), r"produtos\[1\]: esperado texto, recebido int"),
+    (payload(criterios=["Preço"]), r"criterios\[0\]: esperado objeto"),
+    (payload(criterios=[criterio(5, "Bom", "Bom")]), r"criterios\[0\]\.nome: esperado texto"),
+    (payload(criterios=[criterio(None, "Bom", "Bom")]), r"criterios\[0\]\.nome: esperado texto"),
+    (payload(criterios=[{"nome": "Preço"}]), r"criterios\[0\]\.pontuacoes: esperada uma lista com 2"),
+    (payload(criterios=[{"nome": "Preço", "pontuacoes": "Bom"}]), "esperada uma lista com 2"),
+    (payload(criterios=[criterio("Preço", "Bom")]), "esperada uma lista com 2"),
+    (payload(criterios=[criterio("Preço", "Bom", "Bom", "Bom")]), "esperada uma lista com 2"),
+    (payload(criterios=[criterio("", "Bom")]), "esperada uma lista com 2"),
+    (payload(criterios=[criterio("Preço", "Bom", "Ótimo")]), r"opção desconhecida 'Ótimo'"),
+    (payload(criterios=[criterio("Preço", "Bom", 10)]), "opção desconhecida 10"),
+    (payload(criterios=[criterio("Preço", "bom", "Bom")]), "opção desconhecida 'bom'"),
+    (payload(criterios=[criterio("Preço", "Bom", "Bom"), criterio("Peso", "Bom", ["Bom"])]),
+     r"criterios\[1\]\.pontuacoes: opção desconhecida \['Bom'\]"),
+])
+def test_payload_invalido(data, mensagem):
+    with pytest.raises(PayloadInvalido, match=mensagem) as erro:
+        decodificar_comparacao(data)
+    assert not isinstance(erro.value, PayloadGrande)
+
+
+# --- Limites de tamanho (413) ---
+
+LIMITES = Limites(max_produtos=3, max_criterios=2, max_nome=5)
+
+
+@pytest.mark.parametrize("data, mensagem", [
+    (payload(produtos=("A", "B", "C", "D"), criterios=[criterio("x", *["Bom"] * 4)]), "No máximo 3 produtos"),
+    (payload(criterios=[criterio("x", "Bom", "Bom")] * 3), "No máximo 2 critérios"),
+    (payload(produtos=("A", "Longo!")), r"produtos\[1\]: texto com mais de 5 caracteres"),
+    (payload(criterios=[criterio("Longo!", "Bom", "Bom")]), r"criterios\[0\]\.nome: texto com mais de 5"),
+])
+def test_payload_grande(data, mensagem):
+    with pytest.raises(PayloadGrande, match=mensagem):
+        decodificar_comparacao(data, LIMITES)
+
+
+def test_payload_no_limite():
+    data = payload(produtos=("A", "B", "Cinco"), criterios=[criterio("x", "Bom", "Bom", "Bom")] * 2)
+    comparacao = decodificar_comparacao(data, LIMITES)
+    assert comparacao.codigos.shape == (2, 3)
+
+
+# --- Critérios sem nome ---
+
+@pytest.mark.parametrize("nome", ["", "   "])
+def test_criterio_sem_nome_e_ignorado(nome):
+    data = payload(criterios=[criterio("Preço", "Excelente", "Bom"), criterio(nome, "Bom", "Bom"),
+                              criterio("  Peso ", "Regular", "Não possui")])
+    comparacao = decodificar_comparacao(data)
+    assert comparacao.criterios == ("Preço", "Peso")
+    assert comparacao.codigos.shape == (2, 2)
+
+
+def test_criterio_sem_nome_nao_valida_opcoes():
+    data = payload(criterios=[criterio("", "Ótimo", 7), criterio("Preço", "Bom", "Bom")])
+    assert decodificar_comparacao(data).criterios == ("Preço",)
+
+
+def test_criterio_sem_a_chave_nome_e_ignorado():
+    data = payload(criterios=[{"pontuacoes": ["Bom", "Bom"]}, criterio("Preço", "Bom", "Bom")])
+    assert decodificar_comparacao(data).criterios == ("Preço",)
+
+
+def test_todos_os_criterios_sem_nome():
+    comparacao = decodificar_comparacao(payload(criterios=[criterio(" ", "Bom", "Bom")]))
+    assert comparacao.criterios == ()
+    assert comparacao.codigos.shape == (0, 2)
+
+
+# --- Matriz de códigos ---
+
+@pytest.mark.parametrize("pontuacoes, codigos", [
+    (["Excelente", "Bom", "Regular", "Não possui"], [0, 1, 2, 3]),
+    (["", "Selecione...", None, "Excelente"], [CODIGO_SEM_OPCAO] * 3 + [0]),
+])
+def test_codigos(pontuacoes, codigos):
+    comparacao = decodificar_comparacao(payload(produtos="ABCD", criterios=[criterio("x", *pontuacoes)]))
+    assert comparacao.codigos.dtype == np.int8
+    assert comparacao.codigos.tolist() == [codigos]
+
+
+def test_matriz_criterios_por_produtos():
+    data = payload(produtos=("A", "B", "C"), criterios=[
+        criterio("Preço", "Excelente", "Bom", "Regular"),
+        criterio("", "Bom", "Bom", "Bom"),
+        criterio("Peso", "Não possui", "Selecione...", "Excelente"),
+    ])
+    comparacao = decodificar_comparacao(data)
+    assert comparacao.produtos == ("A", "B", "C")
+    assert comparacao.codigos.tolist() == [
+        [OPCOES.index("Excelente"), OPCOES.index("Bom"), OPCOES.index("Regular")],
+        [OPCOES.index("Não possui"), CODIGO_SEM_OPCAO, OPCOES.index("Excelente")],
+    ]
+    assert comparacao.totais == [10, 5, 13]